@@ -1,9 +1,19 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.contrib.auth.models import User
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 
+from .importing import UnreadableFileError, format_for, import_employees, read_rows
 from .models import Profile
 
 
+class EmployeeImportForm(forms.Form):
+    file = forms.FileField(label='Файл CSV или JSONL')
+    dry_run = forms.BooleanField(label='Только проверить', required=False)
+
+
 class ProfileInline(admin.StackedInline):
     model = Profile
     can_delete = False
@@ -15,6 +25,49 @@ class ProfileInline(admin.StackedInline):
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'department', 'mentor_name', 'city')
     search_fields = ('user__username', 'user__first_name', 'user__last_name', 'department')
+    change_list_template = 'admin/accounts/profile/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path(
+                'import/',
+                self.admin_site.admin_view(self.import_view),
+                name='accounts_profile_import',
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """Bulk-create employees from an uploaded file, see ``accounts.importing``."""
+        if not (self.has_add_permission(request) and request.user.has_perm('auth.add_user')):
+            return redirect('admin:accounts_profile_changelist')
+        result = None
+        form = EmployeeImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = import_employees(
+                    read_rows(upload.file, format_for(upload.name)),
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except UnreadableFileError:
+                form.add_error('file', 'Не удалось прочитать файл. Сохраните его как CSV или JSONL в кодировке UTF-8.')
+            if result is not None and not form.cleaned_data['dry_run']:
+                messages.success(
+                    request,
+                    f'Создано сотрудников: {result.created} за {result.total_seconds:.1f} с '
+                    f'({result.rows_per_second:.0f} строк/с), пропущено строк: {len(result.errors)}.',
+                )
+                if not result.errors:
+                    return redirect('admin:accounts_profile_changelist')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Импорт сотрудников',
+            'form': form,
+            'result': result,
+        }
+        return TemplateResponse(request, 'admin/accounts/profile/import.html', context)
 
 
 class UserAdmin(admin.ModelAdmin):
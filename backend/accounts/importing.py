@@ -0,0 +1,279 @@
+"""
+Bulk import of employees from CSV or JSON Lines files.
+
+Each row describes one employee with the keys ``username`` (required),
+``email``, ``password``, ``first_name``, ``last_name``, ``department``,
+``mentor_name``, ``city``, ``date_joined_company`` (``YYYY-MM-DD``) and
+``avatar``. The import creates the ``User`` rows, their ``Profile`` and a
+``UserTask`` for every integration task with one bulk insert per table
+and batch, inside a single transaction.
+
+Password hashing dominates the cost of an import: with Django's default
+PBKDF2 settings one hash takes a few hundred milliseconds of CPU. The
+hashes are therefore computed by a pool of worker processes, one per
+core unless told otherwise. Rows without a password get an unusable
+password and need no hashing; those employees set a password through
+the password reset flow.
+"""
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from courses.models import IntegrationTask, UserTask
+
+from .models import Profile
+
+FIELDS = (
+    'username',
+    'email',
+    'password',
+    'first_name',
+    'last_name',
+    'department',
+    'mentor_name',
+    'city',
+    'date_joined_company',
+    'avatar',
+)
+BATCH_SIZE = 1000
+# Columns the text fields are stored in; the password is stored hashed
+MAX_LENGTHS = {
+    **{name: User._meta.get_field(name).max_length for name in ('username', 'email', 'first_name', 'last_name')},
+    **{name: Profile._meta.get_field(name).max_length for name in ('department', 'mentor_name', 'city')},
+}
+# Passwords sent to a worker process per task
+HASH_CHUNK_SIZE = 64
+
+
+@dataclass
+class ImportResult:
+    valid: int = 0
+    created: int = 0
+    errors: list = field(default_factory=list)
+    hashed: int = 0
+    hashing_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.created / self.total_seconds if self.total_seconds else 0.0
+
+
+class UnreadableFileError(ValueError):
+    """The file is not UTF-8 text, or not CSV the reader can parse."""
+
+
+def read_rows(stream, file_format: str):
+    """
+    Yield ``(line_number, row)`` pairs from a seekable binary stream.
+    Raises ``UnreadableFileError`` while iterating if the file cannot be
+    decoded or parsed as a whole.
+    """
+    stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        yield from _read_rows(stream, file_format)
+    except UnicodeDecodeError as exc:
+        # Typically a CSV saved by Excel in cp1251 or UTF-16
+        raise UnreadableFileError(f'The file is not UTF-8 encoded (byte {exc.start}).') from exc
+    except csv.Error as exc:
+        raise UnreadableFileError(f'The file is not valid CSV: {exc}') from exc
+
+
+def _read_rows(stream, file_format: str):
+    if file_format == 'jsonl':
+        for number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError as exc:
+                    yield number, exc
+                    continue
+                yield number, row if isinstance(row, dict) else ValueError('Expected a JSON object')
+        return
+    sample = stream.read(4096)
+    stream.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    for number, row in enumerate(csv.DictReader(stream, dialect=dialect), start=2):
+        yield number, row
+
+
+def format_for(filename: str) -> str:
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def clean_row(row: dict) -> dict:
+    """Return the normalised row or raise ``ValueError``."""
+    data = {name: str(row.get(name) or '').strip() for name in FIELDS}
+    if not data['username']:
+        raise ValueError('username is required')
+    for name, max_length in MAX_LENGTHS.items():
+        if len(data[name]) > max_length:
+            raise ValueError(f'{name} is longer than {max_length} characters')
+    try:
+        UnicodeUsernameValidator()(data['username'])
+    except ValidationError as exc:
+        raise ValueError(' '.join(exc.messages))
+    if data['email']:
+        try:
+            validate_email(data['email'])
+        except ValidationError:
+            raise ValueError(f"invalid email '{data['email']}'")
+    if data['date_joined_company']:
+        try:
+            data['date_joined_company'] = date.fromisoformat(data['date_joined_company'])
+        except ValueError:
+            raise ValueError('date_joined_company must be YYYY-MM-DD')
+    else:
+        data['date_joined_company'] = None
+    if data['avatar'] and data['avatar'] not in dict(Profile.AVATAR_CHOICES):
+        raise ValueError(f"unknown avatar '{data['avatar']}'")
+    return data
+
+
+def _hash_chunk(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def _init_worker():
+    # Spawned workers (macOS, Windows) start without configured settings
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def hash_passwords(passwords, workers=None) -> list:
+    """Hash ``passwords`` in parallel, preserving their order."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) <= HASH_CHUNK_SIZE:
+        return _hash_chunk(passwords)
+    chunks = [passwords[start:start + HASH_CHUNK_SIZE] for start in range(0, len(passwords), HASH_CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        return [hashed for chunk in executor.map(_hash_chunk, chunks) for hashed in chunk]
+
+
+def import_employees(rows, workers=None, dry_run: bool = False) -> ImportResult:
+    """
+    Validate and create the employees of ``rows`` (``(line, row)`` pairs
+    as yielded by ``read_rows``). Invalid rows and existing usernames
+    are reported in ``errors`` and skipped. If a username is taken while
+    the import runs, nothing is created and its rows are reported.
+    """
+    started = time.perf_counter()
+    result = ImportResult()
+    cleaned = []
+    seen = set()
+    for number, row in rows:
+        try:
+            if isinstance(row, Exception):
+                raise ValueError(str(row))
+            data = clean_row(row)
+            if data['username'] in seen:
+                raise ValueError(f"duplicate username '{data['username']}'")
+        except ValueError as exc:
+            result.errors.append((number, str(exc)))
+            continue
+        seen.add(data['username'])
+        cleaned.append((number, data))
+
+    existing = set()
+    usernames = [data['username'] for _, data in cleaned]
+    for start in range(0, len(usernames), BATCH_SIZE):
+        existing.update(
+            User.objects.filter(username__in=usernames[start:start + BATCH_SIZE]).values_list('username', flat=True)
+        )
+    if existing:
+        for number, data in cleaned:
+            if data['username'] in existing:
+                result.errors.append((number, f"user '{data['username']}' already exists"))
+        cleaned = [(number, data) for number, data in cleaned if data['username'] not in existing]
+    result.errors.sort()
+    result.valid = len(cleaned)
+    if dry_run or not cleaned:
+        result.total_seconds = time.perf_counter() - started
+        return result
+
+    hash_started = time.perf_counter()
+    to_hash = [data['password'] for _, data in cleaned if data['password']]
+    hashes = iter(hash_passwords(to_hash, workers))
+    result.hashed = len(to_hash)
+    result.hashing_seconds = time.perf_counter() - hash_started
+
+    users = []
+    for _, data in cleaned:
+        user = User(
+            username=data['username'],
+            email=data['email'],
+            first_name=data['first_name'],
+            last_name=data['last_name'],
+        )
+        if data['password']:
+            user.password = next(hashes)
+        else:
+            user.set_unusable_password()
+        users.append(user)
+
+    task_ids = list(IntegrationTask.objects.values_list('id', flat=True))
+    try:
+        users = _create(users, cleaned, usernames, task_ids)
+    except IntegrityError as exc:
+        # Usernames taken by someone else since they were checked above
+        taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        conflicts = [
+            (number, f"user '{data['username']}' already exists") for number, data in cleaned if data['username'] in taken
+        ]
+        result.errors.extend(conflicts or [(0, f'import failed: {exc}')])
+        result.errors.sort()
+        result.total_seconds = time.perf_counter() - started
+        return result
+    result.created = len(users)
+    result.total_seconds = time.perf_counter() - started
+    return result
+
+
+def _create(users, cleaned, usernames, task_ids) -> list:
+    """Insert ``users`` with their profiles and tasks in one transaction."""
+    with transaction.atomic():
+        users = User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        if users and users[0].pk is None:
+            # Backends that cannot return ids from bulk inserts
+            ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+        Profile.objects.bulk_create(
+            [
+                Profile(
+                    user=user,
+                    department=data['department'],
+                    mentor_name=data['mentor_name'],
+                    city=data['city'],
+                    date_joined_company=data['date_joined_company'],
+                    avatar=data['avatar'],
+                )
+                for user, (_, data) in zip(users, cleaned)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        user_tasks = []
+        for user in users:
+            user_tasks.extend(UserTask(user=user, task_id=task_id) for task_id in task_ids)
+            if len(user_tasks) >= BATCH_SIZE * 5:
+                UserTask.objects.bulk_create(user_tasks, batch_size=BATCH_SIZE)
+                user_tasks = []
+        UserTask.objects.bulk_create(user_tasks, batch_size=BATCH_SIZE)
+    return users
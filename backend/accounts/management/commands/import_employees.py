@@ -0,0 +1,42 @@
+"""
+Create employees in bulk from a CSV or JSON Lines file.
+
+See ``accounts.importing`` for the accepted columns.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.importing import UnreadableFileError, format_for, import_employees, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import employees (users, profiles and integration tasks) from a CSV or JSONL file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--workers', type=int, help='Password hashing processes; one per core by default.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file without creating anything.')
+
+    def handle(self, *args, **options):
+        try:
+            stream = open(options['path'], 'rb')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        with stream:
+            rows = read_rows(stream, options['format'] or format_for(options['path']))
+            try:
+                result = import_employees(rows, workers=options['workers'], dry_run=options['dry_run'])
+            except UnreadableFileError as exc:
+                raise CommandError(str(exc))
+        for line, message in result.errors[:50]:
+            self.stderr.write(f'Line {line}: {message}')
+        if len(result.errors) > 50:
+            self.stderr.write(f'... and {len(result.errors) - 50} more errors')
+        if options['dry_run']:
+            self.stdout.write(f'{result.valid} valid row(s), {len(result.errors)} error(s).')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {result.created} employee(s) in {result.total_seconds:.1f} s '
+            f'({result.rows_per_second:.0f} rows/s; {result.hashed} password(s) hashed '
+            f'in {result.hashing_seconds:.1f} s), {len(result.errors)} row(s) skipped.'
+        ))
@@ -6,6 +6,7 @@ the currently authenticated user's profile. Authentication is handled
 via JSON Web Tokens provided by ``rest_framework_simplejwt``.
 """
 from rest_framework import generics, permissions
+from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth.models import User
 
 from .serializers import RegisterSerializer, UserSerializer
@@ -18,6 +19,13 @@ class RegisterView(generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = RegisterSerializer
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'register'
+
+
+class LoginView(TokenObtainPairView):
+    """Obtain a JWT pair; rate limited because password checks are costly."""
+
+    throttle_scope = 'login'
 
 
 class ProfileView(generics.RetrieveUpdateAPIView):
@@ -0,0 +1,208 @@
+"""
+Declarative achievements.
+
+An ``Achievement`` with a ``metric`` is a rule: it is earned by every
+user whose metric reaches its ``threshold``, for example five completed
+courses or a quiz passed with at least 90 percent. Staff add rules in
+the admin; no code names them.
+
+Rules are evaluated incrementally. The completion paths call
+``evaluate`` with the users and the kind of event that changed their
+progress, and only the rules over metrics that event moves are
+checked: one query for the awards the users already hold, one grouped
+query per metric still to reach, and one insert per award, so that an
+award a concurrent request made first is not announced twice. The rule
+definitions come from the cache and are dropped whenever an achievement
+is saved or deleted, so the per-request path never reads ``Achievement``.
+
+Saving a rule queues a job, see ``courses.jobs``, that evaluates it for
+all users at once: one grouped query per metric over the whole table,
+and the awards inserted in bulk. ``manage.py award_achievements`` does
+the same on demand. Awards made in batch are not pushed to activity
+streams.
+"""
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, Max
+from django.db.models.signals import post_delete, post_save
+
+from . import jobs
+from .activity_stream import publish_on_commit
+from .models import Achievement, Progress, QuizAttempt, QuizResult, UserAchievement, UserStreak, UserTask
+from .serializers import AchievementSerializer
+
+# Events passed to evaluate
+LESSON = 'lesson'
+QUIZ = 'quiz'
+TASK = 'task'
+STREAK = 'streak'
+
+AWARD_TASK = 'courses.award_achievements'
+CACHE_KEY = 'achievement-rules'
+BATCH_SIZE = 1000
+
+
+class Rule(NamedTuple):
+    id: int
+    code: str
+    name: str
+    description: str
+    metric: str
+    threshold: int
+
+
+def _courses_completed():
+    finished = Progress.objects.with_counts().filter(lesson_count__gt=0, completed_count__gte=F('lesson_count'))
+    return finished, 'user_id', Count('id')
+
+
+def _lessons_completed():
+    return Progress.completed_lessons.through.objects.all(), 'progress__user_id', Count('*')
+
+
+def _quizzes_submitted():
+    return QuizResult.objects.all(), 'user_id', Count('id')
+
+
+def _quiz_score():
+    percent = F('score') * 100 / F('total')
+    return QuizAttempt.objects.filter(total__gt=0), 'user_id', Max(percent, output_field=IntegerField())
+
+
+def _longest_streak():
+    return UserStreak.objects.all(), 'user_id', Max('longest_streak')
+
+
+def _tasks_completed():
+    return UserTask.objects.filter(completed=True), 'user_id', Count('id')
+
+
+# Metric: (event that moves it, function returning its rows, user column and per-user aggregate)
+METRICS = {
+    Achievement.COURSES_COMPLETED: (LESSON, _courses_completed),
+    Achievement.LESSONS_COMPLETED: (LESSON, _lessons_completed),
+    Achievement.QUIZZES_SUBMITTED: (QUIZ, _quizzes_submitted),
+    Achievement.QUIZ_SCORE: (QUIZ, _quiz_score),
+    Achievement.LONGEST_STREAK: (STREAK, _longest_streak),
+    Achievement.TASKS_COMPLETED: (TASK, _tasks_completed),
+}
+
+
+def metric_values(metric: str, user_ids=None) -> list:
+    """``(user_id, value)`` of ``metric`` for ``user_ids``, or for all users, in one grouped query."""
+    rows, user_field, value = METRICS[metric][1]()
+    if user_ids is not None:
+        rows = rows.filter(**{f'{user_field}__in': user_ids})
+    return list(rows.order_by().values(user_field).annotate(value=value).values_list(user_field, 'value'))
+
+
+def _load_rules(codes=None) -> list:
+    rows = Achievement.objects.exclude(metric='').order_by('id')
+    if codes is not None:
+        rows = rows.filter(code__in=codes)
+    return [Rule(*row) for row in rows.values_list('id', 'code', 'name', 'description', 'metric', 'threshold')]
+
+
+def rules() -> list:
+    """The achievements with a metric, from the cache when possible."""
+    cached = cache.get(CACHE_KEY)
+    if cached is None:
+        cached = _load_rules()
+        cache.set(CACHE_KEY, cached, getattr(settings, 'ACHIEVEMENT_RULES_CACHE_SECONDS', 3600))
+    return cached
+
+
+def candidates(rules_to_check, user_ids=None) -> list:
+    """
+    The ``(user_id, rule)`` pairs of ``rules_to_check`` met by the users
+    of ``user_ids``, or by all users, who do not hold them yet.
+    """
+    earned = UserAchievement.objects.filter(achievement_id__in=[rule.id for rule in rules_to_check])
+    if user_ids is not None:
+        earned = earned.filter(user_id__in=user_ids)
+    earned = set(earned.values_list('user_id', 'achievement_id'))
+    if user_ids is not None:
+        rules_to_check = [
+            rule for rule in rules_to_check if any((user_id, rule.id) not in earned for user_id in user_ids)
+        ]
+    pairs = []
+    for metric in {rule.metric for rule in rules_to_check}:
+        values = metric_values(metric, user_ids)
+        for rule in rules_to_check:
+            if rule.metric == metric:
+                pairs.extend(
+                    (user_id, rule)
+                    for user_id, value in values
+                    if value >= rule.threshold and (user_id, rule.id) not in earned
+                )
+    return pairs
+
+
+def evaluate(user_ids, event: str) -> list:
+    """
+    Award the rules moved by ``event`` that ``user_ids`` now meet and
+    push the awards to their activity streams once the transaction
+    commits. Returns the ``(user_id, rule)`` pairs awarded.
+    """
+    triggered = [rule for rule in rules() if METRICS[rule.metric][0] == event]
+    user_ids = list(user_ids)
+    if not triggered or not user_ids:
+        return []
+    awarded = []
+    for user_id, rule in candidates(triggered, user_ids):
+        # A handful of pairs at most; a savepoint each tells which ones a
+        # concurrent request awarded first, so they are announced once
+        try:
+            with transaction.atomic():
+                UserAchievement.objects.create(user_id=user_id, achievement_id=rule.id)
+        except IntegrityError:
+            continue
+        awarded.append((user_id, rule))
+        achievement = Achievement(id=rule.id, code=rule.code, name=rule.name, description=rule.description)
+        publish_on_commit(user_id, 'achievement', AchievementSerializer(
+            achievement, context={'awarded_ids': {rule.id}}
+        ).data)
+    return awarded
+
+
+def award_all(codes=None) -> int:
+    """Evaluate the rules with ``codes``, all by default, for every user. Returns the number of awards."""
+    # Read from the database: a worker's cache may not have seen the change
+    selected = _load_rules(codes)
+    if not selected:
+        return 0
+    pairs = candidates(selected)
+    held = UserAchievement.objects.filter(achievement_id__in=[rule.id for rule in selected])
+    before = held.count()
+    for start in range(0, len(pairs), BATCH_SIZE):
+        UserAchievement.objects.bulk_create(
+            [UserAchievement(user_id=user_id, achievement_id=rule.id) for user_id, rule in pairs[start:start + BATCH_SIZE]],
+            # Requests award the same rules meanwhile
+            ignore_conflicts=True,
+        )
+    # Pairs skipped as conflicts are not counted
+    return max(held.count() - before, 0)
+
+
+@jobs.task(AWARD_TASK)
+def award_task(code: str) -> None:
+    award_all([code])
+
+
+def rule_saved(sender, instance, raw=False, **kwargs) -> None:
+    cache.delete(CACHE_KEY)
+    if instance.metric and not raw:
+        # Users who already meet a new or changed rule get it in the background
+        jobs.enqueue_on_commit(AWARD_TASK, {'code': instance.code}, key=f'{AWARD_TASK}:{instance.code}')
+
+
+def rule_deleted(sender, instance, **kwargs) -> None:
+    cache.delete(CACHE_KEY)
+
+
+def connect_signals() -> None:
+    post_save.connect(rule_saved, sender=Achievement, dispatch_uid='achievement_rule_saved')
+    post_delete.connect(rule_deleted, sender=Achievement, dispatch_uid='achievement_rule_deleted')
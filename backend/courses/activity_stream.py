@@ -0,0 +1,149 @@
+"""
+Per-user publish/subscribe for the server-sent activity feed.
+
+Write paths publish small JSON payloads (new ``ActivityLog`` entries,
+achievement awards and task toggles) with ``publish_on_commit``. Open
+event streams subscribe per user and receive them as they happen.
+
+The broker class is named by ``ACTIVITY_STREAM_BROKER``. The default
+``InProcessBroker`` keeps everything in the memory of the current
+process, so a stream only sees events published by the same process.
+Deployments with several worker processes should plug in a broker
+backed by a shared service that implements the same three methods.
+
+Every user has a ring buffer of the last ``ACTIVITY_STREAM_BUFFER``
+events. A stream reconnecting with ``Last-Event-ID`` is replayed the
+events it missed. If they are no longer buffered, or the id comes from
+another broker instance, it is sent a ``resync`` event and should
+reload the feed over the REST endpoints once.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Event:
+    id: str
+    kind: str
+    data: dict
+
+
+class Subscription:
+    """Events of one user delivered to one open stream."""
+
+    def __init__(self, broker, user_id, backlog, resync: bool, cursor: str):
+        self.broker = broker
+        self.user_id = user_id
+        self.backlog = backlog
+        self.resync = resync
+        # Id to resume from when no event has been sent yet
+        self.cursor = cursor
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def deliver(self, event: Event) -> None:
+        # Called from whichever thread published the event
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+    async def next(self, timeout: float):
+        """Return the next event, or None if none arrives within ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Thread-safe in-memory broker with a bounded event buffer per user."""
+
+    # Buffers of the least recently active users are dropped beyond this
+    MAX_USERS = 10000
+
+    def __init__(self):
+        self.buffer_size = getattr(settings, 'ACTIVITY_STREAM_BUFFER', 50)
+        # Event ids are '<instance>-<sequence>', so ids of other instances are recognised
+        self.instance = format(time.time_ns(), 'x')
+        self.sequence = 0
+        self.lock = threading.Lock()
+        self.buffers = OrderedDict()
+        self.subscriptions = {}
+
+    def publish(self, user_id, kind: str, data: dict) -> Event:
+        with self.lock:
+            self.sequence += 1
+            sequence = self.sequence
+            event = Event(f'{self.instance}-{sequence}', kind, data)
+            buffer = self.buffers.get(user_id)
+            if buffer is None:
+                buffer = self.buffers[user_id] = deque(maxlen=self.buffer_size)
+                if len(self.buffers) > self.MAX_USERS:
+                    self.buffers.popitem(last=False)
+            else:
+                self.buffers.move_to_end(user_id)
+            buffer.append((sequence, event))
+            subscriptions = list(self.subscriptions.get(user_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, user_id, last_event_id=None) -> Subscription:
+        """Must be called from the event loop that will consume the subscription."""
+        with self.lock:
+            backlog, resync = self._missed(user_id, last_event_id)
+            subscription = Subscription(self, user_id, backlog, resync, f'{self.instance}-{self.sequence}')
+            self.subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.user_id]
+
+    def _missed(self, user_id, last_event_id):
+        """Return the buffered events after ``last_event_id`` and whether a resync is needed."""
+        if not last_event_id:
+            return [], False
+        instance, _, sequence = last_event_id.partition('-')
+        if instance != self.instance or not sequence.isdigit():
+            return [], True
+        sequence = int(sequence)
+        buffered = self.buffers.get(user_id, ())
+        # All users share the sequence, so a gap only shows once the buffer has overflowed
+        if len(buffered) == self.buffer_size and buffered[0][0] > sequence + 1:
+            return [], True
+        return [event for event_sequence, event in buffered if event_sequence > sequence], False
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'ACTIVITY_STREAM_BROKER', 'courses.activity_stream.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def publish_on_commit(user_id, kind: str, data: dict) -> None:
+    """Publish once the current transaction commits, so streams never see rolled back rows."""
+    transaction.on_commit(lambda: get_broker().publish(user_id, kind, data))
@@ -1,7 +1,21 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.functional import cached_property
 
 from .models import (
     Course,
+    CourseStats,
+    CourseAnalytics,
+    LessonFunnel,
+    CohortRetention,
+    LearningEvent,
+    LessonTimeDaily,
+    UserDailyActivity,
+    UserStreak,
     Module,
     Lesson,
     Progress,
@@ -9,17 +23,89 @@ from .models import (
     UserTask,
     ActivityLog,
     CourseReview,
+    CourseAssignment,
+    Enrollment,
     Quiz,
+    QuestionPool,
     Question,
     Answer,
     QuizResult,
+    QuizAttempt,
+    QuizDraw,
+    QuizAttemptAnswer,
+    QuestionStats,
+    AnswerStats,
     Achievement,
+    CatalogChange,
+    JournalEntry,
+    Job,
     UserAchievement,
     FAQCategory,
     FAQItem,
 )
 
 
+def estimate_row_count(queryset) -> int:
+    """
+    Cheaply estimate the number of rows in the queryset's table using the
+    planner statistics of the database, or the highest primary key where
+    the backend keeps none.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+            if row and row[0] >= 0:
+                return row[0]
+        elif connection.vendor == 'mysql':
+            cursor.execute(
+                'SELECT table_rows FROM information_schema.tables '
+                'WHERE table_schema = DATABASE() AND table_name = %s',
+                [table],
+            )
+            row = cursor.fetchone()
+            if row and row[0] is not None:
+                return row[0]
+    return queryset.order_by().aggregate(highest=Max('pk'))['highest'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that skips the exact ``COUNT(*)`` of unfiltered changelists
+    on large tables, using ``estimate_row_count`` above
+    ``ADMIN_ESTIMATED_COUNT_THRESHOLD`` rows.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset)
+            if estimate > settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Base admin for tables that grow with the number of learners."""
+
+    paginator = EstimatedCountPaginator
+    # Avoid a second, unfiltered COUNT(*) on filtered changelists
+    show_full_result_count = False
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """Admin for tables maintained by the application rather than by staff."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 class LessonInline(admin.TabularInline):
     model = Lesson
     extra = 0
@@ -36,19 +122,65 @@ class ModuleInline(admin.TabularInline):
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
-    list_display = ('title', 'role', 'created_at', 'total_lessons')
-    search_fields = ('title', 'description')
+    list_display = ('title', 'role', 'created_at', 'lesson_total', 'enrolled', 'average_rating')
+    list_select_related = ('stats',)
+    search_fields = ('^title', 'description')
     list_filter = ('role',)
     inlines = [ModuleInline, LessonInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(lesson_count=Count('lessons'))
+
+    @admin.display(description='Total lessons', ordering='lesson_count')
+    def lesson_total(self, obj):
+        return obj.lesson_count
+
+    @admin.display(description='Enrolled', ordering='stats__enrolled_count')
+    def enrolled(self, obj):
+        course_stats = getattr(obj, 'stats', None)
+        return course_stats.enrolled_count if course_stats else 0
+
+    @admin.display(description='Average rating')
+    def average_rating(self, obj):
+        course_stats = getattr(obj, 'stats', None)
+        return course_stats.average_rating() if course_stats else None
+
+
+@admin.register(CourseStats)
+class CourseStatsAdmin(ReadOnlyAdmin):
+    list_display = (
+        'course',
+        'enrolled_count',
+        'completed_count',
+        'review_count',
+        'average_rating',
+        'quiz_attempt_count',
+        'average_quiz_score',
+        'updated_at',
+    )
+    list_select_related = ('course',)
+    search_fields = ('course__title',)
+
 
 @admin.register(Progress)
-class ProgressAdmin(admin.ModelAdmin):
+class ProgressAdmin(LargeTableAdmin):
     list_display = ('user', 'course', 'progress_percentage')
-    search_fields = ('user__username', 'course__title')
+    list_select_related = ('user', 'course')
+    search_fields = ('^user__username', '^course__title')
     list_filter = ('course',)
     filter_horizontal = ('completed_lessons',)
 
+    def get_queryset(self, request):
+        # Counts are annotated so progress_percentage runs no queries per row
+        return super().get_queryset(request).with_counts()
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Completed lessons edited here must be mirrored into the bitmap
+        progress = form.instance
+        progress.rebuild_bitmap()
+        progress.save(update_fields=['completed_bitmap'])
+
 
 @admin.register(IntegrationTask)
 class IntegrationTaskAdmin(admin.ModelAdmin):
@@ -57,24 +189,42 @@ class IntegrationTaskAdmin(admin.ModelAdmin):
 
 
 @admin.register(UserTask)
-class UserTaskAdmin(admin.ModelAdmin):
+class UserTaskAdmin(LargeTableAdmin):
     list_display = ('user', 'task', 'completed', 'completed_at')
+    list_select_related = ('user', 'task')
     list_filter = ('completed', 'task')
-    search_fields = ('user__username', 'task__description')
+    search_fields = ('^user__username', 'task__description')
 
 
 @admin.register(ActivityLog)
-class ActivityLogAdmin(admin.ModelAdmin):
+class ActivityLogAdmin(LargeTableAdmin):
     list_display = ('user', 'action', 'timestamp')
-    search_fields = ('user__username', 'action')
+    list_select_related = ('user',)
+    search_fields = ('^user__username', 'action')
     list_filter = ('timestamp',)
 
 
 @admin.register(CourseReview)
-class CourseReviewAdmin(admin.ModelAdmin):
+class CourseReviewAdmin(LargeTableAdmin):
     list_display = ('user', 'course', 'rating', 'created_at')
+    list_select_related = ('user', 'course')
     list_filter = ('rating', 'created_at')
-    search_fields = ('user__username', 'course__title')
+    search_fields = ('^user__username', '^course__title')
+
+
+@admin.register(CourseAssignment)
+class CourseAssignmentAdmin(ReadOnlyAdmin):
+    list_display = ('course', 'department', 'assignee_count', 'due_date', 'assigned_by', 'created_at')
+    list_select_related = ('course', 'assigned_by')
+    list_filter = ('department',)
+
+
+@admin.register(Enrollment)
+class EnrollmentAdmin(LargeTableAdmin):
+    list_display = ('user', 'course', 'due_date', 'assigned_at')
+    list_select_related = ('user', 'course')
+    list_filter = ('due_date',)
+    search_fields = ('^user__username', '^course__title')
 
 
 class AnswerInline(admin.TabularInline):
@@ -87,29 +237,89 @@ class QuestionInline(admin.StackedInline):
     extra = 0
     inlines = [AnswerInline]
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'pool':
+            # Only the pools of the quiz being edited
+            quiz_id = request.resolver_match.kwargs.get('object_id')
+            kwargs['queryset'] = QuestionPool.objects.filter(quiz_id=quiz_id) if quiz_id else QuestionPool.objects.none()
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class QuestionPoolInline(admin.TabularInline):
+    model = QuestionPool
+    extra = 0
+
 
 @admin.register(Quiz)
 class QuizAdmin(admin.ModelAdmin):
     list_display = ('course', 'title')
-    inlines = [QuestionInline]
+    inlines = [QuestionPoolInline, QuestionInline]
 
 
 @admin.register(QuizResult)
-class QuizResultAdmin(admin.ModelAdmin):
+class QuizResultAdmin(LargeTableAdmin):
     list_display = ('user', 'quiz', 'score', 'created_at')
-    search_fields = ('user__username', 'quiz__course__title')
+    list_select_related = ('user', 'quiz__course')
+    search_fields = ('^user__username', '^quiz__course__title')
+
+
+class QuizAttemptAnswerInline(admin.TabularInline):
+    model = QuizAttemptAnswer
+    extra = 0
+    can_delete = False
+    fields = ('question', 'answer', 'is_correct')
+    readonly_fields = fields
+
+
+@admin.register(QuizAttempt)
+class QuizAttemptAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = ('user', 'quiz', 'score', 'total', 'created_at')
+    list_select_related = ('user', 'quiz__course')
+    search_fields = ('^user__username', '^quiz__course__title')
+    inlines = [QuizAttemptAnswerInline]
+
+
+@admin.register(QuizDraw)
+class QuizDrawAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = ('user', 'quiz', 'created_at', 'submitted_at', 'attempt')
+    list_select_related = ('user', 'quiz__course', 'attempt')
+    search_fields = ('^user__username', '^quiz__course__title')
+
+
+@admin.register(QuestionStats)
+class QuestionStatsAdmin(ReadOnlyAdmin):
+    list_display = ('question', 'quiz', 'served_count', 'correct_count', 'difficulty', 'discrimination', 'updated_at')
+    list_select_related = ('question__quiz__course',)
+    list_filter = ('question__quiz',)
+
+    @admin.display(description='Quiz', ordering='question__quiz')
+    def quiz(self, obj):
+        return obj.question.quiz
+
+
+@admin.register(AnswerStats)
+class AnswerStatsAdmin(ReadOnlyAdmin):
+    list_display = ('answer', 'question', 'pick_count')
+    list_select_related = ('answer__question',)
+    list_filter = ('answer__question__quiz',)
+
+    @admin.display(description='Question')
+    def question(self, obj):
+        return obj.answer.question
 
 
 @admin.register(Achievement)
 class AchievementAdmin(admin.ModelAdmin):
-    list_display = ('code', 'name')
+    list_display = ('code', 'name', 'metric', 'threshold')
+    list_filter = ('metric',)
     search_fields = ('code', 'name')
 
 
 @admin.register(UserAchievement)
-class UserAchievementAdmin(admin.ModelAdmin):
+class UserAchievementAdmin(LargeTableAdmin):
     list_display = ('user', 'achievement', 'awarded_at')
-    search_fields = ('user__username', 'achievement__name')
+    list_select_related = ('user', 'achievement')
+    search_fields = ('^user__username', 'achievement__name')
 
 
 @admin.register(FAQCategory)
@@ -122,3 +332,95 @@ class FAQItemAdmin(admin.ModelAdmin):
     list_display = ('question', 'category')
     search_fields = ('question',)
     list_filter = ('category',)
+
+
+@admin.register(LearningEvent)
+class LearningEventAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = ('id', 'user', 'kind', 'course', 'lesson', 'task', 'value', 'occurred_at')
+    list_select_related = ('user', 'course', 'lesson', 'task')
+    list_filter = ('kind',)
+    search_fields = ('^user__username',)
+
+
+@admin.register(LessonTimeDaily)
+class LessonTimeDailyAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = ('user', 'course', 'lesson', 'day', 'seconds', 'updated_at')
+    list_select_related = ('user', 'course', 'lesson__course')
+    list_filter = ('day',)
+    search_fields = ('^user__username',)
+
+
+@admin.register(UserDailyActivity)
+class UserDailyActivityAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = ('user', 'day', 'minutes', 'lessons_completed', 'quizzes_submitted')
+    list_select_related = ('user',)
+    list_filter = ('day',)
+    search_fields = ('^user__username',)
+
+
+@admin.register(UserStreak)
+class UserStreakAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = ('user', 'current_streak', 'longest_streak', 'last_active_day')
+    list_select_related = ('user',)
+    search_fields = ('^user__username',)
+
+
+@admin.register(CourseAnalytics)
+class CourseAnalyticsAdmin(ReadOnlyAdmin):
+    list_display = (
+        'course',
+        'learners',
+        'completers',
+        'median_completion_seconds',
+        'p90_completion_seconds',
+        'computed_at',
+    )
+    list_select_related = ('course',)
+
+
+@admin.register(LessonFunnel)
+class LessonFunnelAdmin(ReadOnlyAdmin):
+    list_display = ('lesson', 'course', 'position', 'reached', 'dropoff_rate', 'computed_at')
+    list_select_related = ('lesson__course', 'course')
+    list_filter = ('course',)
+
+
+@admin.register(CohortRetention)
+class CohortRetentionAdmin(ReadOnlyAdmin):
+    list_display = ('cohort_week', 'week_offset', 'cohort_size', 'active_users', 'retention', 'computed_at')
+    list_filter = ('cohort_week',)
+
+
+@admin.register(CatalogChange)
+class CatalogChangeAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = ('id', 'model', 'object_id', 'deleted', 'changed_at')
+    list_filter = ('model', 'deleted')
+
+
+@admin.register(JournalEntry)
+class JournalEntryAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = ('id', 'user', 'key', 'kind', 'status', 'occurred_at', 'received_at')
+    list_select_related = ('user',)
+    list_filter = ('kind', 'status')
+    search_fields = ('^user__username',)
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'locked_by', 'finished_at')
+    list_filter = ('status', 'name')
+    actions = ['retry']
+
+    @admin.action(description='Queue selected failed jobs again')
+    def retry(self, request, queryset):
+        retried = 0
+        for job in queryset.filter(status=Job.FAILED):
+            job.status, job.attempts, job.run_at = Job.QUEUED, 0, timezone.now()
+            try:
+                with transaction.atomic():
+                    job.save(update_fields=['status', 'attempts', 'run_at'])
+            except IntegrityError:
+                # A job of the same key is already queued
+                continue
+            retried += 1
+        self.message_user(request, f'Queued {retried} job(s) again.', messages.SUCCESS)
@@ -0,0 +1,221 @@
+"""
+Vectorized learning analytics over the ``LearningEvent`` stream.
+
+Events are read in primary-key order in fixed-size chunks as plain
+integer tuples, never as model instances, and packed into NumPy arrays.
+All statistics are computed with sorts and grouped reductions over those
+arrays, so memory stays at a few bytes per event and the run time is
+dominated by a handful of O(n log n) sorts.
+
+This module requires NumPy, listed in ``requirements.txt``. It is only
+imported by the ``analyze_learning_events`` management command.
+"""
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CohortRetention, Course, CourseAnalytics, LearningEvent, Lesson, LessonFunnel
+
+WEEK_SECONDS = 7 * 24 * 60 * 60
+# The Unix epoch fell on a Thursday; shift so that weeks start on Monday
+WEEK_SHIFT = 3 * 24 * 60 * 60
+COLUMNS = ('user', 'kind', 'course', 'lesson', 'occurred_at')
+
+
+def load_events(chunk_size: int = 200_000) -> dict:
+    """Load every event into one integer array per column."""
+    chunks = {name: [] for name in COLUMNS}
+    last_id = 0
+    while True:
+        rows = list(
+            LearningEvent.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list(
+                'id',
+                'user_id',
+                'kind',
+                Coalesce('course_id', Value(0)),
+                Coalesce('lesson_id', Value(0)),
+                'occurred_at',
+            )[:chunk_size]
+        )
+        if not rows:
+            break
+        block = np.array(rows, dtype=np.int64)
+        last_id = int(block[-1, 0])
+        for index, name in enumerate(COLUMNS, start=1):
+            chunks[name].append(block[:, index])
+        if len(rows) < chunk_size:
+            break
+    return {
+        name: np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        for name, parts in chunks.items()
+    }
+
+
+def group_reduce(keys, values, ufunc):
+    """Return the unique ``keys`` and ``ufunc`` reduced ``values`` per key."""
+    if not len(keys):
+        return keys, values
+    order = np.argsort(keys, kind='stable')
+    keys, values = keys[order], values[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    return keys[starts], ufunc.reduceat(values, starts)
+
+
+def completion_times(events, lesson_course):
+    """
+    Seconds from a learner's first event in a course to the first
+    completion of its last lesson, for learners who completed every
+    current lesson. Returns ``{course_id: durations}`` and
+    ``{course_id: learner_count}``.
+    """
+    has_course = events['course'] > 0
+    if not has_course.any():
+        return {}, {}
+    catalog_lessons = np.fromiter(lesson_course.keys(), dtype=np.int64, count=len(lesson_course))
+    catalog_courses = np.fromiter(lesson_course.values(), dtype=np.int64, count=len(lesson_course))
+    span = int(max(events['course'].max(), catalog_courses.max(initial=0))) + 1
+    lesson_span = int(max(events['lesson'].max(), catalog_lessons.max(initial=0))) + 1
+    # Lookup tables indexed by id
+    course_of_lesson = np.zeros(lesson_span, dtype=np.int64)
+    course_of_lesson[catalog_lessons] = catalog_courses
+    lessons_in_course = np.bincount(catalog_courses, minlength=span)
+
+    user, course = events['user'][has_course], events['course'][has_course]
+    pair_keys, started = group_reduce(user * span + course, events['occurred_at'][has_course], np.minimum)
+    learners = np.bincount(pair_keys % span, minlength=span)
+
+    done = (events['kind'] == LearningEvent.LESSON_COMPLETED) & (course_of_lesson[events['lesson']] > 0)
+    first_keys, first_done = group_reduce(
+        events['user'][done] * lesson_span + events['lesson'][done], events['occurred_at'][done], np.minimum
+    )
+    done_keys = (first_keys // lesson_span) * span + course_of_lesson[first_keys % lesson_span]
+    course_keys, finished_at = group_reduce(done_keys, first_done, np.maximum)
+    _, completed = group_reduce(done_keys, np.ones_like(first_done), np.add)
+
+    complete = completed >= lessons_in_course[course_keys % span]
+    course_keys = course_keys[complete]
+    durations = finished_at[complete] - started[np.searchsorted(pair_keys, course_keys)]
+    # Split the durations by course
+    completed_course = course_keys % span
+    order = np.argsort(completed_course, kind='stable')
+    completed_course, durations = completed_course[order], durations[order]
+    starts = np.flatnonzero(np.r_[True, completed_course[1:] != completed_course[:-1]]) if len(order) else []
+    result = {
+        int(completed_course[first]): part
+        for first, part in zip(starts, np.split(durations, starts[1:]))
+    }
+    return result, {int(course_id): int(learners[course_id]) for course_id in np.flatnonzero(learners)}
+
+
+def lesson_reach(events):
+    """Number of distinct learners who completed each lesson."""
+    done = events['kind'] == LearningEvent.LESSON_COMPLETED
+    if not done.any():
+        return {}
+    lesson_span = int(events['lesson'].max()) + 1
+    pairs = np.unique(events['user'][done] * lesson_span + events['lesson'][done])
+    lessons, counts = np.unique(pairs % lesson_span, return_counts=True)
+    return dict(zip(lessons.tolist(), counts.tolist()))
+
+
+def cohort_curves(events):
+    """
+    Group learners by the week of their first event and count, for each
+    later week, how many of them were active. Returns rows of
+    ``(cohort_week_start_seconds, week_offset, cohort_size, active_users)``.
+    """
+    if not len(events['user']):
+        return []
+    users, first_seen = group_reduce(events['user'], events['occurred_at'], np.minimum)
+    cohort = (first_seen + WEEK_SHIFT) // WEEK_SECONDS
+    user_index = np.searchsorted(users, events['user'])
+    event_week = (events['occurred_at'] + WEEK_SHIFT) // WEEK_SECONDS
+    offset = event_week - cohort[user_index]
+    base = int(cohort.min())
+    offset_span = int(offset.max()) + 1
+    user_span = len(users)
+    active = np.unique(((cohort[user_index] - base) * offset_span + offset) * user_span + user_index)
+    cohort_offset, active_counts = np.unique(active // user_span, return_counts=True)
+    cohort_ids, cohort_sizes = np.unique(cohort - base, return_counts=True)
+    sizes = dict(zip(cohort_ids.tolist(), cohort_sizes.tolist()))
+    rows = []
+    for key, count in zip(cohort_offset.tolist(), active_counts.tolist()):
+        cohort_id, week_offset = divmod(key, offset_span)
+        week_start = (cohort_id + base) * WEEK_SECONDS - WEEK_SHIFT
+        rows.append((week_start, week_offset, sizes[cohort_id], count))
+    return rows
+
+
+def run(chunk_size: int = 200_000) -> dict:
+    """Recompute every summary table and return row counts."""
+    events = load_events(chunk_size)
+    lessons = list(Lesson.objects.order_by('course_id', 'order', 'id').values_list('id', 'course_id'))
+    lesson_course = dict(lessons)
+    durations, learners = completion_times(events, lesson_course)
+    reach = lesson_reach(events)
+    cohorts = cohort_curves(events)
+    now = timezone.now()
+
+    analytics = []
+    for course_id in set(learners) & set(Course.objects.values_list('id', flat=True)):
+        values = durations.get(course_id)
+        analytics.append(CourseAnalytics(
+            course_id=course_id,
+            learners=learners[course_id],
+            completers=len(values) if values is not None else 0,
+            median_completion_seconds=int(np.median(values)) if values is not None else None,
+            p90_completion_seconds=int(np.percentile(values, 90)) if values is not None else None,
+            computed_at=now,
+        ))
+
+    funnel = []
+    by_course = defaultdict(list)
+    for lesson_id, course_id in lessons:
+        by_course[course_id].append(lesson_id)
+    for course_id, lesson_ids in by_course.items():
+        for position, lesson_id in enumerate(lesson_ids):
+            reached = reach.get(lesson_id, 0)
+            following = reach.get(lesson_ids[position + 1], 0) if position + 1 < len(lesson_ids) else None
+            dropoff = None
+            if following is not None and reached:
+                dropoff = max(reached - following, 0) / reached
+            funnel.append(LessonFunnel(
+                lesson_id=lesson_id,
+                course_id=course_id,
+                position=position,
+                reached=reached,
+                dropoff_rate=dropoff,
+                computed_at=now,
+            ))
+
+    retention = [
+        CohortRetention(
+            cohort_week=datetime.fromtimestamp(week_start, tz=dt_timezone.utc).date(),
+            week_offset=offset,
+            cohort_size=size,
+            active_users=active,
+            computed_at=now,
+        )
+        for week_start, offset, size, active in cohorts
+    ]
+
+    with transaction.atomic():
+        CourseAnalytics.objects.all().delete()
+        LessonFunnel.objects.all().delete()
+        CohortRetention.objects.all().delete()
+        CourseAnalytics.objects.bulk_create(analytics, batch_size=1000)
+        LessonFunnel.objects.bulk_create(funnel, batch_size=1000)
+        CohortRetention.objects.bulk_create(retention, batch_size=1000)
+    return {
+        'events': len(events['user']),
+        'courses': len(analytics),
+        'lessons': len(funnel),
+        'cohort_points': len(retention),
+    }
@@ -0,0 +1,22 @@
+"""
+Application configuration for the courses app.
+
+``ready`` connects the change tracking of catalog content, see
+``courses.catalog_sync``, the publishing of catalog snapshots, see
+``courses.snapshots``, and the invalidation of cached question pools,
+see ``courses.question_pools``, and of cached achievement rules, see
+``courses.achievements``. Importing these modules also registers their
+tasks with the job queue, see ``courses.jobs``.
+"""
+from django.apps import AppConfig
+
+
+class CoursesConfig(AppConfig):
+    name = 'courses'
+
+    def ready(self):
+        from . import achievements, catalog_sync, question_pools, snapshots
+        catalog_sync.connect_signals()
+        snapshots.connect_signals()
+        question_pools.connect_signals()
+        achievements.connect_signals()
@@ -0,0 +1,80 @@
+"""
+Bulk course assignment.
+
+``assign`` enrols a whole department (``Profile.department``) or a list
+of users in a course at once: it records a ``CourseAssignment``, upserts
+an ``Enrollment`` with the due date for every assignee and creates
+their missing ``Progress`` records, so learners find the course started
+instead of each having to open it. Rows are written with one
+``bulk_create`` per table and chunk of ``CHUNK_SIZE`` users, which keeps
+assigning tens of thousands of users to a few seconds.
+
+Assigning a course again updates the due date of the users it already
+reached. Open assignments come first in the recommendations, see
+``courses.views.recommended_courses``.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import stats
+from .models import Course, CourseAssignment, Enrollment, Progress
+
+CHUNK_SIZE = 1000
+
+
+def _chunks(items, size: int = CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def assignee_ids(department: str = '', user_ids=None) -> list:
+    """Ids of the active users of ``department``, or of ``user_ids`` that exist and are active."""
+    users = User.objects.filter(is_active=True).order_by('id')
+    if department:
+        return list(users.filter(profile__department__iexact=department).values_list('id', flat=True))
+    ids = []
+    for chunk in _chunks(sorted(set(user_ids or ()))):
+        ids.extend(users.filter(id__in=chunk).values_list('id', flat=True))
+    return ids
+
+
+def assign(course: Course, department: str = '', user_ids=None, due_date=None, assigned_by=None):
+    """
+    Assign ``course`` to ``department`` or to ``user_ids``. Returns the
+    ``CourseAssignment`` and the number of progress records created.
+    Raises ``ValueError`` if no active user matches.
+    """
+    ids = assignee_ids(department, user_ids)
+    if not ids:
+        raise ValueError('No active users match the assignment.')
+    now = timezone.now()
+    with transaction.atomic():
+        assignment = CourseAssignment.objects.create(
+            course=course,
+            department=department,
+            due_date=due_date,
+            assigned_by=assigned_by,
+            assignee_count=len(ids),
+        )
+        progress = Progress.objects.filter(course=course)
+        before = progress.count()
+        for chunk in _chunks(ids):
+            Enrollment.objects.bulk_create(
+                [
+                    Enrollment(user_id=user_id, course=course, assignment=assignment, due_date=due_date, assigned_at=now)
+                    for user_id in chunk
+                ],
+                update_conflicts=True,
+                unique_fields=['user', 'course'],
+                update_fields=['assignment', 'due_date', 'assigned_at'],
+            )
+            # Learners who already started the course keep their record
+            Progress.objects.bulk_create(
+                [Progress(user_id=user_id, course=course) for user_id in chunk],
+                ignore_conflicts=True,
+            )
+        created = progress.count() - before
+        if created:
+            stats.record_enrolment(course.id, created)
+    return assignment, created
@@ -0,0 +1,361 @@
+"""
+Async variants of the read-heavy course endpoints.
+
+DRF 3.14 views are synchronous, so under ASGI every request to them
+holds a worker thread for as long as its queries take. The views below
+are plain Django async views served under ``/api/courses/async/``. They
+accept the same JWT access tokens, load their data through the async
+ORM and reuse the serializers of their synchronous counterparts, so they
+return the same JSON.
+
+Independent queries are started together with ``asyncio.gather``. Django
+4.2 runs async ORM calls in the request's thread-sensitive executor, so
+the queries of one request still reach the database one after another,
+but the event loop keeps serving other requests while they run.
+"""
+import asyncio
+import contextlib
+import functools
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Avg
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from accounts.models import Profile
+from accounts.serializers import UserSerializer
+from integration_platform.db_routers import is_pinned_to_primary, reading_from_replica, replica_configured
+
+from .activity_stream import get_broker
+from .models import Achievement, ActivityLog, Course, Lesson, Module, UserAchievement, UserTask
+from .fieldsets import ALL_FIELDS, Fieldset
+from .fast_serializers import (
+    ActivityLogValuesSerializer,
+    CourseValuesSerializer,
+    ProgressValuesSerializer,
+    UserTaskValuesSerializer,
+)
+from .serializers import AchievementSerializer, CourseDetailSerializer, CourseOutlineSerializer
+from .views import (
+    CourseDetailView,
+    DashboardView,
+    ensure_user_tasks,
+    filter_courses,
+    progress_queryset,
+    recommended_courses,
+    task_progress,
+)
+
+_jwt = JWTAuthentication()
+
+
+def render(data, status_code: int = status.HTTP_200_OK, headers=None) -> HttpResponse:
+    """Render ``data`` exactly like DRF's ``JSONRenderer`` does."""
+    return HttpResponse(
+        JSONRenderer().render(data),
+        status=status_code,
+        content_type='application/json',
+        headers=headers,
+    )
+
+
+async def fetch(queryset) -> list:
+    """Evaluate ``queryset``, including its prefetches, without blocking the loop."""
+    return [obj async for obj in queryset]
+
+
+async def serialize(values_serializer_class, queryset, fieldset=ALL_FIELDS) -> list:
+    """Run a ``courses.fast_serializers`` serializer without blocking the loop."""
+    return await sync_to_async(values_serializer_class(fieldset).serialize)(queryset)
+
+
+def values_fieldset(request, values_serializer_class) -> Fieldset:
+    return Fieldset.from_params(request.GET, values_serializer_class.available(), values_serializer_class.expandable)
+
+
+def attach_prefetched(instance, name: str, objects) -> None:
+    """Fill the prefetch cache of the ``name`` relation, as ``prefetch_related`` would."""
+    queryset = getattr(instance, name).all()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    if not hasattr(instance, '_prefetched_objects_cache'):
+        instance._prefetched_objects_cache = {}
+    instance._prefetched_objects_cache[name] = queryset
+
+
+async def authenticate(request, query_token: bool = False):
+    """
+    Return the user of the request's JWT access token, or None when no
+    token is sent. Invalid tokens raise ``AuthenticationFailed``.
+
+    With ``query_token`` the token may also be passed as ``?token=``,
+    for clients such as ``EventSource`` that cannot set headers.
+    """
+    header = _jwt.get_header(request)
+    raw_token = _jwt.get_raw_token(header) if header is not None else None
+    if raw_token is None and query_token:
+        raw_token = request.GET.get('token', '').encode() or None
+    if raw_token is None:
+        return None
+    validated_token = _jwt.get_validated_token(raw_token)
+    return await sync_to_async(_jwt.get_user)(validated_token)
+
+
+def async_read_view(authenticated: bool = True, replica: bool = False, query_token: bool = False):
+    """
+    Turn an ``async def view(request, *args)`` into a GET-only endpoint.
+
+    With ``authenticated`` the JWT user is resolved first and set as
+    ``request.user``; requests without valid credentials get DRF's 401
+    response. ``query_token`` is passed on to ``authenticate``. With ``replica`` reads go to the read replica unless the
+    user is pinned to the primary, as with ``ReplicaReadMixin``. A
+    ``ValidationError`` raised by the view becomes a 400 response.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return render(
+                    {'detail': exceptions.MethodNotAllowed(request.method).detail},
+                    status.HTTP_405_METHOD_NOT_ALLOWED,
+                    headers={'Allow': 'GET, HEAD'},
+                )
+            user = None
+            if authenticated:
+                try:
+                    user = await authenticate(request, query_token)
+                    if user is None:
+                        raise exceptions.NotAuthenticated()
+                except (exceptions.AuthenticationFailed, exceptions.NotAuthenticated) as exc:
+                    detail = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+                    return render(
+                        detail,
+                        status.HTTP_401_UNAUTHORIZED,
+                        headers={'WWW-Authenticate': _jwt.authenticate_header(request)},
+                    )
+                request.user = user
+            use_replica = replica and replica_configured()
+            if use_replica and user is not None:
+                use_replica = not await sync_to_async(is_pinned_to_primary)(user)
+            with reading_from_replica() if use_replica else contextlib.nullcontext():
+                try:
+                    return await view(request, *args, **kwargs)
+                except exceptions.ValidationError as exc:
+                    return render(exc.detail, status.HTTP_400_BAD_REQUEST)
+        return wrapper
+    return decorator
+
+
+@async_read_view(authenticated=False, replica=True)
+async def course_list(request):
+    fieldset = values_fieldset(request, CourseValuesSerializer)
+    courses = filter_courses(
+        Course.objects.all().order_by('id'),
+        search=request.GET.get('search'),
+        role=request.GET.get('role'),
+    )
+    return render(await serialize(CourseValuesSerializer, courses, fieldset))
+
+
+@async_read_view(authenticated=False, replica=True)
+async def course_detail(request, pk: int):
+    outline = request.GET.get('outline', '').lower() in ('1', 'true', 'yes')
+    fieldset = Fieldset.from_params(
+        request.GET, CourseDetailSerializer.Meta.fields, CourseDetailSerializer.Meta.expandable
+    )
+    courses = CourseDetailView.narrow_course_queryset(Course.objects.all(), fieldset)
+    if fieldset.includes('has_quiz'):
+        courses = courses.select_related('quiz')
+    load_lessons = fieldset.includes('lessons') or fieldset.expands('modules')
+    lessons = Lesson.objects.filter(course_id=pk)
+    if fieldset.expands('lessons') or fieldset.expands('modules'):
+        lessons = lessons.select_related('module').defer(*Lesson.RENDERED_BODY_FIELDS)
+        if outline:
+            lessons = lessons.defer('content')
+    else:
+        lessons = lessons.only('id')
+    modules = Module.objects.filter(course_id=pk)
+    if not fieldset.expands('modules'):
+        modules = modules.only('id')
+
+    async def load(queryset, needed: bool):
+        return await fetch(queryset) if needed else []
+
+    try:
+        course, lessons, modules = await asyncio.gather(
+            courses.aget(pk=pk),
+            load(lessons, load_lessons),
+            load(modules, fieldset.includes('modules')),
+        )
+    except Course.DoesNotExist:
+        return render({'detail': exceptions.NotFound.default_detail}, status.HTTP_404_NOT_FOUND)
+    if load_lessons:
+        attach_prefetched(course, 'lessons', lessons)
+    if fieldset.includes('modules'):
+        attach_prefetched(course, 'modules', modules)
+    if fieldset.expands('modules'):
+        for module in modules:
+            attach_prefetched(module, 'lessons', [lesson for lesson in lessons if lesson.module_id == module.id])
+    context = {'fieldset': fieldset}
+    if fieldset.includes('average_rating') and not hasattr(course, 'stats'):
+        # Courses without materialized stats fall back to aggregating reviews
+        average = (await course.reviews.aaggregate(avg=Avg('rating')))['avg']
+        context['average_rating'] = round(average, 2) if average is not None else None
+    serializer_class = CourseOutlineSerializer if outline else CourseDetailSerializer
+    return render(serializer_class(course, context=context).data)
+
+
+@async_read_view()
+async def progress_list(request):
+    fieldset = values_fieldset(request, ProgressValuesSerializer)
+    return render(await serialize(ProgressValuesSerializer, progress_queryset(request.user), fieldset))
+
+
+@async_read_view()
+async def activity_list(request):
+    fieldset = values_fieldset(request, ActivityLogValuesSerializer)
+    activities = ActivityLog.objects.filter(user=request.user).order_by('-timestamp')[:10]
+    return render(await serialize(ActivityLogValuesSerializer, activities, fieldset))
+
+
+async def load_achievements(user):
+    achievements, awarded_ids = await asyncio.gather(
+        fetch(Achievement.objects.all()),
+        fetch(UserAchievement.objects.filter(user=user).values_list('achievement_id', flat=True)),
+    )
+    return AchievementSerializer(achievements, many=True, context={'awarded_ids': set(awarded_ids)}).data
+
+
+@async_read_view(replica=True)
+async def achievement_list(request):
+    return render(await load_achievements(request.user))
+
+
+@async_read_view()
+async def dashboard(request):
+    """
+    Async counterpart of ``DashboardView``. The selected sections are
+    built concurrently, so their ``timings`` overlap rather than add up.
+    """
+    sections = DashboardView.parse_sections(request.GET.get('sections'))
+    if sections is None:
+        return render(
+            {'detail': f"Unknown section. Choose from: {', '.join(DashboardView.SECTIONS)}."},
+            status.HTTP_400_BAD_REQUEST,
+        )
+    user = request.user
+    if 'profile' in sections or 'recommended' in sections:
+        user.profile, _ = await Profile.objects.aget_or_create(user=user)
+    # Shared by the progress and recommended sections
+    progress_data = None
+    if 'progress' in sections or 'recommended' in sections:
+        progress_data = asyncio.ensure_future(serialize(ProgressValuesSerializer, progress_queryset(user)))
+
+    async def build_profile():
+        return UserSerializer(user).data
+
+    async def build_progress():
+        return await progress_data
+
+    async def build_tasks():
+        await sync_to_async(ensure_user_tasks)(user)
+        tasks = await serialize(UserTaskValuesSerializer, UserTask.objects.filter(user=user).order_by('task__order'))
+        return {'progress': task_progress(tasks), 'tasks': tasks}
+
+    async def build_activities():
+        activities = ActivityLog.objects.filter(user=user).order_by('-timestamp')[:10]
+        return await serialize(ActivityLogValuesSerializer, activities)
+
+    async def build_achievements():
+        return await load_achievements(user)
+
+    async def build_recommended():
+        started_course_ids = {record['course']['id'] for record in await progress_data}
+        return await serialize(CourseValuesSerializer, recommended_courses(user, started_course_ids))
+
+    builders = {
+        'profile': build_profile,
+        'progress': build_progress,
+        'tasks': build_tasks,
+        'activities': build_activities,
+        'achievements': build_achievements,
+        'recommended': build_recommended,
+    }
+    timings = {}
+
+    async def timed(name):
+        started = time.perf_counter()
+        result = await builders[name]()
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    results = await asyncio.gather(*(timed(name) for name in sections))
+    data = dict(zip(sections, results))
+    # Keep the section order of the synchronous view
+    data['timings'] = {name: timings[name] for name in sections}
+    return render(data, headers={
+        'Server-Timing': ', '.join(f'{name};dur={duration}' for name, duration in data['timings'].items()),
+    })
+
+
+def format_event(kind: str, data, event_id=None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {kind}')
+    lines.append(f'data: {json.dumps(data, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+@async_read_view(query_token=True)
+async def activity_stream(request):
+    """
+    Server-sent events stream of the user's ``activity``, ``achievement``
+    and ``task`` events, replacing polling of ``ActivityLogListView``.
+
+    Reconnecting clients send ``Last-Event-ID`` to receive what they
+    missed, or get a ``resync`` event when that is no longer possible. A
+    comment line is sent every ``ACTIVITY_STREAM_KEEPALIVE`` seconds, and
+    the stream ends after ``ACTIVITY_STREAM_MAX_SECONDS`` so that streams
+    of vanished clients are released; ``EventSource`` reconnects and
+    resumes transparently. WSGI servers cannot hold the stream open, so
+    there each response only carries the missed events and the client
+    reconnects after the ``retry`` delay.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    user_id = request.user.id
+    keepalive = getattr(settings, 'ACTIVITY_STREAM_KEEPALIVE', 15)
+    max_seconds = getattr(settings, 'ACTIVITY_STREAM_MAX_SECONDS', 300) if isinstance(request, ASGIRequest) else 0
+
+    async def events():
+        subscription = get_broker().subscribe(user_id, last_event_id)
+        deadline = time.monotonic() + max_seconds
+        try:
+            yield f'retry: {keepalive * 1000}\n\n'
+            if subscription.resync:
+                yield format_event('resync', {})
+            for event in subscription.backlog:
+                yield format_event(event.kind, event.data, event.id)
+            if not subscription.backlog:
+                # Lets the client resume from here even if nothing is sent
+                yield f'id: {subscription.cursor}\n\n'
+            while (remaining := deadline - time.monotonic()) > 0:
+                event = await subscription.next(min(keepalive, remaining))
+                if event is None:
+                    yield ': keep-alive\n\n'
+                else:
+                    yield format_event(event.kind, event.data, event.id)
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Disable response buffering in nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
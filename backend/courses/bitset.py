@@ -0,0 +1,71 @@
+"""
+Helpers for the compact completed-lessons bitmap stored on ``Progress``.
+
+A bitmap is a little-endian ``bytes`` value in which bit ``n`` is set
+when the lesson with ``slot == n`` in the course has been completed.
+Setting, clearing and testing a bit is O(1). Lessons without a slot
+are treated as never completed. Counts use the integer popcount of the
+bitmap masked with the slots of the course's current lessons, so bits
+of deleted lessons are ignored.
+"""
+
+
+def to_int(bitmap) -> int:
+    return int.from_bytes(bytes(bitmap or b''), 'little')
+
+
+def from_int(value: int) -> bytes:
+    return value.to_bytes((value.bit_length() + 7) // 8, 'little')
+
+
+def set_bit(bitmap, slot: int) -> bytes:
+    if slot is None:
+        return bytes(bitmap or b'')
+    data = bytearray(bitmap or b'')
+    index, offset = divmod(slot, 8)
+    if index >= len(data):
+        data.extend(b'\0' * (index + 1 - len(data)))
+    data[index] |= 1 << offset
+    return bytes(data)
+
+
+def clear_bit(bitmap, slot: int) -> bytes:
+    if slot is None:
+        return bytes(bitmap or b'')
+    data = bytearray(bitmap or b'')
+    index, offset = divmod(slot, 8)
+    if index < len(data):
+        data[index] &= ~(1 << offset) & 0xFF
+    # Keep the stored value as short as possible
+    return bytes(data).rstrip(b'\0')
+
+
+def test_bit(bitmap, slot: int) -> bool:
+    if slot is None:
+        return False
+    index, offset = divmod(slot, 8)
+    return index < len(bitmap or b'') and bool(bitmap[index] & (1 << offset))
+
+
+def mask_for_slots(slots) -> int:
+    mask = 0
+    for slot in slots:
+        if slot is not None:
+            mask |= 1 << slot
+    return mask
+
+
+def popcount(bitmap, mask: int = None) -> int:
+    value = to_int(bitmap)
+    if mask is not None:
+        value &= mask
+    return value.bit_count()
+
+
+def slots_of(bitmap):
+    """Yield the set slots of ``bitmap`` in ascending order."""
+    for index, byte in enumerate(bytes(bitmap or b'')):
+        while byte:
+            low = byte & -byte
+            yield index * 8 + low.bit_length() - 1
+            byte ^= low
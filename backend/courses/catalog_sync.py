@@ -0,0 +1,164 @@
+"""
+Change tracking and delta sync of catalog content.
+
+Every save and delete of a ``Course``, ``Module``, ``Lesson``, ``Quiz``,
+``Question`` or ``Answer`` appends a ``CatalogChange`` in the same
+transaction. Offline clients keep the id of the last change they applied
+as a cursor and call ``changes_since`` (``GET /api/courses/sync/``) to
+receive only what changed after it: the current state of every saved
+object and the ids of deleted ones. Several changes to one object within
+a page collapse into one entry, so a page costs one query for the log
+plus one per model with saved objects.
+
+Writes that bypass model signals (``QuerySet.update``, ``bulk_create``)
+are not tracked; the catalog code does not use them for these models.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .fast_serializers import ValuesSerializer
+from .models import Answer, CatalogChange, Course, Lesson, Module, Question, Quiz
+
+PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+class CourseSyncSerializer(ValuesSerializer):
+    fields = (
+        ('id', 'id'),
+        ('title', 'title'),
+        ('description', 'description'),
+        ('role', 'role'),
+        ('image_url', 'image_url'),
+    )
+
+
+class ModuleSyncSerializer(ValuesSerializer):
+    fields = (
+        ('id', 'id'),
+        ('course', 'course_id'),
+        ('title', 'title'),
+        ('description', 'description'),
+        ('order', 'order'),
+        ('target_minutes', 'target_minutes'),
+    )
+
+
+class LessonSyncSerializer(ValuesSerializer):
+    fields = (
+        ('id', 'id'),
+        ('course', 'course_id'),
+        ('module', 'module_id'),
+        ('title', 'title'),
+        ('content', 'content'),
+        ('video_url', 'video_url'),
+        ('image_url', 'image_url'),
+        ('order', 'order'),
+        ('estimated_minutes', 'estimated_minutes'),
+    )
+
+
+class QuizSyncSerializer(ValuesSerializer):
+    fields = (
+        ('id', 'id'),
+        ('course', 'course_id'),
+        ('title', 'title'),
+    )
+
+
+class QuestionSyncSerializer(ValuesSerializer):
+    fields = (
+        ('id', 'id'),
+        ('quiz', 'quiz_id'),
+        ('text', 'text'),
+    )
+
+
+class AnswerSyncSerializer(ValuesSerializer):
+    # Like AnswerSerializer, never reveals is_correct
+    fields = (
+        ('id', 'id'),
+        ('question', 'question_id'),
+        ('text', 'text'),
+    )
+
+
+# Parents before children, the order in which clients should apply upserts
+TRACKED = {
+    CatalogChange.COURSE: (Course, CourseSyncSerializer),
+    CatalogChange.MODULE: (Module, ModuleSyncSerializer),
+    CatalogChange.LESSON: (Lesson, LessonSyncSerializer),
+    CatalogChange.QUIZ: (Quiz, QuizSyncSerializer),
+    CatalogChange.QUESTION: (Question, QuestionSyncSerializer),
+    CatalogChange.ANSWER: (Answer, AnswerSyncSerializer),
+}
+LABELS = {model: label for label, (model, _) in TRACKED.items()}
+
+
+def record_saved(sender, instance, **kwargs) -> None:
+    CatalogChange.objects.create(model=LABELS[sender], object_id=instance.pk)
+
+
+def record_deleted(sender, instance, **kwargs) -> None:
+    CatalogChange.objects.create(model=LABELS[sender], object_id=instance.pk, deleted=True)
+
+
+def connect_signals() -> None:
+    for model in LABELS:
+        post_save.connect(record_saved, sender=model, dispatch_uid=f'catalog_sync_saved_{model.__name__}')
+        post_delete.connect(record_deleted, sender=model, dispatch_uid=f'catalog_sync_deleted_{model.__name__}')
+
+
+def changes_since(cursor: int = 0, limit: int = PAGE_SIZE) -> dict:
+    """
+    Return the catalog changes after ``cursor``:
+
+    ``cursor``
+        Pass it back on the next call.
+    ``has_more``
+        More changes follow; call again right away.
+    ``upserted``
+        Current representation of saved objects by model, parents first.
+    ``deleted``
+        Ids of deleted objects by model.
+    ``reset``
+        The cursor is unknown to this server (for example after a
+        database restore); drop local data and sync from 0.
+    """
+    changes = CatalogChange.objects.filter(id__gt=cursor)
+    settle_seconds = getattr(settings, 'CATALOG_SYNC_SETTLE_SECONDS', 0)
+    if settle_seconds:
+        # Leave room for transactions that commit after a later id
+        changes = changes.filter(changed_at__lte=timezone.now() - timedelta(seconds=settle_seconds))
+    rows = list(changes.order_by('id').values_list('id', 'model', 'object_id', 'deleted')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    reset = False
+    if not rows and cursor:
+        reset = cursor > (CatalogChange.objects.aggregate(last=Max('id'))['last'] or 0)
+
+    # Only the last change of each object within the page matters
+    latest = {label: {} for label in TRACKED}
+    for _, label, object_id, deleted in rows:
+        latest[label][object_id] = deleted
+    upserted = {}
+    deleted = {}
+    for label, (model, serializer_class) in TRACKED.items():
+        saved_ids = sorted(object_id for object_id, is_deleted in latest[label].items() if not is_deleted)
+        deleted_ids = sorted(object_id for object_id, is_deleted in latest[label].items() if is_deleted)
+        if saved_ids:
+            # Objects deleted since are skipped; their tombstones follow in a later page
+            upserted[label] = serializer_class().serialize(model.objects.filter(id__in=saved_ids).order_by('id'))
+        if deleted_ids:
+            deleted[label] = deleted_ids
+    return {
+        'cursor': rows[-1][0] if rows else cursor,
+        'has_more': has_more,
+        'reset': reset,
+        'upserted': upserted,
+        'deleted': deleted,
+    }
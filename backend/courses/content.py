@@ -0,0 +1,285 @@
+"""
+Lesson content pipeline.
+
+Lesson bodies are written in Markdown. ``render`` turns a body into HTML,
+extracts its table of contents and the media it references, and
+estimates its reading time. ``Lesson.save`` stores the results in the
+lesson's ``content_*`` and ``reading_minutes`` columns whenever the body
+changes, so reads serve them without rendering anything.
+``manage.py render_lessons`` renders the whole catalog again, which is
+needed after ``RENDERER_VERSION`` changes.
+
+The renderer covers the Markdown lessons use: ATX headings, paragraphs,
+``-``, ``*`` and ``1.`` lists, ``>`` quotes, fenced code blocks,
+horizontal rules, ``**strong**``, ``*emphasis*``, ``code``, links and
+images. It escapes all text and only emits the tags it knows, with
+``http``, ``https``, ``mailto`` and relative URLs, so its HTML is safe
+to insert as is and needs no separate sanitizer. Raw HTML in a body is
+shown as text.
+
+This module does not touch the database or settings, so the render
+command can run it in worker processes.
+"""
+import html
+import math
+import re
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from django.utils.html import strip_tags
+from django.utils.text import slugify
+
+# Bump when the output changes, then run manage.py render_lessons
+RENDERER_VERSION = 3
+
+URL_SCHEMES = ('http', 'https', 'mailto')
+MEDIA_EXTENSIONS = {
+    '.mp4': 'video',
+    '.webm': 'video',
+    '.mov': 'video',
+    '.mp3': 'audio',
+    '.ogg': 'audio',
+    '.wav': 'audio',
+    '.pdf': 'document',
+}
+VIDEO_HOSTS = ('youtube.com', 'youtu.be', 'vimeo.com', 'rutube.ru')
+# Seconds of reading time added per image
+IMAGE_SECONDS = 12
+
+_FENCE = re.compile(r'^(`{3,}|~{3,})\s*([\w+-]*)')
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)(?:\s+#+)?\s*$')
+_RULE = re.compile(r'^([-*_])(?:\s*\1){2,}\s*$')
+_LIST_ITEM = re.compile(r'^\s*([-*+]|\d{1,9}[.)])\s+(.*)$')
+_QUOTE = re.compile(r'^\s*>\s?(.*)$')
+# Link targets may hold one level of balanced parentheses, as in
+# https://en.wikipedia.org/wiki/Mercury_(planet)
+_URL = r'(?:[^()\s]|\([^()\s]*\))+'
+_INLINE = re.compile(
+    r'(?P<ticks>`+)(?P<code>.+?)(?P=ticks)'
+    rf'|!\[(?P<alt>[^\]]*)\]\((?P<src>{_URL})(?:\s+"(?P<image_title>[^"]*)")?\)'
+    rf'|\[(?P<text>[^\]]+)\]\((?P<href>{_URL})(?:\s+"(?P<link_title>[^"]*)")?\)'
+    r'|<(?P<autolink>(?:https?|mailto):[^>\s]+)>'
+)
+# Strong and emphasis in one pass, so that a match never crosses the tag of
+# another: the text of a match is scanned again on its own
+_EMPHASIS = re.compile(
+    r'(\*\*|__)(?=\S)(?P<strong>.+?)(?<=\S)\1'
+    r'|(?<![\w*])\*(?=\S)(?P<star>.+?)(?<![\s*])\*(?![\w*])'
+    r'|(?<![\w_])_(?=\S)(?P<underscore>.+?)(?<![\s_])_(?![\w_])'
+)
+_WORD = re.compile(r'\w+')
+
+
+@dataclass
+class RenderedContent:
+    html: str = ''
+    # [{'level': 2, 'id': 'setup', 'title': 'Setup'}, ...]
+    toc: list = field(default_factory=list)
+    # [{'type': 'image', 'url': '...', 'title': '...'}, ...]
+    media: list = field(default_factory=list)
+    words: int = 0
+    reading_minutes: int = 0
+
+
+def _safe_url(url: str):
+    """Return ``url`` if it may be linked to, else ``None``."""
+    try:
+        scheme = urlsplit(url).scheme.lower()
+    except ValueError:
+        return None
+    if scheme and scheme not in URL_SCHEMES:
+        return None
+    return url
+
+
+def _media_type(url: str):
+    parts = urlsplit(url)
+    host = parts.netloc.lower().rsplit('@', 1)[-1].split(':', 1)[0]
+    if any(host == video_host or host.endswith(f'.{video_host}') for video_host in VIDEO_HOSTS):
+        return 'video'
+    path = parts.path.lower()
+    for extension, kind in MEDIA_EXTENSIONS.items():
+        if path.endswith(extension):
+            return kind
+    return None
+
+
+def _emphasize(text: str) -> str:
+    def tag(match):
+        if match.group('strong') is not None:
+            return f"<strong>{_emphasize(match.group('strong'))}</strong>"
+        return f"<em>{_emphasize(match.group('star') or match.group('underscore'))}</em>"
+
+    return _EMPHASIS.sub(tag, text)
+
+
+class _Renderer:
+    def __init__(self):
+        self.toc = []
+        self.media = []
+        self.media_urls = set()
+        self.anchors = set()
+        self.images = 0
+
+    def add_media(self, kind: str, url: str, title: str) -> None:
+        if url not in self.media_urls:
+            self.media_urls.add(url)
+            self.media.append({'type': kind, 'url': url, 'title': title})
+
+    def anchor(self, title: str) -> str:
+        base = slugify(title, allow_unicode=True) or 'section'
+        anchor, number = base, 1
+        while anchor in self.anchors:
+            number += 1
+            anchor = f'{base}-{number}'
+        self.anchors.add(anchor)
+        return anchor
+
+    # ---------- Inline ----------
+
+    def emphasis(self, text: str) -> str:
+        return _emphasize(html.escape(text))
+
+    def inline(self, text: str, links: bool = True) -> str:
+        parts = []
+        position = 0
+        for match in _INLINE.finditer(text):
+            parts.append(self.emphasis(text[position:match.start()]))
+            position = match.end()
+            if match.group('code') is not None:
+                parts.append(f"<code>{html.escape(match.group('code').strip())}</code>")
+            elif match.group('src') is not None:
+                parts.append(self.image(match.group('src'), match.group('alt'), match.group('image_title')))
+            elif not links:
+                # No links inside link text
+                parts.append(self.emphasis(match.group(0)))
+            elif match.group('href') is not None:
+                parts.append(self.link(match.group('href'), match.group('text'), match.group('link_title')))
+            else:
+                url = match.group('autolink')
+                parts.append(self.link(url, url, None))
+        parts.append(self.emphasis(text[position:]))
+        return ''.join(parts)
+
+    def image(self, src: str, alt: str, title) -> str:
+        url = _safe_url(src)
+        if url is None:
+            return html.escape(alt)
+        self.images += 1
+        self.add_media('image', url, alt)
+        title_attr = f' title="{html.escape(title)}"' if title else ''
+        return f'<img src="{html.escape(url)}" alt="{html.escape(alt)}"{title_attr} loading="lazy">'
+
+    def link(self, href: str, text: str, title) -> str:
+        label = self.inline(text, links=False)
+        url = _safe_url(href)
+        if url is None:
+            return label
+        kind = _media_type(url)
+        if kind is not None:
+            self.add_media(kind, url, strip_tags(label))
+        title_attr = f' title="{html.escape(title)}"' if title else ''
+        return f'<a href="{html.escape(url)}"{title_attr}>{label}</a>'
+
+    # ---------- Blocks ----------
+
+    def blocks(self, lines) -> list:
+        out = []
+        paragraph = []
+
+        def end_paragraph():
+            if paragraph:
+                out.append(f"<p>{self.inline(chr(10).join(paragraph))}</p>")
+                paragraph.clear()
+
+        index = 0
+        while index < len(lines):
+            line = lines[index]
+            stripped = line.strip()
+            fence = _FENCE.match(stripped)
+            if fence:
+                end_paragraph()
+                marker, language = fence.group(1), fence.group(2)
+                code = []
+                index += 1
+                while index < len(lines) and not lines[index].strip().startswith(marker):
+                    code.append(lines[index])
+                    index += 1
+                index += 1
+                class_attr = f' class="language-{html.escape(language)}"' if language else ''
+                out.append(f"<pre><code{class_attr}>{html.escape(chr(10).join(code))}</code></pre>")
+                continue
+            if not stripped:
+                end_paragraph()
+                index += 1
+                continue
+            heading = _HEADING.match(stripped)
+            if heading:
+                end_paragraph()
+                level = len(heading.group(1))
+                content = self.inline(heading.group(2))
+                title = html.unescape(strip_tags(content))
+                anchor = self.anchor(title)
+                self.toc.append({'level': level, 'id': anchor, 'title': title})
+                out.append(f'<h{level} id="{html.escape(anchor)}">{content}</h{level}>')
+                index += 1
+                continue
+            if _RULE.match(stripped):
+                end_paragraph()
+                out.append('<hr>')
+                index += 1
+                continue
+            item = _LIST_ITEM.match(line)
+            if item:
+                end_paragraph()
+                index = self.list(lines, index, out)
+                continue
+            if _QUOTE.match(line):
+                end_paragraph()
+                quoted = []
+                while index < len(lines) and _QUOTE.match(lines[index]):
+                    quoted.append(_QUOTE.match(lines[index]).group(1))
+                    index += 1
+                out.append(f"<blockquote>{''.join(self.blocks(quoted))}</blockquote>")
+                continue
+            paragraph.append(stripped)
+            index += 1
+        end_paragraph()
+        return out
+
+    def list(self, lines, index: int, out: list) -> int:
+        ordered = _LIST_ITEM.match(lines[index]).group(1)[0].isdigit()
+        items = []
+        while index < len(lines):
+            line = lines[index]
+            item = _LIST_ITEM.match(line)
+            if item and item.group(1)[0].isdigit() == ordered:
+                items.append([item.group(2).strip()])
+            elif item or not line.strip() or not line[0].isspace():
+                break
+            else:
+                # An indented line continues the item; nested lists are flattened
+                items[-1].append(line.strip())
+            index += 1
+        tag = 'ol' if ordered else 'ul'
+        rendered = ''.join(f"<li>{self.inline(chr(10).join(item))}</li>" for item in items)
+        out.append(f'<{tag}>{rendered}</{tag}>')
+        return index
+
+
+def render(text: str, words_per_minute: int = 180) -> RenderedContent:
+    """Render a lesson body, see the module docstring."""
+    if not text or not text.strip():
+        return RenderedContent()
+    renderer = _Renderer()
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    body = '\n'.join(renderer.blocks(lines))
+    words = len(_WORD.findall(html.unescape(strip_tags(body))))
+    seconds = words * 60 / words_per_minute + renderer.images * IMAGE_SECONDS
+    return RenderedContent(
+        html=body,
+        toc=renderer.toc,
+        media=renderer.media,
+        words=words,
+        reading_minutes=math.ceil(seconds / 60) if seconds else 0,
+    )
@@ -0,0 +1,210 @@
+"""
+Per-user daily activity and the cross-course streak.
+
+``UserDailyActivity`` keeps one row per user and local day with the goal
+minutes credited, lessons completed and quizzes submitted across all
+courses. The completion paths call ``record`` or ``record_many``, which
+add to the rows with a fixed number of statements per batch and advance
+the user's ``UserStreak`` in the same transaction. A user's streak is
+then one row to read, and ``heatmap`` reads a year of activity in one
+range scan of the ``(user, day)`` unique index. A longer streak
+evaluates the streak achievements, see ``courses.achievements``.
+
+A day is active when a lesson was completed, a quiz submitted or goal
+minutes credited on it. Activity dated before the last active day, as
+an offline journal may send, rebuilds the user's streak from the table
+instead of advancing it.
+"""
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import achievements
+from .goals import WATCH_TIME, goal_credit
+from .models import LearningEvent, Lesson, LessonTimeDaily, UserDailyActivity, UserStreak
+
+# Order of the deltas passed to record_many
+COUNTERS = ('minutes', 'lessons_completed', 'quizzes_submitted')
+# (user, day) pairs per UPDATE statement
+BATCH_SIZE = 200
+STREAK_FIELDS = ['current_streak', 'longest_streak', 'last_active_day']
+
+ACTIVE = Q(minutes__gt=0) | Q(lessons_completed__gt=0) | Q(quizzes_submitted__gt=0)
+
+
+def record(user_id: int, day=None, minutes: int = 0, lessons: int = 0, quizzes: int = 0) -> None:
+    """Add to the activity of ``user_id`` on ``day``, today by default."""
+    record_many({(user_id, day or timezone.localdate()): (minutes, lessons, quizzes)})
+
+
+def record_many(deltas: dict) -> None:
+    """
+    Add ``{(user_id, day): (minutes, lessons, quizzes)}`` to the daily
+    activity and advance the streaks of the days made active. Negative
+    minutes are taken back, down to zero.
+    """
+    deltas = {key: values for key, values in deltas.items() if any(values)}
+    if not deltas:
+        return
+    keys = sorted(deltas)
+    with transaction.atomic():
+        # Rows start at zero, so concurrent requests only ever add to them
+        UserDailyActivity.objects.bulk_create(
+            [UserDailyActivity(user_id=user_id, day=day) for user_id, day in keys],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+        for start in range(0, len(keys), BATCH_SIZE):
+            batch = keys[start:start + BATCH_SIZE]
+            updates = {}
+            for index, name in enumerate(COUNTERS):
+                whens = [
+                    When(user_id=user_id, day=day, then=Value(deltas[user_id, day][index]))
+                    for user_id, day in batch
+                    if deltas[user_id, day][index]
+                ]
+                if whens:
+                    added = Case(*whens, default=Value(0), output_field=IntegerField())
+                    updates[name] = Greatest(F(name) + added, Value(0))
+            UserDailyActivity.objects.filter(
+                user_id__in={user_id for user_id, _ in batch},
+                day__in={day for _, day in batch},
+            ).update(**updates)
+        active = {}
+        for (user_id, day), values in deltas.items():
+            if any(value > 0 for value in values):
+                active.setdefault(user_id, set()).add(day)
+        if active:
+            _advance_streaks(active)
+
+
+def _lock_streaks(user_ids) -> dict:
+    streaks = {streak.user_id: streak for streak in UserStreak.objects.select_for_update().filter(user_id__in=user_ids)}
+    missing = [user_id for user_id in user_ids if user_id not in streaks]
+    if missing:
+        UserStreak.objects.bulk_create([UserStreak(user_id=user_id) for user_id in missing], ignore_conflicts=True)
+        streaks.update(
+            (streak.user_id, streak) for streak in UserStreak.objects.select_for_update().filter(user_id__in=missing)
+        )
+    return streaks
+
+
+def advance(streak: UserStreak, day) -> None:
+    """Count ``day``, not earlier than ``streak.last_active_day``, as active."""
+    if streak.last_active_day == day:
+        return
+    if streak.last_active_day == day - timedelta(days=1):
+        streak.current_streak += 1
+    else:
+        streak.current_streak = 1
+    streak.longest_streak = max(streak.longest_streak, streak.current_streak)
+    streak.last_active_day = day
+
+
+def _advance_streaks(active: dict) -> None:
+    streaks = _lock_streaks(list(active))
+    changed = []
+    longer = []
+    for user_id, days in active.items():
+        streak = streaks[user_id]
+        before = (streak.current_streak, streak.longest_streak, streak.last_active_day)
+        if streak.last_active_day is not None and min(days) < streak.last_active_day:
+            rebuild_streak(streak)
+        else:
+            for day in sorted(days):
+                advance(streak, day)
+        if (streak.current_streak, streak.longest_streak, streak.last_active_day) != before:
+            changed.append(streak)
+        if streak.longest_streak > before[1]:
+            longer.append(user_id)
+    UserStreak.objects.bulk_update(changed, STREAK_FIELDS)
+    if longer:
+        achievements.evaluate(longer, achievements.STREAK)
+
+
+def rebuild_streak(streak: UserStreak) -> None:
+    """Recompute ``streak`` from all active days of its user."""
+    streak.current_streak = streak.longest_streak = 0
+    streak.last_active_day = None
+    days = UserDailyActivity.objects.filter(ACTIVE, user_id=streak.user_id).order_by('day').values_list('day', flat=True)
+    for day in days.iterator():
+        advance(streak, day)
+
+
+def get_streak(user) -> UserStreak:
+    """The streak of ``user``, unsaved and empty if the user was never active."""
+    return UserStreak.objects.filter(user=user).first() or UserStreak(user=user)
+
+
+def heatmap(user, start, end) -> list:
+    """Activity of ``user`` on the active days from ``start`` to ``end``, oldest first."""
+    rows = (
+        UserDailyActivity.objects.filter(user=user, day__range=(start, end))
+        .order_by('day')
+        .values_list('day', *COUNTERS)
+    )
+    return [
+        {'date': day.isoformat(), 'minutes': minutes, 'lessons': lessons, 'quizzes': quizzes}
+        for day, minutes, lessons, quizzes in rows
+        if minutes or lessons or quizzes
+    ]
+
+
+def rebuild(user_ids=None) -> int:
+    """
+    Recompute the daily activity and streaks (of the given users, all by
+    default) from the learning events, and from the watched time when
+    goals are credited from it. Returns the number of rows written.
+    """
+    events = LearningEvent.objects.filter(
+        kind__in=(LearningEvent.LESSON_COMPLETED, LearningEvent.LESSON_UNCOMPLETED, LearningEvent.QUIZ_SUBMITTED)
+    )
+    times = LessonTimeDaily.objects.all()
+    if user_ids is not None:
+        events = events.filter(user_id__in=user_ids)
+        times = times.filter(user_id__in=user_ids)
+    watch_time = goal_credit() == WATCH_TIME
+    lesson_minutes = {} if watch_time else dict(Lesson.objects.values_list('id', 'estimated_minutes'))
+    totals = {}
+    current_tz = timezone.get_current_timezone()
+    rows = events.order_by('occurred_at', 'id').values_list('user_id', 'kind', 'lesson_id', 'occurred_at')
+    for user_id, kind, lesson_id, occurred_at in rows.iterator():
+        day = datetime.fromtimestamp(occurred_at, current_tz).date()
+        minutes, lessons, quizzes = totals.get((user_id, day), (0, 0, 0))
+        if kind == LearningEvent.LESSON_COMPLETED:
+            lessons += 1
+            minutes += lesson_minutes.get(lesson_id, 0)
+        elif kind == LearningEvent.LESSON_UNCOMPLETED:
+            minutes = max(minutes - lesson_minutes.get(lesson_id, 0), 0)
+        else:
+            quizzes += 1
+        totals[user_id, day] = (minutes, lessons, quizzes)
+    if watch_time:
+        watched = times.order_by().values('user_id', 'day').annotate(seconds=Sum('seconds'))
+        for user_id, day, seconds in watched.values_list('user_id', 'day', 'seconds').iterator():
+            _, lessons, quizzes = totals.get((user_id, day), (0, 0, 0))
+            totals[user_id, day] = (seconds // 60, lessons, quizzes)
+    activity = UserDailyActivity.objects.all()
+    streaks = UserStreak.objects.all()
+    if user_ids is not None:
+        activity = activity.filter(user_id__in=user_ids)
+        streaks = streaks.filter(user_id__in=user_ids)
+    new_streaks = {}
+    for (user_id, day) in sorted(totals):
+        if any(totals[user_id, day]):
+            advance(new_streaks.setdefault(user_id, UserStreak(user_id=user_id)), day)
+    with transaction.atomic():
+        activity.delete()
+        streaks.delete()
+        UserDailyActivity.objects.bulk_create(
+            [
+                UserDailyActivity(user_id=user_id, day=day, minutes=minutes, lessons_completed=lessons, quizzes_submitted=quizzes)
+                for (user_id, day), (minutes, lessons, quizzes) in totals.items()
+            ],
+            batch_size=1000,
+        )
+        UserStreak.objects.bulk_create(new_streaks.values(), batch_size=1000)
+    return len(totals)
@@ -0,0 +1,313 @@
+"""
+Read-only serializers that build response dicts from ``values_list`` rows.
+
+The DRF ``ModelSerializer`` classes in ``courses.serializers`` create a
+model instance and run every field's ``to_representation`` for each
+row, which costs more than the query itself once a list holds thousands
+of rows. The serializers below declare which lookup feeds each output
+key and zip the fetched tuples straight into dicts. Only values that
+DRF would reformat, such as datetimes, go through a converter.
+
+Their output renders to the same JSON bytes as the DRF serializers they
+stand in for; ``manage.py bench_serializers`` checks this and measures
+the cost per row of both. Given a ``courses.fieldsets.Fieldset`` they
+fetch only the columns of the selected keys.
+"""
+from django.db.models import Count
+from rest_framework import serializers
+
+from . import bitset
+from .fieldsets import ALL_FIELDS, Fieldset
+from .models import Lesson, Progress, uses_completion_bitmap
+
+# DRF's own conversion, so the format follows REST_FRAMEWORK settings
+_datetime = serializers.DateTimeField()
+
+
+def format_datetime(value):
+    return None if value is None else _datetime.to_representation(value)
+
+
+class ValuesSerializer:
+    """
+    ``fields`` is a sequence of ``(key, lookup)`` or
+    ``(key, lookup, converter)`` entries in output order.
+    """
+
+    fields = ()
+    expandable = ()
+
+    def __init__(self, fieldset=ALL_FIELDS):
+        self.fieldset = fieldset
+        fields = [field for field in self.fields if fieldset.includes(field[0])]
+        self.keys = [field[0] for field in fields]
+        self.lookups = [field[1] for field in fields]
+        self.converters = [(index, field[2]) for index, field in enumerate(fields) if len(field) > 2]
+
+    @classmethod
+    def available(cls) -> list:
+        return [field[0] for field in cls.fields]
+
+    def rows(self, queryset):
+        return queryset.values_list(*self.lookups)
+
+    def to_dict(self, values) -> dict:
+        if self.converters:
+            values = list(values)
+            for index, convert in self.converters:
+                values[index] = convert(values[index])
+        return dict(zip(self.keys, values))
+
+    def serialize(self, queryset) -> list:
+        to_dict = self.to_dict
+        return [to_dict(values) for values in self.rows(queryset)]
+
+
+class CourseValuesSerializer(ValuesSerializer):
+    """Stands in for ``CourseSerializer``."""
+
+    fields = (
+        ('id', 'id'),
+        ('title', 'title'),
+        ('description', 'description'),
+        ('role', 'role'),
+        ('image_url', 'image_url'),
+    )
+
+
+class UserTaskValuesSerializer(ValuesSerializer):
+    """Stands in for ``UserTaskSerializer``."""
+
+    fields = (
+        ('task_id', 'task_id'),
+        ('description', 'task__description'),
+        ('order', 'task__order'),
+        ('completed', 'completed'),
+        ('completed_at', 'completed_at', format_datetime),
+    )
+
+
+class ActivityLogValuesSerializer(ValuesSerializer):
+    """Stands in for ``ActivityLogSerializer``."""
+
+    fields = (
+        ('id', 'id'),
+        ('action', 'action'),
+        ('timestamp', 'timestamp', format_datetime),
+    )
+
+
+class ProgressValuesSerializer(ValuesSerializer):
+    """
+    Stands in for ``ProgressSerializer``. Completed lessons are loaded for
+    all records at once from the configured storage, so a list costs
+    three queries however many records it holds. Unexpanded, ``course``
+    is the course id.
+    """
+
+    course_fields = CourseValuesSerializer.fields
+    output_keys = (
+        'id',
+        'course',
+        'progress',
+        'completed_lessons',
+        'daily_goal_minutes',
+        'daily_minutes_today',
+        'daily_streak',
+        'minutes_remaining',
+    )
+    expandable = ('course',)
+
+    def __init__(self, fieldset=ALL_FIELDS):
+        include = fieldset.includes
+        self.bitmap = uses_completion_bitmap()
+        self.needs_completion = include('progress') or include('completed_lessons')
+        # Records are matched to their completion by id
+        columns = {'id'}
+        if include('course') or self.needs_completion:
+            columns.add('course_id')
+        if self.needs_completion and self.bitmap:
+            columns.add('completed_bitmap')
+        if include('daily_goal_minutes') or include('minutes_remaining'):
+            columns.add('daily_goal_minutes')
+        if include('daily_minutes_today') or include('minutes_remaining'):
+            columns.add('daily_minutes_today')
+        if include('daily_streak'):
+            columns.add('daily_streak')
+        order = ('id', 'course_id', 'completed_bitmap', 'daily_goal_minutes', 'daily_minutes_today', 'daily_streak')
+        self.fields = tuple((name, name) for name in order if name in columns)
+        if fieldset.expands('course'):
+            self.fields += tuple((f'course_{key}', f'course__{lookup}') for key, lookup in self.course_fields)
+        super().__init__()
+        self.fieldset = fieldset
+        self.builders = [(key, getattr(self, f'build_{key}')) for key in self.output_keys if include(key)]
+
+    @classmethod
+    def available(cls) -> list:
+        return list(cls.output_keys)
+
+    def serialize(self, queryset) -> list:
+        # Preloads for model instances do not apply to value rows
+        records = [self.to_dict(values) for values in self.rows(queryset.prefetch_related(None))]
+        if not records:
+            return []
+        completion = {}
+        if self.needs_completion:
+            if self.bitmap:
+                completion = self.bitmap_completion(records)
+            else:
+                completion = self.m2m_completion(records, self.fieldset.includes('completed_lessons'))
+        builders = self.builders
+        return [{key: build(record, completion) for key, build in builders} for record in records]
+
+    def build_id(self, record, completion):
+        return record['id']
+
+    def build_course(self, record, completion):
+        if self.fieldset.expands('course'):
+            return {key: record[f'course_{key}'] for key, _ in self.course_fields}
+        return record['course_id']
+
+    def build_progress(self, record, completion):
+        return completion[record['id']][1]
+
+    def build_completed_lessons(self, record, completion):
+        return completion[record['id']][0]
+
+    def build_daily_goal_minutes(self, record, completion):
+        return record['daily_goal_minutes']
+
+    def build_daily_minutes_today(self, record, completion):
+        return record['daily_minutes_today']
+
+    def build_daily_streak(self, record, completion):
+        return record['daily_streak']
+
+    def build_minutes_remaining(self, record, completion):
+        return max(record['daily_goal_minutes'] - record['daily_minutes_today'], 0)
+
+    def m2m_completion(self, records, with_ids: bool = True) -> dict:
+        """
+        Map record ids to their completed lesson ids and percentage, as
+        ``with_counts`` does. Without ``with_ids`` only the links are
+        counted and the id lists stay empty.
+        """
+        course_ids = {record['course_id'] for record in records}
+        totals = dict(
+            Lesson.objects.filter(course_id__in=course_ids)
+            .order_by()
+            .values('course_id')
+            .annotate(total=Count('*'))
+            .values_list('course_id', 'total')
+        )
+        completed = {record['id']: [] for record in records}
+        links = Progress.completed_lessons.through.objects.filter(progress_id__in=list(completed))
+        if with_ids:
+            links = links.order_by(*(f'lesson__{name}' for name in Lesson._meta.ordering))
+            for progress_id, lesson_id in links.values_list('progress_id', 'lesson_id'):
+                completed[progress_id].append(lesson_id)
+            counts = {progress_id: len(lesson_ids) for progress_id, lesson_ids in completed.items()}
+        else:
+            counts = dict(
+                links.order_by().values('progress_id').annotate(total=Count('*')).values_list('progress_id', 'total')
+            )
+        completion = {}
+        for record in records:
+            total = totals.get(record['course_id'], 0)
+            count = counts.get(record['id'], 0)
+            completion[record['id']] = (completed[record['id']], (count / total) * 100 if total else 0.0)
+        return completion
+
+    def bitmap_completion(self, records) -> dict:
+        """Map record ids to their completed lesson ids and percentage, as ``attach_lesson_slots`` does."""
+        slots = {record['course_id']: [] for record in records}
+        rows = Lesson.objects.filter(course_id__in=list(slots)).values_list('course_id', 'id', 'slot')
+        for course_id, lesson_id, slot in rows:
+            slots[course_id].append((lesson_id, slot))
+        masks = {}
+        completion = {}
+        for record in records:
+            course_slots = slots[record['course_id']]
+            bitmap = record['completed_bitmap']
+            lesson_ids = [lesson_id for lesson_id, slot in course_slots if bitset.test_bit(bitmap, slot)]
+            if not course_slots:
+                completion[record['id']] = (lesson_ids, 0.0)
+                continue
+            mask = masks.get(record['course_id'])
+            if mask is None:
+                mask = masks[record['course_id']] = bitset.mask_for_slots(slot for _, slot in course_slots)
+            completion[record['id']] = (lesson_ids, (bitset.popcount(bitmap, mask) / len(course_slots)) * 100)
+        return completion
+
+
+def is_set(value) -> bool:
+    return value is not None
+
+
+def zero_if_null(value):
+    return value or 0
+
+
+class CatalogValuesSerializer(ValuesSerializer):
+    """
+    Courses with the caller's progress, read from the annotations of
+    ``courses.views.catalog_queryset``. ``progress``, ``minutes_remaining``
+    and ``average_rating`` are derived like ``ProgressSerializer`` and
+    ``CourseStats`` do. The rating comes from the materialized course
+    stats; ``manage.py rebuild_course_stats`` fills in missing rows.
+    """
+
+    fields = CourseValuesSerializer.fields + (
+        ('review_count', 'stats__review_count', zero_if_null),
+        ('my_rating', 'my_review__rating'),
+        ('started', 'my_progress__id', is_set),
+        ('completed_count', 'completed_count'),
+        ('lesson_count', 'lesson_count'),
+        ('daily_goal_minutes', 'my_progress__daily_goal_minutes'),
+        ('daily_minutes_today', 'my_progress__daily_minutes_today'),
+        ('daily_streak', 'my_progress__daily_streak'),
+    )
+    # Columns read only to derive other keys
+    sources = (
+        ('rating_sum', 'stats__rating_sum'),
+    )
+    derived = {
+        'average_rating': ('rating_sum', 'review_count'),
+        'progress': ('completed_count', 'lesson_count'),
+        'minutes_remaining': ('daily_goal_minutes', 'daily_minutes_today'),
+    }
+
+    def __init__(self, fieldset=ALL_FIELDS):
+        self.derive = [key for key in self.derived if fieldset.includes(key)]
+        needed = {source for key in self.derive for source in self.derived[key]}
+        returned = {key for key, *_ in self.fields if fieldset.includes(key)}
+        self.hidden = needed - returned
+        self.fields = self.fields + self.sources
+        super().__init__(Fieldset(returned | needed))
+        self.fieldset = fieldset
+
+    @classmethod
+    def available(cls) -> list:
+        return super().available() + list(cls.derived)
+
+    def to_dict(self, values) -> dict:
+        data = super().to_dict(values)
+        for key in self.derive:
+            data[key] = getattr(self, f'derive_{key}')(data)
+        for key in self.hidden:
+            del data[key]
+        return data
+
+    def derive_average_rating(self, data):
+        if not data['review_count']:
+            return None
+        return round(data['rating_sum'] / data['review_count'], 2)
+
+    def derive_progress(self, data) -> float:
+        total = data['lesson_count']
+        return (data['completed_count'] / total) * 100 if total else 0.0
+
+    def derive_minutes_remaining(self, data):
+        if data['daily_goal_minutes'] is None:
+            return None
+        return max(data['daily_goal_minutes'] - data['daily_minutes_today'], 0)
@@ -0,0 +1,77 @@
+"""
+Sparse fieldsets for the courses API.
+
+``?fields=id,title`` limits every object of a response to the listed
+top-level keys. ``?expand=course`` lists the nested objects to embed in
+full; nested objects left out of it are returned as ids, so
+``?expand=`` with no value returns ids only. Without the parameters a
+response is unchanged: all fields, every nested object expanded.
+
+Views narrow their querysets to the selection, so columns, joins and
+prefetches of fields that are not returned are never loaded.
+"""
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+
+def parse_names(raw, available, parameter: str):
+    """Return the set of comma-separated names in ``raw``, or None when absent."""
+    if raw is None:
+        return None
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = sorted(names - set(available))
+    if unknown:
+        raise ValidationError({parameter: [
+            f"Unknown field(s): {', '.join(unknown)}. Choose from: {', '.join(available)}."
+        ]})
+    return names
+
+
+class Fieldset:
+    """The ``fields`` and ``expand`` selection of one request."""
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+
+    @classmethod
+    def from_params(cls, params, available, expandable=()) -> 'Fieldset':
+        """Parse ``params`` (a QueryDict); raises ``ValidationError`` for unknown names."""
+        # An empty ``fields`` selects nothing useful, so it means all fields
+        fields = parse_names(params.get('fields') or None, available, 'fields')
+        expand = parse_names(params.get('expand'), expandable, 'expand') if expandable else None
+        return cls(fields, expand)
+
+    @property
+    def narrowed(self) -> bool:
+        return self.fields is not None or self.expand is not None
+
+    def includes(self, name: str) -> bool:
+        return self.fields is None or name in self.fields
+
+    def expands(self, name: str) -> bool:
+        return self.includes(name) and (self.expand is None or name in self.expand)
+
+
+ALL_FIELDS = Fieldset()
+
+
+class FieldsetSerializerMixin:
+    """
+    Applies the ``fieldset`` of the serializer context to a
+    ``ModelSerializer``: fields left out are dropped and nested
+    serializers named in ``Meta.expandable`` but not expanded become lists
+    of primary keys. Only the top-level serializer is affected.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get('fieldset')
+        if fieldset is None or self.root is not self:
+            return fields
+        for name in list(fields):
+            if not fieldset.includes(name):
+                del fields[name]
+            elif name in getattr(self.Meta, 'expandable', ()) and not fieldset.expands(name):
+                fields[name] = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+        return fields
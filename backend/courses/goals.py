@@ -0,0 +1,93 @@
+"""
+Daily goal tracking.
+
+Every ``Progress`` record has a goal of minutes per day and a streak of
+consecutive days on which the goal was met. Minutes are credited either
+when a lesson is completed, from its ``estimated_minutes``, or from the
+time actually spent on lessons as reported by heartbeats (see
+``courses.watch_time``), depending on ``DAILY_GOAL_CREDIT``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Lesson, Progress
+
+ESTIMATED = 'estimated'
+WATCH_TIME = 'watch_time'
+# Progress columns written by the goal tracking
+GOAL_FIELDS = ['daily_minutes_today', 'daily_streak', 'last_progress_date', 'last_goal_met_date']
+
+
+def goal_credit() -> str:
+    """What daily goal minutes are credited from: ``'estimated'`` or ``'watch_time'``."""
+    return getattr(settings, 'DAILY_GOAL_CREDIT', ESTIMATED)
+
+
+def lesson_goal_minutes(lesson: Lesson) -> int:
+    """Minutes credited for completing ``lesson``."""
+    return lesson.estimated_minutes if goal_credit() == ESTIMATED else 0
+
+
+def adjust_daily_goal(progress: Progress, minutes_delta: int, day=None) -> None:
+    """
+    Update daily goal tracking when lesson completion changes. ``day`` is
+    the local date the minutes count for, today by default; it must not
+    be earlier than ``progress.last_progress_date``.
+    """
+    today = day or timezone.localdate()
+    yesterday = today - timedelta(days=1)
+
+    if progress.last_progress_date != today:
+        # When entering a new day, reset minutes and update streak continuity
+        if progress.last_goal_met_date != yesterday:
+            progress.daily_streak = 0
+        progress.daily_minutes_today = 0
+        progress.last_progress_date = today
+        if progress.last_goal_met_date == today:
+            progress.last_goal_met_date = None
+
+    progress.daily_minutes_today = max(0, progress.daily_minutes_today + minutes_delta)
+
+    if progress.daily_minutes_today >= progress.daily_goal_minutes:
+        if progress.last_goal_met_date != today:
+            if progress.last_goal_met_date == yesterday:
+                progress.daily_streak += 1
+            else:
+                progress.daily_streak = 1
+            progress.last_goal_met_date = today
+    else:
+        if progress.last_goal_met_date == today:
+            progress.last_goal_met_date = None
+            progress.daily_streak = max(progress.daily_streak - 1, 0)
+
+
+def credit_minutes(minutes) -> int:
+    """
+    Add watched minutes to the daily goals. ``minutes`` maps
+    ``(user_id, course_id, day)`` to minutes; users without a progress
+    record for the course are skipped. Days a record has already moved
+    past no longer count. Must run inside a transaction. Returns the
+    number of records updated.
+    """
+    if goal_credit() != WATCH_TIME or not minutes:
+        return 0
+    by_record = {}
+    for (user_id, course_id, day), value in minutes.items():
+        by_record.setdefault((user_id, course_id), []).append((day, value))
+    records = Progress.objects.select_for_update().filter(
+        user_id__in={user_id for user_id, _ in by_record},
+        course_id__in={course_id for _, course_id in by_record},
+    ).only('id', 'user_id', 'course_id', 'daily_goal_minutes', *GOAL_FIELDS)
+    changed = []
+    for record in records:
+        days = by_record.get((record.user_id, record.course_id))
+        if days is None:
+            continue
+        for day, value in sorted(days):
+            if record.last_progress_date is None or day >= record.last_progress_date:
+                adjust_daily_goal(record, value, day)
+        changed.append(record)
+    Progress.objects.bulk_update(changed, GOAL_FIELDS, batch_size=500)
+    return len(changed)
@@ -0,0 +1,222 @@
+"""
+Durable background jobs stored in the database.
+
+Work that need not finish before the response is registered as a task
+and queued as a ``Job`` row, which ``manage.py run_jobs`` picks up::
+
+    @jobs.task('courses.publish_catalog')
+    def publish_catalog():
+        ...
+
+    jobs.enqueue_on_commit('courses.publish_catalog', key='courses.publish_catalog')
+
+``enqueue_on_commit`` queues the job once the current transaction
+commits, so a job never sees data its request rolled back. ``enqueue``
+queues it at once; inside a transaction the row commits or rolls back
+with the rest of it. A queued job with a ``key`` absorbs later jobs of
+the same key until a worker claims it.
+
+Claiming is safe with any number of workers. Where the database
+supports ``SELECT ... FOR UPDATE SKIP LOCKED``, as PostgreSQL does, a
+worker locks the oldest due rows and marks them running in one
+transaction, so workers neither wait for nor take each other's jobs.
+SQLite has no row locks but serialises writes: there a worker marks
+its candidates running with an ``UPDATE`` that only matches rows still
+queued, and reads back the ones that carry its claim.
+
+A job that raises is retried after ``JOB_RETRY_BASE_SECONDS``, doubling
+per attempt up to ``JOB_RETRY_MAX_SECONDS``, and fails for good after
+``max_attempts``. A job left running by a worker that died is queued
+again once its lock is older than ``JOB_LOCK_TIMEOUT_SECONDS``, so tasks
+must be safe to run more than once. With ``JOBS_EAGER`` a job runs in
+the process that queues it, for development without a worker.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+_random = random.SystemRandom()
+
+
+def task(name: str):
+    """Register the decorated function as the task ``name``; it is called with the job payload as keyword arguments."""
+    def register(func):
+        if _tasks.get(name, func) is not func:
+            raise ValueError(f'Task {name!r} is already registered.')
+        _tasks[name] = func
+        return func
+    return register
+
+
+def _jobs():
+    # The queue is read right after it is written, so never from a replica
+    return Job.objects.db_manager(router.db_for_write(Job))
+
+
+def enqueue(name: str, payload=None, key=None, delay: float = 0, max_attempts=None):
+    """
+    Queue the task ``name`` with ``payload``, to run after ``delay``
+    seconds. Returns the job, or ``None`` if a job with ``key`` is
+    already queued.
+    """
+    if name not in _tasks:
+        raise ValueError(f'Unknown task {name!r}.')
+    now = timezone.now()
+    job = Job(
+        name=name,
+        payload=payload or {},
+        key=key,
+        run_at=now + timedelta(seconds=delay),
+        max_attempts=max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 5),
+    )
+    eager = getattr(settings, 'JOBS_EAGER', False)
+    if eager:
+        job.status, job.attempts, job.locked_by, job.locked_at = Job.RUNNING, 1, 'eager', now
+    if key is None:
+        job.save(using=_jobs().db)
+    else:
+        try:
+            with transaction.atomic(using=_jobs().db):
+                job.save(using=_jobs().db)
+        except IntegrityError:
+            return None
+    if eager:
+        run(job)
+    return job
+
+
+def enqueue_on_commit(name: str, payload=None, key=None, delay: float = 0, max_attempts=None) -> None:
+    """``enqueue`` once the current transaction commits, or now outside of one."""
+    if name not in _tasks:
+        raise ValueError(f'Unknown task {name!r}.')
+    # A failed enqueue is logged and does not fail the committed request
+    transaction.on_commit(
+        lambda: enqueue(name, payload, key, delay, max_attempts),
+        using=_jobs().db,
+        robust=True,
+    )
+
+
+def claim(worker: str, limit: int = 1) -> list:
+    """Mark up to ``limit`` due jobs as running by ``worker`` and return them."""
+    jobs = _jobs()
+    now = timezone.now()
+    due = jobs.filter(status=Job.QUEUED, run_at__lte=now).order_by('run_at', 'id')
+    claimed = {'status': Job.RUNNING, 'locked_by': worker, 'locked_at': now, 'attempts': F('attempts') + 1}
+    if connections[jobs.db].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=jobs.db):
+            ids = list(due.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            if ids:
+                jobs.filter(id__in=ids).update(**claimed)
+    else:
+        ids = list(due.values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        # Another worker may have claimed some of them since
+        jobs.filter(id__in=ids, status=Job.QUEUED).update(**claimed)
+        ids = list(jobs.filter(id__in=ids, status=Job.RUNNING, locked_by=worker, locked_at=now).values_list('id', flat=True))
+    if not ids:
+        return []
+    return list(jobs.filter(id__in=ids).order_by('run_at', 'id'))
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before retrying a job that failed ``attempts`` times, with some jitter."""
+    base = getattr(settings, 'JOB_RETRY_BASE_SECONDS', 10)
+    delay = min(base * 2 ** max(attempts - 1, 0), getattr(settings, 'JOB_RETRY_MAX_SECONDS', 3600))
+    return delay + _random.uniform(0, delay / 4)
+
+
+def _requeue(held, **fields) -> bool:
+    """Queue the jobs of ``held`` again; ``False`` if a job of the same key is queued meanwhile."""
+    try:
+        with transaction.atomic(using=_jobs().db):
+            held.update(status=Job.QUEUED, locked_by='', locked_at=None, **fields)
+    except IntegrityError:
+        return False
+    return True
+
+
+def run(job: Job) -> bool:
+    """Run a claimed job and record the outcome. Returns whether it succeeded."""
+    # Only the worker holding the lock records the outcome
+    held = _jobs().filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by, locked_at=job.locked_at)
+    func = _tasks.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'Unknown task {job.name!r}.')
+        func(**job.payload)
+    except Exception:
+        logger.exception('Job %s (%s) failed on attempt %d', job.pk, job.name, job.attempts)
+        error = traceback.format_exc()
+        if func is not None and job.attempts < job.max_attempts:
+            run_at = timezone.now() + timedelta(seconds=retry_delay(job.attempts))
+            if _requeue(held, run_at=run_at, last_error=error):
+                return False
+        # Out of attempts, or a job of the same key is queued and will do the work
+        held.update(status=Job.FAILED, locked_by='', locked_at=None, last_error=error, finished_at=timezone.now())
+        return False
+    held.update(status=Job.DONE, locked_by='', locked_at=None, finished_at=timezone.now())
+    return True
+
+
+def work(worker: str, stop, poll_seconds: float = 1, once: bool = False) -> int:
+    """
+    Claim and run jobs as ``worker`` until the ``stop`` event is set, or
+    with ``once`` until no job is due. Returns the number of jobs run.
+    """
+    done = 0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            jobs = claim(worker)
+            if not jobs:
+                if once:
+                    break
+                stop.wait(poll_seconds)
+                continue
+            for job in jobs:
+                run(job)
+                done += 1
+    finally:
+        connections.close_all()
+    return done
+
+
+def requeue_stale() -> int:
+    """
+    Queue again the jobs running for longer than ``JOB_LOCK_TIMEOUT_SECONDS``,
+    whose worker presumably died, or fail them when out of attempts.
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'JOB_LOCK_TIMEOUT_SECONDS', 600))
+    stale = _jobs().filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    error = 'Worker lock expired.'
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_by='', locked_at=None, last_error=error, finished_at=timezone.now()
+    )
+    requeued = 0
+    for job in stale.filter(attempts__lt=F('max_attempts')).order_by('id'):
+        held = _jobs().filter(pk=job.pk, status=Job.RUNNING, locked_at=job.locked_at)
+        if _requeue(held, run_at=timezone.now(), last_error=error):
+            requeued += 1
+        else:
+            held.update(status=Job.FAILED, locked_by='', locked_at=None, last_error=error, finished_at=timezone.now())
+    return failed + requeued
+
+
+def prune() -> int:
+    """Delete finished jobs older than ``JOB_KEEP_SECONDS``; failed ones stay for inspection."""
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'JOB_KEEP_SECONDS', 7 * 24 * 3600))
+    deleted, _ = _jobs().filter(status=Job.DONE, finished_at__lt=cutoff).delete()
+    return deleted
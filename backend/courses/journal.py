@@ -0,0 +1,251 @@
+"""
+Offline progress journal.
+
+Field workers with poor connectivity record their actions on the device
+and send them later as one ordered journal to ``JournalSyncView``,
+instead of replaying every lesson and task call. Each event carries a
+client-generated idempotency ``key`` and the client time ``at`` of the
+action. This module parses a journal and decides which events take
+effect; the view applies them in one transaction.
+
+Conflicts are resolved deterministically:
+
+- An event whose key was already processed for the user is a replay and
+  is answered with the stored outcome. A key repeated within one
+  journal counts once.
+- Events are applied in order of client time, then of journal position.
+  Times in the future (clock skew) are clamped to the server time.
+- Lesson and task events set a state instead of toggling it, so an event
+  applied twice changes nothing and the latest event for a lesson or
+  task wins. An event older than the last change the server recorded
+  for the same lesson or task, for example from another device, is
+  superseded. Change times are whole seconds, so an event of the same
+  second is applied if it changes the state and unchanged otherwise.
+- Quiz submissions are separate attempts and never conflict.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import IntegrationTask, JournalEntry, LearningEvent, Lesson, Quiz
+
+MAX_EVENTS = 500
+
+LESSON_KINDS = (JournalEntry.LESSON_COMPLETE, JournalEntry.LESSON_UNCOMPLETE)
+TASK_KINDS = (JournalEntry.TASK_COMPLETE, JournalEntry.TASK_UNCOMPLETE)
+
+
+@dataclass
+class JournalEvent:
+    position: int
+    key: str = None
+    kind: str = None
+    at: datetime = None
+    course_id: int = None
+    lesson_id: int = None
+    task_id: int = None
+    answers: dict = field(default_factory=dict)
+    quiz: Quiz = None
+    status: str = None
+    detail: str = ''
+    attempt: object = None
+    # Answered from an earlier sync or an earlier event of this journal
+    replayed: bool = False
+
+    def reject(self, detail: str) -> None:
+        self.status = JournalEntry.REJECTED
+        self.detail = detail
+
+    @property
+    def is_pending(self) -> bool:
+        return self.status is None
+
+    @property
+    def unix_time(self) -> int:
+        return int(self.at.timestamp())
+
+    def result(self) -> dict:
+        data = {'key': self.key, 'status': self.status}
+        if self.detail:
+            data['detail'] = self.detail
+        if self.attempt is not None:
+            data['score'] = self.attempt.score
+            data['total'] = self.attempt.total
+        return data
+
+
+def _to_id(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 else None
+
+
+def parse_event(position: int, raw, now: datetime) -> JournalEvent:
+    """Build an event from one journal item; invalid items come back rejected."""
+    event = JournalEvent(position)
+    if not isinstance(raw, dict):
+        event.reject('Event must be an object.')
+        return event
+    key = raw.get('key')
+    if isinstance(key, str) and 0 < len(key) <= 64:
+        event.key = key
+    else:
+        event.reject('key must be a string of 1 to 64 characters.')
+        return event
+    event.kind = raw.get('type')
+    if event.kind not in dict(JournalEntry.KIND_CHOICES):
+        event.reject(f"Unknown type. Choose from: {', '.join(dict(JournalEntry.KIND_CHOICES))}.")
+        return event
+    try:
+        at = parse_datetime(raw['at']) if isinstance(raw.get('at'), str) else None
+    except ValueError:
+        # Well formed but not a real date, like 2026-13-45
+        at = None
+    if at is None:
+        event.reject('at must be an ISO 8601 date and time.')
+        return event
+    if timezone.is_naive(at):
+        at = timezone.make_aware(at)
+    event.at = min(at, now)
+    if event.kind in TASK_KINDS:
+        event.task_id = _to_id(raw.get('task'))
+        if event.task_id is None:
+            event.reject('task must be a task id.')
+        return event
+    event.course_id = _to_id(raw.get('course'))
+    if event.course_id is None:
+        event.reject('course must be a course id.')
+    elif event.kind in LESSON_KINDS:
+        event.lesson_id = _to_id(raw.get('lesson'))
+        if event.lesson_id is None:
+            event.reject('lesson must be a lesson id.')
+    else:
+        answers = raw.get('answers') or {}
+        if isinstance(answers, dict):
+            event.answers = answers
+        else:
+            event.reject('answers must be an object.')
+    return event
+
+
+def parse_journal(raw_events) -> list:
+    """Parse the ``events`` list of a request into ``JournalEvent`` objects."""
+    now = timezone.now()
+    return [parse_event(position, raw, now) for position, raw in enumerate(raw_events)]
+
+
+def resolve(user, events) -> list:
+    """
+    Settle replays, unknown references and stale events of ``events``
+    and return the remaining ones in the order they should be applied.
+    Costs a fixed number of queries however long the journal is.
+    """
+    _settle_replays(user, events)
+    pending = [event for event in events if event.is_pending]
+    _check_references(pending)
+    pending = [event for event in pending if event.is_pending]
+    _supersede_stale(user, pending)
+    return sorted((event for event in pending if event.is_pending), key=lambda event: (event.at, event.position))
+
+
+def _settle_replays(user, events) -> None:
+    keys = {event.key for event in events if event.key}
+    entries = {
+        entry.key: entry for entry in JournalEntry.objects.filter(user=user, key__in=keys).select_related('attempt')
+    } if keys else {}
+    seen = set()
+    for event in events:
+        if event.key is None:
+            continue
+        entry = entries.get(event.key)
+        if entry is not None:
+            event.status, event.detail, event.attempt = entry.status, entry.detail, entry.attempt
+            event.replayed = True
+        elif event.key in seen:
+            event.status, event.detail = JournalEntry.REJECTED, 'Duplicate key in this journal.'
+            event.replayed = True
+        seen.add(event.key)
+
+
+def _check_references(events) -> None:
+    lesson_ids = {event.lesson_id for event in events if event.lesson_id}
+    lesson_courses = dict(Lesson.objects.filter(id__in=lesson_ids).values_list('id', 'course_id')) if lesson_ids else {}
+    task_ids = {event.task_id for event in events if event.task_id}
+    known_tasks = set(IntegrationTask.objects.filter(id__in=task_ids).values_list('id', flat=True)) if task_ids else set()
+    quiz_course_ids = {event.course_id for event in events if event.kind == JournalEntry.QUIZ_SUBMIT}
+    quizzes = {
+        quiz.course_id: quiz for quiz in Quiz.objects.filter(course_id__in=quiz_course_ids).select_related('course')
+    } if quiz_course_ids else {}
+    for event in events:
+        if event.kind in LESSON_KINDS:
+            if lesson_courses.get(event.lesson_id) != event.course_id:
+                event.reject('Lesson not found in this course.')
+        elif event.kind in TASK_KINDS:
+            if event.task_id not in known_tasks:
+                event.reject('Task not found.')
+        elif event.course_id in quizzes:
+            event.quiz = quizzes[event.course_id]
+        else:
+            event.reject('Quiz not found.')
+
+
+def _latest_changes(user, kinds, column: str, ids) -> dict:
+    if not ids:
+        return {}
+    return dict(
+        LearningEvent.objects.filter(user=user, kind__in=kinds, **{f'{column}__in': ids})
+        .order_by()
+        .values(column)
+        .annotate(last=Max('occurred_at'))
+        .values_list(column, 'last')
+    )
+
+
+def _supersede_stale(user, events) -> None:
+    lessons = _latest_changes(
+        user,
+        (LearningEvent.LESSON_COMPLETED, LearningEvent.LESSON_UNCOMPLETED),
+        'lesson_id',
+        {event.lesson_id for event in events if event.lesson_id},
+    )
+    tasks = _latest_changes(
+        user,
+        (LearningEvent.TASK_COMPLETED, LearningEvent.TASK_UNCOMPLETED),
+        'task_id',
+        {event.task_id for event in events if event.task_id},
+    )
+    for event in events:
+        if event.kind in LESSON_KINDS:
+            last = lessons.get(event.lesson_id)
+        elif event.kind in TASK_KINDS:
+            last = tasks.get(event.task_id)
+        else:
+            continue
+        # A tie is no evidence of order; applying the event settles it
+        if last is not None and event.unix_time < last:
+            event.status = JournalEntry.SUPERSEDED
+            event.detail = 'A newer change was already recorded.'
+
+
+def record(user, events) -> None:
+    """Store the outcome of every processed event that is not a replay."""
+    JournalEntry.objects.bulk_create([
+        JournalEntry(
+            user=user,
+            key=event.key,
+            kind=event.kind,
+            status=event.status,
+            detail=event.detail,
+            occurred_at=event.at,
+            attempt=event.attempt,
+        )
+        for event in events
+        if event.key and event.kind and event.at and not event.replayed
+    ])
@@ -0,0 +1,22 @@
+"""
+Recompute the learning analytics summary tables from ``LearningEvent``.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Compute completion times, lesson drop-off and cohort retention from learning events.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200_000, help='Events loaded per query.')
+
+    def handle(self, *args, **options):
+        try:
+            from courses import analytics
+        except ImportError as exc:
+            raise CommandError(f'Learning analytics require NumPy ({exc}).')
+        counts = analytics.run(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            'Processed {events} events: {courses} course(s), {lessons} lesson(s), '
+            '{cohort_points} cohort point(s).'.format(**counts)
+        ))
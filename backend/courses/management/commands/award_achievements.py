@@ -0,0 +1,26 @@
+"""
+Evaluate achievement rules for every user and award those met, see
+``courses.achievements``. Saving a rule in the admin does this in the
+background; run it after importing progress in bulk, or to award rules
+created outside the admin.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import achievements
+from courses.models import Achievement
+
+
+class Command(BaseCommand):
+    help = 'Award achievement rules to every user who meets them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('codes', nargs='*', help='Achievement codes to evaluate (default: all rules).')
+
+    def handle(self, *args, **options):
+        codes = options['codes'] or None
+        if codes:
+            unknown = set(codes) - set(Achievement.objects.exclude(metric='').filter(code__in=codes).values_list('code', flat=True))
+            if unknown:
+                raise CommandError(f"No achievement rule with code {', '.join(sorted(unknown))}.")
+        awarded = achievements.award_all(codes)
+        self.stdout.write(self.style.SUCCESS(f'Awarded {awarded} achievement(s).'))
@@ -0,0 +1,143 @@
+"""
+Measure the throughput of the synchronous and async read endpoints.
+
+The command only generates load; start the two servers yourself against
+the same database, for example::
+
+    gunicorn integration_platform.wsgi -w 4 --threads 8 -b 127.0.0.1:8000
+    uvicorn integration_platform.asgi:application --workers 4 --port 8001
+    python manage.py bench_async_views --user alice \\
+        --wsgi http://127.0.0.1:8000 --asgi http://127.0.0.1:8001
+
+Each endpoint is requested ``--requests`` times by ``--concurrency``
+keep-alive connections, first the DRF view on the WSGI server, then its
+``/api/courses/async/`` counterpart on the ASGI server. The load client
+is a small asyncio HTTP/1.1 client, so no extra dependency is needed.
+"""
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from courses.models import Course
+
+ENDPOINTS = {
+    'courses': ('/api/courses/', '/api/courses/async/'),
+    'course': ('/api/courses/{course_id}/', '/api/courses/async/{course_id}/'),
+    'progress': ('/api/courses/progress/', '/api/courses/async/progress/'),
+    'activities': ('/api/courses/activities/', '/api/courses/async/activities/'),
+    'achievements': ('/api/courses/achievements/', '/api/courses/async/achievements/'),
+    'dashboard': ('/api/courses/dashboard/', '/api/courses/async/dashboard/'),
+}
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response; return its status and whether the connection stays open."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if not size:
+                break
+    else:
+        await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def run_load(base_url, path, token, requests, concurrency):
+    """Return per-request latencies in seconds, the error count and the wall time."""
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    request = (
+        f'GET {path} HTTP/1.1\r\n'
+        f'Host: {url.netloc}\r\n'
+        f'Authorization: Bearer {token}\r\n'
+        'Connection: keep-alive\r\n\r\n'
+    ).encode()
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        reader = writer = None
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                writer.write(request)
+                status, keep_alive = await read_response(reader)
+            except (OSError, asyncio.IncompleteReadError):
+                errors += 1
+                writer = None
+                continue
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        if writer is not None:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Compare the throughput of the WSGI (DRF) and ASGI (async) read endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi', required=True, help='Base URL of the WSGI server.')
+        parser.add_argument('--asgi', required=True, help='Base URL of the ASGI server.')
+        parser.add_argument('--user', required=True, help='Username the requests authenticate as.')
+        parser.add_argument('--endpoint', action='append', choices=sorted(ENDPOINTS), help='Repeatable; all by default.')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and server.')
+        parser.add_argument('--concurrency', type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['user']}' does not exist.")
+        course_id = Course.objects.order_by('id').values_list('id', flat=True).first()
+        if course_id is None:
+            raise CommandError('Create at least one course first.')
+        token = str(AccessToken.for_user(user))
+        self.stdout.write(f"{options['requests']} requests per run, concurrency {options['concurrency']}")
+        for name in options['endpoint'] or ENDPOINTS:
+            for server, base_url, path in (
+                ('wsgi', options['wsgi'], ENDPOINTS[name][0]),
+                ('asgi', options['asgi'], ENDPOINTS[name][1]),
+            ):
+                latencies, errors, elapsed = asyncio.run(run_load(
+                    base_url, path.format(course_id=course_id), token, options['requests'], options['concurrency']
+                ))
+                self.report(name, server, latencies, errors, elapsed)
+
+    def report(self, name, server, latencies, errors, elapsed):
+        if not latencies:
+            self.stdout.write(f'{name:12} {server}: no successful requests ({errors} errors)')
+            return
+        latencies.sort()
+        self.stdout.write(
+            f'{name:12} {server}: {len(latencies) / elapsed:8.1f} req/s, '
+            f'median {statistics.median(latencies) * 1000:7.1f} ms, '
+            f'p99 {latencies[max(int(len(latencies) * 0.99) - 1, 0)] * 1000:7.1f} ms, '
+            f'errors {errors}'
+        )
@@ -0,0 +1,130 @@
+"""
+Compare the two completed-lesson representations on synthetic data.
+
+The command creates users, courses and completions inside a transaction
+that is rolled back at the end. It reports the storage used by the
+``completed_lessons`` join table against the bitmaps, and the latency of
+``ProgressListView`` with each storage. It also checks that both return
+identical responses.
+"""
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from courses import bitset
+from courses.models import Course, Lesson, Progress
+from courses.views import ProgressListView
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark join-table and bitmap storage of completed lessons.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--courses', type=int, default=5)
+        parser.add_argument('--lessons', type=int, default=300, help='Lessons per course.')
+        parser.add_argument('--completion', type=float, default=0.5, help='Share of lessons completed.')
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per storage.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, options):
+        rng = random.Random(42)
+        self.stdout.write('Creating synthetic data...')
+        users = User.objects.bulk_create(
+            [User(username=f'bench-progress-{index}', password='!') for index in range(options['users'])]
+        )
+        if users[0].pk is None:
+            users = list(User.objects.filter(username__startswith='bench-progress-'))
+        courses = []
+        for index in range(options['courses']):
+            course = Course.objects.create(title=f'Benchmark course {index}')
+            Lesson.objects.bulk_create(
+                [Lesson(course=course, title=f'Lesson {slot}', order=slot, slot=slot) for slot in range(options['lessons'])]
+            )
+            course.next_lesson_slot = options['lessons']
+            course.save(update_fields=['next_lesson_slot'])
+            courses.append((course, list(course.lessons.values_list('id', 'slot'))))
+
+        through = Progress.completed_lessons.through
+        for course, lessons in courses:
+            Progress.objects.bulk_create([Progress(user=user, course=course) for user in users], batch_size=1000)
+            records = list(Progress.objects.filter(course=course))
+            links = []
+            for record in records:
+                done = [lesson for lesson in lessons if rng.random() < options['completion']]
+                links.extend(through(progress_id=record.id, lesson_id=lesson_id) for lesson_id, _ in done)
+                record.completed_bitmap = bitset.from_int(bitset.mask_for_slots(slot for _, slot in done))
+            Progress.objects.bulk_update(records, ['completed_bitmap'], batch_size=1000)
+            through.objects.bulk_create(links, batch_size=5000)
+
+        self.report_storage(through)
+        self.report_latency(users, options['requests'], rng)
+
+    def report_storage(self, through):
+        rows = through.objects.count()
+        bitmap_bytes = sum(len(bytes(value)) for value in Progress.objects.values_list('completed_bitmap', flat=True))
+        join_bytes = self.table_size(through._meta.db_table)
+        self.stdout.write(f'Join table rows:     {rows}')
+        if join_bytes is not None:
+            self.stdout.write(f'Join table size:     {join_bytes / 1024:.1f} KiB (table and indexes)')
+        else:
+            self.stdout.write('Join table size:     unavailable on this database')
+        self.stdout.write(f'Bitmap payload size: {bitmap_bytes / 1024:.1f} KiB')
+
+    def table_size(self, table):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_total_relation_size(%s::regclass)', [table])
+                return cursor.fetchone()[0]
+            if connection.vendor == 'sqlite':
+                try:
+                    cursor.execute(
+                        'SELECT SUM(pgsize) FROM dbstat WHERE name = %s '
+                        'OR name IN (SELECT name FROM sqlite_master WHERE tbl_name = %s)',
+                        [table, table],
+                    )
+                except Exception:
+                    return None
+                return cursor.fetchone()[0]
+        return None
+
+    def report_latency(self, users, requests, rng):
+        factory = APIRequestFactory()
+        view = ProgressListView.as_view()
+        sample = [rng.choice(users) for _ in range(requests)]
+        responses = {}
+        for storage in ('m2m', 'bitmap'):
+            timings = []
+            with override_settings(PROGRESS_COMPLETION_STORAGE=storage):
+                for user in sample:
+                    request = factory.get('/api/courses/progress/')
+                    force_authenticate(request, user=user)
+                    started = time.perf_counter()
+                    response = view(request)
+                    response.render()
+                    timings.append((time.perf_counter() - started) * 1000)
+                    responses.setdefault(user.pk, {})[storage] = response.content
+            timings.sort()
+            self.stdout.write(
+                f'ProgressListView ({storage:6}): median {statistics.median(timings):.2f} ms, '
+                f'p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms'
+            )
+        identical = all(pair['m2m'] == pair['bitmap'] for pair in responses.values())
+        self.stdout.write(f'Responses identical: {identical}')
@@ -0,0 +1,156 @@
+"""
+Check and benchmark the values-based serializers of ``courses.fast_serializers``.
+
+The command creates synthetic courses, progress records, tasks and
+activity entries for one user inside a transaction that is rolled back
+at the end. For every list serializer it renders the DRF serializer and
+its values-based replacement with ``JSONRenderer``, fails if the bytes
+differ, and reports the median cost per row of both, queries included.
+Progress records are checked with both completion storages.
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from courses import bitset
+from courses.fast_serializers import (
+    ActivityLogValuesSerializer,
+    CourseValuesSerializer,
+    ProgressValuesSerializer,
+    UserTaskValuesSerializer,
+)
+from courses.models import ActivityLog, Course, IntegrationTask, Lesson, Progress, UserTask
+from courses.serializers import ActivityLogSerializer, CourseSerializer, ProgressSerializer, UserTaskSerializer
+from courses.views import progress_queryset
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Verify and benchmark the values-based list serializers against the DRF ones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Rows per serialized list.')
+        parser.add_argument('--lessons', type=int, default=20, help='Lessons per course.')
+        parser.add_argument('--repeat', type=int, default=10, help='Timed runs per serializer.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                mismatches = self.run(options)
+                raise Rollback
+        except Rollback:
+            pass
+        if mismatches:
+            raise CommandError(f"Output differs for: {', '.join(mismatches)}")
+        self.stdout.write('All outputs identical.')
+
+    def run(self, options):
+        rng = random.Random(42)
+        rows = options['rows']
+        self.stdout.write('Creating synthetic data...')
+        user = User.objects.create(username='bench-serializers', password='!')
+        roles = [role for role, _ in Course.ROLE_CHOICES]
+        courses = Course.objects.bulk_create([
+            Course(
+                title=f'Курс {index}',
+                description='Описание «курса»\n' * rng.randint(0, 3),
+                role=rng.choice(roles),
+                image_url=f'https://example.com/{index}.png' if index % 2 else '',
+            )
+            for index in range(rows)
+        ])
+        if courses[0].pk is None:
+            courses = list(Course.objects.filter(title__startswith='Курс ').order_by('id'))
+        lessons = [
+            Lesson(course=course, title=f'Lesson {slot}', order=rng.randint(0, options['lessons']), slot=slot)
+            for course in courses
+            for slot in range(options['lessons'])
+        ]
+        Lesson.objects.bulk_create(lessons, batch_size=5000)
+        Course.objects.filter(id__in=[course.id for course in courses]).update(next_lesson_slot=options['lessons'])
+        slots = {}
+        for course_id, lesson_id, slot in Lesson.objects.filter(course__in=courses).values_list('course_id', 'id', 'slot'):
+            slots.setdefault(course_id, []).append((lesson_id, slot))
+
+        records = Progress.objects.bulk_create([
+            Progress(user=user, course=course, daily_goal_minutes=rng.choice([10, 20]), daily_minutes_today=rng.randint(0, 30))
+            for course in courses
+        ], batch_size=1000)
+        if records[0].pk is None:
+            records = list(Progress.objects.filter(user=user))
+        through = Progress.completed_lessons.through
+        links = []
+        for record in records:
+            done = [pair for pair in slots[record.course_id] if rng.random() < 0.5]
+            links.extend(through(progress_id=record.id, lesson_id=lesson_id) for lesson_id, _ in done)
+            record.completed_bitmap = bitset.from_int(bitset.mask_for_slots(slot for _, slot in done))
+        Progress.objects.bulk_update(records, ['completed_bitmap'], batch_size=1000)
+        through.objects.bulk_create(links, batch_size=5000)
+
+        now = timezone.now()
+        tasks = IntegrationTask.objects.bulk_create(
+            [IntegrationTask(description=f'Задача {index}', order=index) for index in range(rows)]
+        )
+        if tasks[0].pk is None:
+            tasks = list(IntegrationTask.objects.filter(description__startswith='Задача '))
+        UserTask.objects.bulk_create([
+            UserTask(
+                user=user,
+                task=task,
+                completed=index % 3 == 0,
+                # Whole seconds as well, which DRF formats without microseconds
+                completed_at=now.replace(microsecond=0) - timedelta(minutes=index) if index % 3 == 0 else None,
+            )
+            for index, task in enumerate(tasks)
+        ], batch_size=1000)
+        ActivityLog.objects.bulk_create(
+            [ActivityLog(user=user, action=f'Действие {index}') for index in range(rows)], batch_size=1000
+        )
+
+        cases = [
+            ('courses', CourseSerializer, CourseValuesSerializer, lambda: Course.objects.filter(progress_records__user=user).order_by('id')),
+            ('tasks', UserTaskSerializer, UserTaskValuesSerializer, lambda: UserTask.objects.filter(user=user).select_related('task').order_by('task__order')),
+            ('activities', ActivityLogSerializer, ActivityLogValuesSerializer, lambda: ActivityLog.objects.filter(user=user).order_by('-timestamp')),
+        ]
+        mismatches = []
+        for name, serializer_class, values_serializer_class, queryset in cases:
+            if not self.compare(name, serializer_class, values_serializer_class, queryset, options['repeat']):
+                mismatches.append(name)
+        for storage in ('m2m', 'bitmap'):
+            with override_settings(PROGRESS_COMPLETION_STORAGE=storage):
+                name = f'progress ({storage})'
+                if not self.compare(name, ProgressSerializer, ProgressValuesSerializer, lambda: progress_queryset(user), options['repeat']):
+                    mismatches.append(name)
+        return mismatches
+
+    def compare(self, name, serializer_class, values_serializer_class, queryset, repeat) -> bool:
+        renderer = JSONRenderer()
+        expected = renderer.render(serializer_class(queryset(), many=True).data)
+        actual = renderer.render(values_serializer_class().serialize(queryset()))
+        count = len(values_serializer_class().serialize(queryset()))
+        drf = self.time_per_row(lambda: serializer_class(queryset(), many=True).data, count, repeat)
+        fast = self.time_per_row(lambda: values_serializer_class().serialize(queryset()), count, repeat)
+        self.stdout.write(
+            f'{name:18} {count:6} rows  DRF {drf:7.2f} µs/row  values {fast:7.2f} µs/row  '
+            f'x{drf / fast if fast else 0:5.1f}  identical: {expected == actual}'
+        )
+        return expected == actual
+
+    def time_per_row(self, serialize, count, repeat) -> float:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            serialize()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) / max(count, 1) * 1e6
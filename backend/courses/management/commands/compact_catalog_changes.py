@@ -0,0 +1,21 @@
+"""
+Delete catalog change entries superseded by a later entry for the same
+object. Sync results are unaffected, since ``changes_since`` only
+returns the last change of each object, and the log stays roughly as
+large as the number of catalog objects ever created.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from courses.models import CatalogChange
+
+
+class Command(BaseCommand):
+    help = 'Remove superseded CatalogChange entries.'
+
+    def handle(self, *args, **options):
+        later = CatalogChange.objects.filter(
+            model=OuterRef('model'), object_id=OuterRef('object_id'), id__gt=OuterRef('id')
+        )
+        deleted, _ = CatalogChange.objects.filter(Exists(later)).delete()
+        self.stdout.write(self.style.SUCCESS(f'Removed {deleted} superseded change(s).'))
@@ -0,0 +1,35 @@
+"""
+Render the public catalog to static, precompressed JSON files and make
+them the current snapshot, see ``courses.snapshots``. Run it after bulk
+content changes and periodically, so that ratings and other counters in
+the course details stay fresh.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import snapshots
+
+
+class Command(BaseCommand):
+    help = 'Publish static JSON snapshots of the course catalog.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--root', help='Snapshot directory (default: CATALOG_SNAPSHOT_ROOT).')
+        parser.add_argument(
+            '--keep', type=int, default=snapshots.KEEP_RELEASES, help='Releases to keep, the current one included.'
+        )
+
+    def handle(self, *args, **options):
+        root = options['root'] or getattr(settings, 'CATALOG_SNAPSHOT_ROOT', None)
+        if not root:
+            raise CommandError('Set CATALOG_SNAPSHOT_ROOT or pass --root.')
+        if options['keep'] < 1:
+            raise CommandError('--keep must be at least 1.')
+        result = snapshots.publish(root, keep=options['keep'])
+        if result.unchanged:
+            self.stdout.write(f'Catalog unchanged, version {result.version} is current.')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Published version {result.version}: {result.files} file(s), '
+            f'{result.written} written, {result.linked} reused.'
+        ))
@@ -0,0 +1,17 @@
+"""
+Recompute the materialized ``CourseStats`` rows from the source tables.
+"""
+from django.core.management.base import BaseCommand
+
+from courses.stats import rebuild_course_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-course statistics from reviews, progress and quiz results.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_ids', nargs='*', type=int, help='Limit the rebuild to these courses.')
+
+    def handle(self, *args, **options):
+        count = rebuild_course_stats(options['course_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics for {count} course(s).'))
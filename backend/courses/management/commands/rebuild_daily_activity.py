@@ -0,0 +1,19 @@
+"""
+Recompute the per-user daily activity and streaks from the learning
+events, see ``courses.daily_activity``. Run it once to fill the history
+recorded before daily activity was kept.
+"""
+from django.core.management.base import BaseCommand
+
+from courses.daily_activity import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild UserDailyActivity and UserStreak from learning events.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help='Limit the rebuild to these users.')
+
+    def handle(self, *args, **options):
+        count = rebuild(options['user_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} day(s) of activity.'))
@@ -0,0 +1,18 @@
+"""
+Recompute the per-question and per-answer quiz counters from the stored
+attempts.
+"""
+from django.core.management.base import BaseCommand
+
+from courses.quiz_stats import rebuild_question_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild QuestionStats and AnswerStats from quiz attempt answers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_ids', nargs='*', type=int, help='Limit the rebuild to these quizzes.')
+
+    def handle(self, *args, **options):
+        count = rebuild_question_stats(options['quiz_ids'] or None)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt statistics for {count} question(s).'))
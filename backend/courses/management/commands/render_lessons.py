@@ -0,0 +1,65 @@
+"""
+Render lesson content again for the whole catalog, see
+``courses.content``. By default only lessons rendered by an older
+renderer, or never rendered, are processed; ``--all`` renders every
+lesson, for example after changing ``LESSON_READING_WORDS_PER_MINUTE``.
+
+Rendering runs in a pool of worker processes while the main process
+reads the next batch and writes the results with ``bulk_update``.
+"""
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import content as content_pipeline, snapshots
+from courses.models import Lesson, reading_speed
+
+
+def _render(task):
+    # Runs in a worker process
+    lesson_id, text, words_per_minute = task
+    return lesson_id, hashlib.sha256(text.encode('utf-8')).hexdigest(), content_pipeline.render(text, words_per_minute)
+
+
+class Command(BaseCommand):
+    help = 'Render lesson content to HTML, table of contents, media and reading time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Render every lesson, not only stale ones.')
+        parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count).')
+        parser.add_argument('--batch-size', type=int, default=500, help='Lessons read and written per batch.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be at least 1.')
+        lessons = Lesson.objects.order_by('id')
+        if not options['all']:
+            lessons = lessons.exclude(render_version=content_pipeline.RENDERER_VERSION)
+        words_per_minute = reading_speed()
+        rendered = 0
+        last_id = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                # Keyset pagination: rendered lessons drop out of the stale filter
+                batch = list(lessons.filter(id__gt=last_id).values_list('id', 'content')[:options['batch_size']])
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+                tasks = [(lesson_id, text, words_per_minute) for lesson_id, text in batch]
+                updated = []
+                for lesson_id, digest, result in pool.map(_render, tasks, chunksize=max(len(tasks) // 32, 1)):
+                    lesson = Lesson(id=lesson_id)
+                    lesson.apply_rendered(result, digest)
+                    updated.append(lesson)
+                # Signals do not fire: the rendered columns are not part of the catalog sync
+                Lesson.objects.bulk_update(updated, Lesson.RENDERED_FIELDS)
+                rendered += len(updated)
+                self.stdout.write(f'Rendered {rendered} lesson(s)...')
+        if rendered and getattr(settings, 'CATALOG_SNAPSHOT_ROOT', None):
+            # Course details show the reading time
+            snapshots.publish()
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} lesson(s).'))
@@ -0,0 +1,56 @@
+"""
+Run background jobs from the database queue, see ``courses.jobs``.
+
+Each of ``--concurrency`` threads claims and runs one job at a time;
+start several of these processes, on one or more hosts, for more. The
+main thread queues the jobs of dead workers again and deletes old
+finished jobs. SIGINT and SIGTERM stop the worker once the running jobs
+finish. With ``--once`` the worker exits when no job is due, for cron.
+"""
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import jobs
+
+# Seconds between sweeps for stale and old jobs
+MAINTENANCE_SECONDS = 60
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help='Jobs run in parallel (threads).')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds to wait when no job is due.')
+        parser.add_argument('--once', action='store_true', help='Exit when no job is due.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1.')
+        if options['poll'] <= 0:
+            raise CommandError('--poll must be positive.')
+        stop = threading.Event()
+        if not options['once']:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: stop.set())
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f"Worker {name} running {options['concurrency']} thread(s).")
+        jobs.requeue_stale()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            futures = [
+                pool.submit(jobs.work, f'{name}:{index}', stop, options['poll'], options['once'])
+                for index in range(options['concurrency'])
+            ]
+            while not all(future.done() for future in futures):
+                if stop.wait(MAINTENANCE_SECONDS if not options['once'] else 0.1):
+                    break
+                if not options['once']:
+                    jobs.requeue_stale()
+                    jobs.prune()
+            done = sum(future.result() for future in futures)
+        self.stdout.write(self.style.SUCCESS(f'Ran {done} job(s).'))
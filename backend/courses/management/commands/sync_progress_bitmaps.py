@@ -0,0 +1,32 @@
+"""
+Rebuild ``Progress.completed_bitmap`` from the ``completed_lessons`` join
+table. Run it before switching ``PROGRESS_COMPLETION_STORAGE`` to
+``'bitmap'`` on a database whose bitmaps may have drifted.
+"""
+from django.core.management.base import BaseCommand
+
+from courses import bitset
+from courses.models import Progress
+
+
+class Command(BaseCommand):
+    help = 'Rebuild completed-lesson bitmaps from the completed_lessons relation.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        through = Progress.completed_lessons.through
+        ids = list(Progress.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            masks = dict.fromkeys(batch, 0)
+            rows = through.objects.filter(progress_id__in=batch).values_list('progress_id', 'lesson__slot')
+            for progress_id, slot in rows:
+                masks[progress_id] |= bitset.mask_for_slots([slot])
+            Progress.objects.bulk_update(
+                [Progress(id=progress_id, completed_bitmap=bitset.from_int(mask)) for progress_id, mask in masks.items()],
+                ['completed_bitmap'],
+            )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(ids)} progress bitmap(s).'))
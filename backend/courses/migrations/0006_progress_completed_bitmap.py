@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:19
+
+from django.db import migrations, models
+
+from courses import bitset
+
+
+def assign_slots_and_bitmaps(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Lesson = apps.get_model('courses', 'Lesson')
+    Progress = apps.get_model('courses', 'Progress')
+    # Number each course's lessons in display order
+    for course in Course.objects.all():
+        lessons = list(Lesson.objects.filter(course=course).order_by('order', 'id'))
+        for slot, lesson in enumerate(lessons):
+            lesson.slot = slot
+        Lesson.objects.bulk_update(lessons, ['slot'], batch_size=500)
+        course.next_lesson_slot = len(lessons)
+        course.save(update_fields=['next_lesson_slot'])
+    # Copy the join table into the bitmaps
+    Through = Progress.completed_lessons.through
+    masks = {}
+    for progress_id, slot in Through.objects.values_list('progress_id', 'lesson__slot').iterator():
+        masks[progress_id] = masks.get(progress_id, 0) | (1 << slot)
+    records = [Progress(id=progress_id, completed_bitmap=bitset.from_int(mask)) for progress_id, mask in masks.items()]
+    Progress.objects.bulk_update(records, ['completed_bitmap'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='next_lesson_slot',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='slot',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='progress',
+            name='completed_bitmap',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.RunPython(assign_slots_and_bitmaps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='lesson',
+            constraint=models.UniqueConstraint(fields=('course', 'slot'), name='lesson_unique_course_slot'),
+        ),
+    ]
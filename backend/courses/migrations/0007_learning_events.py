@@ -0,0 +1,73 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:22
+
+import courses.models
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0006_progress_completed_bitmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseAnalytics',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='analytics', serialize=False, to='courses.course')),
+                ('learners', models.PositiveIntegerField(default=0)),
+                ('completers', models.PositiveIntegerField(default=0)),
+                ('median_completion_seconds', models.PositiveIntegerField(blank=True, null=True)),
+                ('p90_completion_seconds', models.PositiveIntegerField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'course analytics',
+            },
+        ),
+        migrations.CreateModel(
+            name='LessonFunnel',
+            fields=[
+                ('lesson', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='funnel', serialize=False, to='courses.lesson')),
+                ('position', models.PositiveIntegerField()),
+                ('reached', models.PositiveIntegerField(default=0)),
+                ('dropoff_rate', models.FloatField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lesson_funnel', to='courses.course')),
+            ],
+            options={
+                'ordering': ['course', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LearningEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.PositiveSmallIntegerField(choices=[(1, 'Lesson completed'), (2, 'Lesson uncompleted'), (3, 'Quiz submitted'), (4, 'Task completed'), (5, 'Task uncompleted')])),
+                ('value', models.IntegerField(blank=True, null=True)),
+                ('occurred_at', models.BigIntegerField(default=courses.models.current_unix_time)),
+                ('course', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='courses.course')),
+                ('lesson', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='courses.lesson')),
+                ('task', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='courses.integrationtask')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='learning_events', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CohortRetention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cohort_week', models.DateField()),
+                ('week_offset', models.PositiveIntegerField()),
+                ('cohort_size', models.PositiveIntegerField()),
+                ('active_users', models.PositiveIntegerField()),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'ordering': ['cohort_week', 'week_offset'],
+                'unique_together': {('cohort_week', 'week_offset')},
+            },
+        ),
+    ]
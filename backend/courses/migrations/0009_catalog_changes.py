@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:50
+
+from django.db import migrations, models
+
+# Same order as ``courses.catalog_sync.TRACKED``, parents first
+TRACKED_MODELS = (
+    ('course', 'Course'),
+    ('module', 'Module'),
+    ('lesson', 'Lesson'),
+    ('quiz', 'Quiz'),
+    ('question', 'Question'),
+    ('answer', 'Answer'),
+)
+
+
+def log_existing_catalog(apps, schema_editor):
+    # Existing content has no changes yet; a sync from cursor 0 must still return it
+    CatalogChange = apps.get_model('courses', 'CatalogChange')
+    for label, model_name in TRACKED_MODELS:
+        model = apps.get_model('courses', model_name)
+        CatalogChange.objects.bulk_create(
+            [
+                CatalogChange(model=label, object_id=object_id)
+                for object_id in model.objects.order_by('id').values_list('id', flat=True).iterator()
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_quiz_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(choices=[('course', 'Course'), ('module', 'Module'), ('lesson', 'Lesson'), ('quiz', 'Quiz'), ('question', 'Question'), ('answer', 'Answer')], max_length=16)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'object_id'], name='catalogchange_object_idx')],
+            },
+        ),
+        migrations.RunPython(log_existing_catalog, migrations.RunPython.noop),
+    ]
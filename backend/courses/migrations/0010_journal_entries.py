@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0009_catalog_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=64)),
+                ('kind', models.CharField(choices=[('lesson_complete', 'Lesson complete'), ('lesson_uncomplete', 'Lesson uncomplete'), ('task_complete', 'Task complete'), ('task_uncomplete', 'Task uncomplete'), ('quiz_submit', 'Quiz submit')], max_length=20)),
+                ('status', models.CharField(choices=[('applied', 'Applied'), ('unchanged', 'Unchanged'), ('superseded', 'Superseded'), ('rejected', 'Rejected')], max_length=16)),
+                ('detail', models.CharField(blank=True, max_length=255)),
+                ('occurred_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('attempt', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.quizattempt')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='journal_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'journal entries',
+                'unique_together': {('user', 'key')},
+            },
+        ),
+    ]
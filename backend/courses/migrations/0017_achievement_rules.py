@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:21
+
+from django.db import migrations, models
+
+# The achievements the views used to award, now rules
+DEFAULT_RULES = (
+    ('first_course', 'First Course Completed', 'Completed your first course', 'courses_completed'),
+    ('first_quiz', 'First Quiz Completed', 'Completed your first course quiz', 'quizzes_submitted'),
+)
+
+
+def create_default_rules(apps, schema_editor):
+    Achievement = apps.get_model('courses', 'Achievement')
+    for code, name, description, metric in DEFAULT_RULES:
+        achievement, created = Achievement.objects.get_or_create(
+            code=code,
+            defaults={'name': name, 'description': description, 'metric': metric},
+        )
+        if not created:
+            achievement.metric = metric
+            achievement.save(update_fields=['metric'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0016_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='achievement',
+            name='metric',
+            field=models.CharField(blank=True, choices=[('courses_completed', 'Courses completed'), ('lessons_completed', 'Lessons completed'), ('quizzes_submitted', 'Quizzes submitted'), ('quiz_score', 'Best quiz score, percent'), ('longest_streak', 'Longest streak, days'), ('tasks_completed', 'Integration tasks completed')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='achievement',
+            name='threshold',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(create_default_rules, migrations.RunPython.noop),
+    ]
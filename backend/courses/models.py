@@ -5,9 +5,17 @@ This module defines Course, Lesson and Progress models. Courses contain
 multiple lessons, and each user has a Progress record per course that
 tracks which lessons have been completed.
 """
-from django.db import models
+import hashlib
+import time
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 
+from . import bitset, content as content_pipeline
+
 
 class Course(models.Model):
     """Represents a training course."""
@@ -18,11 +26,12 @@ class Course(models.Model):
         ('seller', 'Seller'),
     ]
 
-    title = models.CharField(max_length=255)
+    title = models.CharField(max_length=255, db_index=True)
     description = models.TextField(blank=True)
     image_url = models.URLField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='welder')
+    next_lesson_slot = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self) -> str:
         return self.title
@@ -58,13 +67,155 @@ class Lesson(models.Model):
     image_url = models.URLField(blank=True)
     order = models.PositiveIntegerField(default=0)
     estimated_minutes = models.PositiveIntegerField(default=10)
+    # Bit position of the lesson in Progress.completed_bitmap
+    slot = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # Rendered from content on save, see courses.content
+    content_html = models.TextField(blank=True, editable=False)
+    content_toc = models.JSONField(default=list, blank=True, editable=False)
+    content_media = models.JSONField(default=list, blank=True, editable=False)
+    reading_minutes = models.PositiveIntegerField(default=0, editable=False)
+    # SHA-256 of the content last rendered, and the renderer version used
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    render_version = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    # Columns written by render_content
+    RENDERED_FIELDS = ('content_html', 'content_toc', 'content_media', 'reading_minutes', 'content_hash', 'render_version')
+    # The bulky ones, to defer where lessons are listed
+    RENDERED_BODY_FIELDS = ('content_html', 'content_toc', 'content_media')
 
     class Meta:
         ordering = ['order', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'slot'], name='lesson_unique_course_slot'),
+        ]
 
     def __str__(self) -> str:
         return f"{self.course.title} - {self.title}"
 
+    @property
+    def is_rendered(self) -> bool:
+        return self.render_version == content_pipeline.RENDERER_VERSION
+
+    def render_content(self, force: bool = False) -> bool:
+        """Render ``content`` into the rendered columns if it changed. Returns whether it did."""
+        digest = hashlib.sha256(self.content.encode('utf-8')).hexdigest()
+        if not force and self.is_rendered and digest == self.content_hash:
+            return False
+        self.apply_rendered(content_pipeline.render(self.content, reading_speed()), digest)
+        return True
+
+    def apply_rendered(self, rendered, digest: str) -> None:
+        self.content_html = rendered.html
+        self.content_toc = rendered.toc
+        self.content_media = rendered.media
+        self.reading_minutes = rendered.reading_minutes
+        self.content_hash = digest
+        self.render_version = content_pipeline.RENDERER_VERSION
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if 'content' not in self.get_deferred_fields() and (update_fields is None or 'content' in update_fields):
+            if self.render_content() and update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *self.RENDERED_FIELDS}
+        if self.slot is None:
+            # Slots are handed out by a per-course counter and never reused,
+            # so bits left behind by deleted lessons cannot be inherited
+            with transaction.atomic():
+                Course.objects.filter(pk=self.course_id).update(next_lesson_slot=F('next_lesson_slot') + 1)
+                self.slot = Course.objects.values_list('next_lesson_slot', flat=True).get(pk=self.course_id) - 1
+                super().save(*args, **kwargs)
+            return
+        super().save(*args, **kwargs)
+
+
+def reading_speed() -> int:
+    """Words per minute assumed by the reading time of lessons."""
+    return getattr(settings, 'LESSON_READING_WORDS_PER_MINUTE', 180)
+
+
+class ProgressQuerySet(models.QuerySet):
+    """QuerySet helpers for loading progress records in bulk."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._attach_lesson_slots = False
+        self._lesson_slots_attached = False
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._attach_lesson_slots = self._attach_lesson_slots
+        return clone
+
+    def _fetch_all(self):
+        super()._fetch_all()
+        # Like prefetch_related, but loads plain (id, slot) tuples
+        if self._attach_lesson_slots and not self._lesson_slots_attached:
+            attach_lesson_slots(self._result_cache)
+            self._lesson_slots_attached = True
+
+    def with_counts(self):
+        """
+        Annotate each record with its completed and total lesson counts so
+        that ``progress_percentage`` does not issue two queries per row.
+        """
+        completed = (
+            Progress.completed_lessons.through.objects
+            .filter(progress_id=OuterRef('pk'))
+            .values('progress_id')
+            .annotate(total=Count('*'))
+            .values('total')
+        )
+        lessons = (
+            Lesson.objects
+            .filter(course_id=OuterRef('course_id'))
+            .order_by()
+            .values('course_id')
+            .annotate(total=Count('*'))
+            .values('total')
+        )
+        return self.annotate(
+            completed_count=Coalesce(Subquery(completed), 0),
+            lesson_count=Coalesce(Subquery(lessons), 0),
+        )
+
+    def with_completion(self):
+        """
+        Preload everything ``progress_percentage`` and
+        ``completed_lesson_ids`` need for the configured storage.
+        """
+        if uses_completion_bitmap():
+            clone = self._chain()
+            clone._attach_lesson_slots = True
+            return clone
+        return self.with_counts().prefetch_related(
+            Prefetch('completed_lessons', queryset=Lesson.objects.only('id'))
+        )
+
+
+def attach_lesson_slots(records) -> None:
+    """
+    Load the (id, slot) pairs of the lessons of every course referenced
+    by ``records`` in one query and cache them on the course objects.
+    """
+    courses = {}
+    for record in records:
+        if isinstance(record, Progress):
+            courses.setdefault(record.course_id, []).append(record.course)
+    if not courses:
+        return
+    slots = {course_id: [] for course_id in courses}
+    rows = Lesson.objects.filter(course_id__in=list(courses)).values_list('course_id', 'id', 'slot')
+    for course_id, lesson_id, slot in rows:
+        slots[course_id].append((lesson_id, slot))
+    for course_id, course_objects in courses.items():
+        for course in course_objects:
+            course._lesson_slots = slots[course_id]
+
+
+def uses_completion_bitmap() -> bool:
+    """Whether completion reads use ``Progress.completed_bitmap``."""
+    return getattr(settings, 'PROGRESS_COMPLETION_STORAGE', 'm2m') == 'bitmap'
+
 
 class Progress(models.Model):
     """
@@ -75,6 +226,8 @@ class Progress(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='progress')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='progress_records')
     completed_lessons = models.ManyToManyField(Lesson, blank=True, related_name='completed_by')
+    # Compact copy of completed_lessons indexed by Lesson.slot, see courses.bitset
+    completed_bitmap = models.BinaryField(default=b'', blank=True)
     updated_at = models.DateTimeField(auto_now=True)
     daily_goal_minutes = models.PositiveIntegerField(default=10)
     daily_minutes_today = models.PositiveIntegerField(default=0)
@@ -82,20 +235,111 @@ class Progress(models.Model):
     last_progress_date = models.DateField(null=True, blank=True)
     last_goal_met_date = models.DateField(null=True, blank=True)
 
+    objects = ProgressQuerySet.as_manager()
+
     class Meta:
         unique_together = ('user', 'course')
 
     def __str__(self) -> str:
         return f"{self.user.username} - {self.course.title}"
 
+    def mark_completed(self, *lessons: Lesson) -> None:
+        """Record ``lessons`` as completed. The bitmap is persisted on save."""
+        self.completed_lessons.add(*lessons)
+        for lesson in lessons:
+            self.completed_bitmap = bitset.set_bit(self.completed_bitmap, lesson.slot)
+
+    def mark_uncompleted(self, *lessons: Lesson) -> None:
+        """Record ``lessons`` as not completed. The bitmap is persisted on save."""
+        self.completed_lessons.remove(*lessons)
+        for lesson in lessons:
+            self.completed_bitmap = bitset.clear_bit(self.completed_bitmap, lesson.slot)
+
+    def has_completed(self, lesson: Lesson) -> bool:
+        if uses_completion_bitmap():
+            return bitset.test_bit(self.completed_bitmap, lesson.slot)
+        return self.completed_lessons.filter(id=lesson.id).exists()
+
+    def rebuild_bitmap(self) -> None:
+        """Recompute the bitmap from the ``completed_lessons`` relation."""
+        self.completed_bitmap = bitset.from_int(
+            bitset.mask_for_slots(self.completed_lessons.values_list('slot', flat=True))
+        )
+
+    def _lesson_slots(self):
+        """(id, slot) pairs of the course's lessons, cached on the course."""
+        course = self.course
+        slots = getattr(course, '_lesson_slots', None)
+        if slots is None:
+            slots = course._lesson_slots = list(course.lessons.values_list('id', 'slot'))
+        return slots
+
+    def completed_lesson_ids(self) -> list:
+        if uses_completion_bitmap():
+            bitmap = self.completed_bitmap
+            return [lesson_id for lesson_id, slot in self._lesson_slots() if bitset.test_bit(bitmap, slot)]
+        return [lesson.pk for lesson in self.completed_lessons.all()]
+
     def progress_percentage(self) -> float:
-        total = self.course.total_lessons()
+        if uses_completion_bitmap():
+            slots = self._lesson_slots()
+            if not slots:
+                return 0.0
+            mask = getattr(self.course, '_lesson_mask', None)
+            if mask is None:
+                mask = self.course._lesson_mask = bitset.mask_for_slots(slot for _, slot in slots)
+            return (bitset.popcount(self.completed_bitmap, mask) / len(slots)) * 100
+        # Prefer counts annotated by ``ProgressQuerySet.with_counts``
+        total = getattr(self, 'lesson_count', None)
+        if total is None:
+            total = self.course.total_lessons()
         if total == 0:
             return 0.0
-        completed = self.completed_lessons.count()
+        completed = getattr(self, 'completed_count', None)
+        if completed is None:
+            completed = self.completed_lessons.count()
         return (completed / total) * 100
 
 
+class CourseAssignment(models.Model):
+    """
+    A course assigned by staff to a department or to a list of users, see
+    ``courses.assignments``. Every assignee gets an ``Enrollment`` and a
+    ``Progress`` record.
+    """
+
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='assignments')
+    # Empty when the course was assigned to listed users
+    department = models.CharField(max_length=255, blank=True)
+    due_date = models.DateField(null=True, blank=True)
+    assigned_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    assignee_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.course.title} -> {self.department or f'{self.assignee_count} user(s)'}"
+
+
+class Enrollment(models.Model):
+    """A user's enrolment in a course by assignment, with the date it is due."""
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
+    # The latest assignment that covered the user
+    assignment = models.ForeignKey(
+        CourseAssignment, on_delete=models.SET_NULL, null=True, blank=True, related_name='enrollments'
+    )
+    due_date = models.DateField(null=True, blank=True)
+    assigned_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'course')
+
+    def __str__(self) -> str:
+        return f"{self.user.username} - {self.course.title}"
+
+
 class CourseReview(models.Model):
     """
     Represents a user's review and rating of a course. Each user can leave
@@ -116,6 +360,57 @@ class CourseReview(models.Model):
         return f"Review by {self.user.username} for {self.course.title}"
 
 
+class CourseStats(models.Model):
+    """
+    Materialized per-course counters.
+
+    The review, progress and quiz write paths keep these numbers current
+    with incremental updates (see ``courses.stats``), so reads never
+    aggregate the underlying tables. ``manage.py rebuild_course_stats``
+    recomputes them from scratch.
+    """
+
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    enrolled_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    quiz_attempt_count = models.PositiveIntegerField(default=0)
+    quiz_score_sum = models.PositiveIntegerField(default=0)
+    quiz_max_score_sum = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'course stats'
+
+    def __str__(self) -> str:
+        return f"Stats for {self.course.title}"
+
+    def average_rating(self):
+        if not self.review_count:
+            return None
+        return round(self.rating_sum / self.review_count, 2)
+
+    def rating_histogram(self) -> dict:
+        return {str(rating): getattr(self, f'rating_{rating}_count') for rating in range(1, 6)}
+
+    def completion_rate(self) -> float:
+        if not self.enrolled_count:
+            return 0.0
+        return (self.completed_count / self.enrolled_count) * 100
+
+    def average_quiz_score(self):
+        """Average quiz score as a percentage of the questions answered."""
+        if not self.quiz_max_score_sum:
+            return None
+        return round((self.quiz_score_sum / self.quiz_max_score_sum) * 100, 2)
+
+
 # ---------- Integration tasks and activity logging ----------
 
 class IntegrationTask(models.Model):
@@ -162,15 +457,182 @@ class ActivityLog(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activities')
     action = models.CharField(max_length=255)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [models.Index(fields=['user', '-timestamp'], name='activitylog_user_recent_idx')]
 
     def __str__(self) -> str:
         return f"{self.timestamp}: {self.user.username} - {self.action}"
 
 
+def current_unix_time() -> int:
+    return int(time.time())
+
+
+class LearningEvent(models.Model):
+    """
+    Append-only record of a learning action.
+
+    Rows are only ever inserted. The catalog references are not enforced
+    as database constraints, so the history survives content deletion.
+    ``occurred_at`` is a Unix timestamp so that analytics can load events
+    straight into integer arrays.
+    """
+
+    LESSON_COMPLETED = 1
+    LESSON_UNCOMPLETED = 2
+    QUIZ_SUBMITTED = 3
+    TASK_COMPLETED = 4
+    TASK_UNCOMPLETED = 5
+    KIND_CHOICES = [
+        (LESSON_COMPLETED, 'Lesson completed'),
+        (LESSON_UNCOMPLETED, 'Lesson uncompleted'),
+        (QUIZ_SUBMITTED, 'Quiz submitted'),
+        (TASK_COMPLETED, 'Task completed'),
+        (TASK_UNCOMPLETED, 'Task uncompleted'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='learning_events')
+    kind = models.PositiveSmallIntegerField(choices=KIND_CHOICES)
+    course = models.ForeignKey(
+        Course, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    lesson = models.ForeignKey(
+        Lesson, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    task = models.ForeignKey(
+        'IntegrationTask', on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+'
+    )
+    value = models.IntegerField(null=True, blank=True)
+    occurred_at = models.BigIntegerField(default=current_unix_time)
+
+    def __str__(self) -> str:
+        return f"{self.user_id} - {self.get_kind_display()} @ {self.occurred_at}"
+
+
+class LessonTimeDaily(models.Model):
+    """
+    Seconds a user spent on a lesson on one local day, summed from the
+    heartbeats of open lessons by ``courses.watch_time``.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lesson_time')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='time_spent')
+    day = models.DateField()
+    seconds = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'lesson', 'day')
+        indexes = [models.Index(fields=['user', 'day'], name='lessontime_user_day_idx')]
+        verbose_name_plural = 'lesson time daily'
+
+    def __str__(self) -> str:
+        return f"{self.user_id} - lesson {self.lesson_id} on {self.day}: {self.seconds}s"
+
+
+class UserDailyActivity(models.Model):
+    """
+    What a user did on one local day across all courses, kept by
+    ``courses.daily_activity``. ``minutes`` are the daily goal minutes
+    credited that day.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_activity')
+    day = models.DateField()
+    minutes = models.PositiveIntegerField(default=0)
+    lessons_completed = models.PositiveIntegerField(default=0)
+    quizzes_submitted = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Its index also serves the range scans of the heatmap
+        unique_together = ('user', 'day')
+        verbose_name_plural = 'user daily activity'
+
+    def __str__(self) -> str:
+        return f"{self.user_id} on {self.day}: {self.minutes} min, {self.lessons_completed} lesson(s)"
+
+
+class UserStreak(models.Model):
+    """
+    Consecutive active days of a user across all courses, advanced from
+    ``UserDailyActivity`` by ``courses.daily_activity``.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='streak')
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_active_day = models.DateField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: {self.current_streak} day(s)"
+
+    def streak_on(self, day) -> int:
+        """The current streak as of ``day``: zero once a whole day was missed."""
+        if self.last_active_day is None or (day - self.last_active_day).days > 1:
+            return 0
+        return self.current_streak
+
+
+class CourseAnalytics(models.Model):
+    """Per-course summary computed by ``manage.py analyze_learning_events``."""
+
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='analytics')
+    learners = models.PositiveIntegerField(default=0)
+    completers = models.PositiveIntegerField(default=0)
+    median_completion_seconds = models.PositiveIntegerField(null=True, blank=True)
+    p90_completion_seconds = models.PositiveIntegerField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = 'course analytics'
+
+    def __str__(self) -> str:
+        return f"Analytics for {self.course.title}"
+
+
+class LessonFunnel(models.Model):
+    """How many learners reached each lesson and how many stopped there."""
+
+    lesson = models.OneToOneField(Lesson, on_delete=models.CASCADE, primary_key=True, related_name='funnel')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='lesson_funnel')
+    position = models.PositiveIntegerField()
+    reached = models.PositiveIntegerField(default=0)
+    dropoff_rate = models.FloatField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['course', 'position']
+
+    def __str__(self) -> str:
+        return f"{self.lesson} ({self.reached})"
+
+
+class CohortRetention(models.Model):
+    """Share of a weekly cohort of learners that was active N weeks later."""
+
+    cohort_week = models.DateField()
+    week_offset = models.PositiveIntegerField()
+    cohort_size = models.PositiveIntegerField()
+    active_users = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['cohort_week', 'week_offset']
+        unique_together = ('cohort_week', 'week_offset')
+
+    def __str__(self) -> str:
+        return f"Cohort {self.cohort_week} +{self.week_offset}w"
+
+    def retention(self) -> float:
+        return (self.active_users / self.cohort_size) * 100 if self.cohort_size else 0.0
+
+
 # ---------- Quiz models ----------
 
 class Quiz(models.Model):
@@ -182,9 +644,30 @@ class Quiz(models.Model):
         return f"Quiz for {self.course.title}"
 
 
+class QuestionPool(models.Model):
+    """
+    A topic of a quiz's question bank. Each attempt of a quiz with pools
+    is served ``draw_count`` questions picked at random from every pool,
+    see ``courses.question_pools``.
+    """
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='pools')
+    title = models.CharField(max_length=255)
+    draw_count = models.PositiveSmallIntegerField(default=1)
+    order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['order', 'id']
+
+    def __str__(self) -> str:
+        return f"{self.quiz}: {self.title}"
+
+
 class Question(models.Model):
-    """A question in a quiz."""
+    """A question in a quiz, served on every attempt unless it belongs to a pool."""
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='questions')
+    pool = models.ForeignKey(
+        QuestionPool, on_delete=models.SET_NULL, null=True, blank=True, related_name='questions'
+    )
     text = models.CharField(max_length=1024)
 
     def __str__(self) -> str:
@@ -215,13 +698,289 @@ class QuizResult(models.Model):
         return f"{self.user.username} - {self.quiz.course.title} ({self.score})"
 
 
+class QuizAttempt(models.Model):
+    """
+    One submission of a quiz. Unlike ``QuizResult``, which keeps only the
+    latest score per user, every attempt is kept together with its answers.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_attempts')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='attempts')
+    score = models.PositiveIntegerField()
+    total = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['quiz', '-created_at'], name='quizattempt_quiz_recent_idx')]
+
+    def __str__(self) -> str:
+        return f"{self.user.username} - {self.quiz} ({self.score}/{self.total})"
+
+
+class QuizDraw(models.Model):
+    """
+    The questions served to a user for one attempt of a quiz with pools.
+    A draw is open until it is submitted; the submission is graded on its
+    questions only.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='quiz_draws')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='draws')
+    # Ids of the questions served, ascending
+    question_ids = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    attempt = models.OneToOneField(
+        QuizAttempt, on_delete=models.SET_NULL, null=True, blank=True, related_name='draw'
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'quiz', '-created_at'], name='quizdraw_user_quiz_idx')]
+
+    def __str__(self) -> str:
+        return f"{self.user.username} - {self.quiz} ({len(self.question_ids)} questions)"
+
+
+class QuizAttemptAnswer(models.Model):
+    """The answer picked for one question of an attempt (none if skipped)."""
+    attempt = models.ForeignKey(QuizAttempt, on_delete=models.CASCADE, related_name='answers')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='attempt_answers')
+    answer = models.ForeignKey(Answer, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    is_correct = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ('attempt', 'question')
+
+    def __str__(self) -> str:
+        return f"{self.attempt_id}: {self.question_id} -> {self.answer_id}"
+
+
+class QuestionStats(models.Model):
+    """
+    Running sums over the attempts that were served a question, kept
+    current at submit time by ``courses.quiz_stats``. They are enough to
+    compute the difficulty and the discrimination of the question
+    without reading the attempts.
+    """
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    served_count = models.PositiveIntegerField(default=0)
+    answered_count = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+    # Sums of the attempt scores: all attempts, squared, and attempts answering correctly
+    score_sum = models.PositiveBigIntegerField(default=0)
+    score_sq_sum = models.PositiveBigIntegerField(default=0)
+    correct_score_sum = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'question stats'
+
+    def __str__(self) -> str:
+        return f"Stats for {self.question}"
+
+    def difficulty(self):
+        """Share of attempts answering correctly (the classical p-value)."""
+        if not self.served_count:
+            return None
+        return round(self.correct_count / self.served_count, 4)
+
+    def discrimination(self):
+        """
+        Corrected point-biserial correlation between answering this
+        question correctly and the score on the other questions, in
+        [-1, 1]. None when it is undefined.
+        """
+        n, correct = self.served_count, self.correct_count
+        if not correct or correct == n:
+            return None
+        # Rest score = attempt score minus this question's 0/1 score
+        rest_sum = self.score_sum - correct
+        rest_sq_sum = self.score_sq_sum - 2 * self.correct_score_sum + correct
+        variance = rest_sq_sum / n - (rest_sum / n) ** 2
+        if variance <= 0:
+            return None
+        mean_correct = (self.correct_score_sum - correct) / correct
+        mean_incorrect = (self.score_sum - self.correct_score_sum) / (n - correct)
+        p = correct / n
+        return round((mean_correct - mean_incorrect) / variance ** 0.5 * (p * (1 - p)) ** 0.5, 4)
+
+
+class AnswerStats(models.Model):
+    """How often an answer option was picked."""
+    answer = models.OneToOneField(Answer, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    pick_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'answer stats'
+
+    def __str__(self) -> str:
+        return f"Stats for {self.answer}"
+
+
+# ---------- Offline journal ----------
+
+class JournalEntry(models.Model):
+    """
+    Outcome of one event of an offline journal, see ``courses.journal``.
+    The idempotency ``key`` is chosen by the client; a replayed event is
+    answered from this row instead of being applied again.
+    """
+
+    LESSON_COMPLETE = 'lesson_complete'
+    LESSON_UNCOMPLETE = 'lesson_uncomplete'
+    TASK_COMPLETE = 'task_complete'
+    TASK_UNCOMPLETE = 'task_uncomplete'
+    QUIZ_SUBMIT = 'quiz_submit'
+    KIND_CHOICES = [
+        (LESSON_COMPLETE, 'Lesson complete'),
+        (LESSON_UNCOMPLETE, 'Lesson uncomplete'),
+        (TASK_COMPLETE, 'Task complete'),
+        (TASK_UNCOMPLETE, 'Task uncomplete'),
+        (QUIZ_SUBMIT, 'Quiz submit'),
+    ]
+
+    APPLIED = 'applied'
+    UNCHANGED = 'unchanged'
+    SUPERSEDED = 'superseded'
+    REJECTED = 'rejected'
+    STATUS_CHOICES = [
+        (APPLIED, 'Applied'),
+        (UNCHANGED, 'Unchanged'),
+        (SUPERSEDED, 'Superseded'),
+        (REJECTED, 'Rejected'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='journal_entries')
+    key = models.CharField(max_length=64)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES)
+    detail = models.CharField(max_length=255, blank=True)
+    # When the event happened on the client
+    occurred_at = models.DateTimeField()
+    attempt = models.ForeignKey(QuizAttempt, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+        verbose_name_plural = 'journal entries'
+
+    def __str__(self) -> str:
+        return f"{self.user_id} - {self.key}: {self.kind} {self.status}"
+
+
+# ---------- Catalog sync ----------
+
+class CatalogChange(models.Model):
+    """
+    Append-only log of saved and deleted catalog objects, recorded by the
+    signal handlers in ``courses.catalog_sync``. The id is the cursor of
+    the delta sync endpoint. ``object_id`` is not a foreign key, so
+    entries of deleted objects remain as tombstones.
+    """
+
+    COURSE = 'course'
+    MODULE = 'module'
+    LESSON = 'lesson'
+    QUIZ = 'quiz'
+    QUESTION = 'question'
+    ANSWER = 'answer'
+    MODEL_CHOICES = [
+        (COURSE, 'Course'),
+        (MODULE, 'Module'),
+        (LESSON, 'Lesson'),
+        (QUIZ, 'Quiz'),
+        (QUESTION, 'Question'),
+        (ANSWER, 'Answer'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=16, choices=MODEL_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['model', 'object_id'], name='catalogchange_object_idx')]
+
+    def __str__(self) -> str:
+        action = 'deleted' if self.deleted else 'saved'
+        return f"#{self.id}: {self.model} {self.object_id} {action}"
+
+
+# ---------- Background jobs ----------
+
+class Job(models.Model):
+    """
+    A unit of background work, see ``courses.jobs``. ``name`` is a task
+    registered with ``jobs.task`` and ``payload`` its keyword arguments.
+    A queued job with a ``key`` is not queued again until it runs.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    key = models.CharField(max_length=100, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    # Not before; pushed back after a failed attempt
+    run_at = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx')]
+        constraints = [
+            models.UniqueConstraint(fields=['key'], condition=models.Q(status='queued'), name='job_queued_key_unique'),
+        ]
+
+    def __str__(self) -> str:
+        return f"#{self.id}: {self.name} {self.status}"
+
+
 # ---------- Achievement models ----------
 
 class Achievement(models.Model):
-    """Represents a badge or achievement that a user can earn."""
+    """
+    Represents a badge or achievement that a user can earn. An
+    achievement with a ``metric`` is a rule: it is awarded to every user
+    whose metric reaches ``threshold``, see ``courses.achievements``.
+    Achievements without one are only awarded by staff.
+    """
+
+    COURSES_COMPLETED = 'courses_completed'
+    LESSONS_COMPLETED = 'lessons_completed'
+    QUIZZES_SUBMITTED = 'quizzes_submitted'
+    QUIZ_SCORE = 'quiz_score'
+    LONGEST_STREAK = 'longest_streak'
+    TASKS_COMPLETED = 'tasks_completed'
+    METRIC_CHOICES = [
+        (COURSES_COMPLETED, 'Courses completed'),
+        (LESSONS_COMPLETED, 'Lessons completed'),
+        (QUIZZES_SUBMITTED, 'Quizzes submitted'),
+        (QUIZ_SCORE, 'Best quiz score, percent'),
+        (LONGEST_STREAK, 'Longest streak, days'),
+        (TASKS_COMPLETED, 'Integration tasks completed'),
+    ]
+
     code = models.CharField(max_length=50, unique=True)
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES, blank=True)
+    threshold = models.PositiveIntegerField(default=1)
 
     def __str__(self) -> str:
         return self.name
@@ -0,0 +1,137 @@
+"""
+Randomized quizzes drawn from question pools.
+
+A quiz whose questions are grouped into ``QuestionPool`` topics serves
+each attempt ``draw_count`` questions picked at random from every pool,
+together with its questions outside any pool, in id order like any
+quiz. Quizzes without pools serve all their questions, as before.
+
+Picking never sorts the bank with ``ORDER BY RANDOM()``. The question
+ids of every pool are kept in the cache and sampled in memory, so a
+draw costs the same few queries whether a pool holds ten questions or
+ten thousand. Saving or deleting a question drops the cached ids of its
+pool. Ids that are stale anyway, for example after a bulk import or a
+question moving to another pool, are noticed when the drawn questions
+are checked, and the pools are read again.
+
+The drawn ids are stored in a ``QuizDraw``. ``QuizView`` serves the
+open draw of a user until it is submitted, so reloading the quiz does
+not reroll it, and ``QuizSubmitView`` grades only the questions served.
+"""
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import Question, QuestionPool, Quiz, QuizDraw
+
+_random = random.SystemRandom()
+
+
+def _cache_key(pool_id: int) -> str:
+    return f'question-pool-ids:{pool_id}'
+
+
+def pool_question_ids(pool_ids, refresh: bool = False) -> dict:
+    """Map each of ``pool_ids`` to the ids of its questions, from the cache when possible."""
+    keys = {pool_id: _cache_key(pool_id) for pool_id in pool_ids}
+    cached = {} if refresh else cache.get_many(keys.values())
+    ids = {pool_id: cached[key] for pool_id, key in keys.items() if key in cached}
+    missing = [pool_id for pool_id in keys if pool_id not in ids]
+    if missing:
+        loaded = {pool_id: [] for pool_id in missing}
+        rows = Question.objects.filter(pool_id__in=missing).order_by('id').values_list('pool_id', 'id')
+        for pool_id, question_id in rows:
+            loaded[pool_id].append(question_id)
+        cache.set_many(
+            {keys[pool_id]: question_ids for pool_id, question_ids in loaded.items()},
+            getattr(settings, 'QUESTION_POOL_CACHE_SECONDS', 300),
+        )
+        ids.update(loaded)
+    return ids
+
+
+def is_pooled(quiz: Quiz) -> bool:
+    return quiz.pools.exists()
+
+
+def draw_questions(quiz: Quiz):
+    """
+    Pick the questions of one attempt of ``quiz`` and return their ids
+    in ascending order, or ``None`` if the quiz has no pools.
+    """
+    pools = list(quiz.pools.values_list('id', 'draw_count'))
+    if not pools:
+        return None
+    refresh = False
+    while True:
+        bank = pool_question_ids([pool_id for pool_id, _ in pools], refresh)
+        drawn = {}
+        for pool_id, draw_count in pools:
+            ids = bank[pool_id]
+            for question_id in _random.sample(ids, min(draw_count, len(ids))):
+                drawn[question_id] = pool_id
+        # Checks the drawn ids and finds the questions every attempt is served
+        rows = Question.objects.filter(quiz=quiz).filter(Q(id__in=list(drawn)) | Q(pool__isnull=True))
+        current = dict(rows.values_list('id', 'pool_id'))
+        stale = any(current.get(question_id) != pool_id for question_id, pool_id in drawn.items())
+        if not stale or refresh:
+            break
+        refresh = True
+    return sorted(
+        question_id for question_id, pool_id in current.items() if pool_id is None or drawn.get(question_id) == pool_id
+    )
+
+
+def _draws():
+    # Draws are read back right after they are written, so never from a replica
+    return QuizDraw.objects.db_manager(router.db_for_write(QuizDraw))
+
+
+def open_draw(user, quiz: Quiz):
+    """
+    Return the open draw of ``user`` for ``quiz``, drawing one if there
+    is none, or ``None`` if the quiz has no pools.
+    """
+    draw = _draws().filter(user=user, quiz=quiz, submitted_at__isnull=True).order_by('-created_at', '-id').first()
+    if draw is not None:
+        return draw
+    question_ids = draw_questions(quiz)
+    if question_ids is None:
+        return None
+    return _draws().create(user=user, quiz=quiz, question_ids=question_ids)
+
+
+def take_draw(user, quiz: Quiz):
+    """
+    Claim the open draw of ``user`` for ``quiz`` for a submission, so
+    that it is graded once. Returns ``None`` if there is no open draw.
+    """
+    draw = _draws().filter(user=user, quiz=quiz, submitted_at__isnull=True).order_by('-created_at', '-id').first()
+    if draw is None:
+        return None
+    now = timezone.now()
+    if not _draws().filter(pk=draw.pk, submitted_at__isnull=True).update(submitted_at=now):
+        # A concurrent submission claimed it first
+        return None
+    draw.submitted_at = now
+    return draw
+
+
+def forget_pool(sender, instance, **kwargs) -> None:
+    if instance.pool_id is not None:
+        cache.delete(_cache_key(instance.pool_id))
+
+
+def forget_deleted_pool(sender, instance, **kwargs) -> None:
+    cache.delete(_cache_key(instance.pk))
+
+
+def connect_signals() -> None:
+    post_save.connect(forget_pool, sender=Question, dispatch_uid='question_pool_saved')
+    post_delete.connect(forget_pool, sender=Question, dispatch_uid='question_pool_deleted')
+    post_delete.connect(forget_deleted_pool, sender=QuestionPool, dispatch_uid='question_pool_removed')
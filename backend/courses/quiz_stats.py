@@ -0,0 +1,210 @@
+"""
+Per-question quiz statistics.
+
+``record_attempt`` grades a submission, stores it as a ``QuizAttempt``
+with one ``QuizAttemptAnswer`` per question, and folds it into the
+``QuestionStats`` and ``AnswerStats`` counters with a single ``F()``
+update per table. As in ``courses.stats``, questions without counter rows
+yet are rebuilt from the stored attempts instead.
+
+``quiz_report`` derives difficulty and discrimination from the counters
+alone, so its cost grows with the number of questions, not of attempts.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Prefetch, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import Answer, AnswerStats, Question, QuestionStats, Quiz, QuizAttempt, QuizAttemptAnswer
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def grade(quiz: Quiz, answers: dict, question_ids=None):
+    """
+    Return ``(score, total, rows)`` for a ``{question_id: answer_id}``
+    mapping, where ``rows`` holds ``(question_id, answer_id, is_correct)``
+    for every question of the quiz, or only for those of ``question_ids``
+    when the attempt was served a draw. Answers belonging to another
+    question count as unanswered.
+    """
+    questions = quiz.questions.order_by('id')
+    if question_ids is not None:
+        # Questions deleted since they were served no longer count
+        questions = questions.filter(id__in=question_ids)
+    question_ids = list(questions.values_list('id', flat=True))
+    picked = {}
+    for question_id in question_ids:
+        answer_id = _to_int(answers.get(str(question_id)))
+        if answer_id:
+            picked[question_id] = answer_id
+    options = {
+        answer_id: (question_id, is_correct)
+        for answer_id, question_id, is_correct in Answer.objects.filter(
+            question_id__in=question_ids, id__in=picked.values()
+        ).values_list('id', 'question_id', 'is_correct')
+    } if picked else {}
+    rows = []
+    for question_id in question_ids:
+        answer_id = picked.get(question_id)
+        option = options.get(answer_id)
+        if option is None or option[0] != question_id:
+            rows.append((question_id, None, False))
+        else:
+            rows.append((question_id, answer_id, option[1]))
+    score = sum(1 for _, _, is_correct in rows if is_correct)
+    return score, len(question_ids), rows
+
+
+def _flag(question_ids, value):
+    if not question_ids:
+        return Value(0)
+    return Case(When(question_id__in=question_ids, then=Value(value)), default=Value(0), output_field=IntegerField())
+
+
+def record_attempt(user, quiz: Quiz, answers: dict, question_ids=None) -> QuizAttempt:
+    """
+    Grade and store a submission and update the counters of the
+    questions it was served, all of the quiz's unless ``question_ids``.
+    """
+    score, total, rows = grade(quiz, answers, question_ids)
+    with transaction.atomic():
+        attempt = QuizAttempt.objects.create(user=user, quiz=quiz, score=score, total=total)
+        QuizAttemptAnswer.objects.bulk_create([
+            QuizAttemptAnswer(attempt=attempt, question_id=question_id, answer_id=answer_id, is_correct=is_correct)
+            for question_id, answer_id, is_correct in rows
+        ])
+        if rows:
+            _count_attempt(quiz.id, score, rows)
+    return attempt
+
+
+def _count_attempt(quiz_id: int, score: int, rows) -> None:
+    question_ids = [question_id for question_id, _, _ in rows]
+    answered = [question_id for question_id, answer_id, _ in rows if answer_id]
+    correct = [question_id for question_id, _, is_correct in rows if is_correct]
+    picked = [answer_id for _, answer_id, _ in rows if answer_id]
+    updated = QuestionStats.objects.filter(question_id__in=question_ids).update(
+        served_count=F('served_count') + 1,
+        answered_count=F('answered_count') + _flag(answered, 1),
+        correct_count=F('correct_count') + _flag(correct, 1),
+        score_sum=F('score_sum') + score,
+        score_sq_sum=F('score_sq_sum') + score * score,
+        correct_score_sum=F('correct_score_sum') + _flag(correct, score),
+        updated_at=timezone.now(),
+    )
+    if picked:
+        updated_answers = AnswerStats.objects.filter(answer_id__in=picked).update(pick_count=F('pick_count') + 1)
+    else:
+        updated_answers = 0
+    if updated < len(question_ids) or updated_answers < len(picked):
+        # The rebuild already counts the attempt being recorded
+        rebuild_question_stats([quiz_id])
+
+
+def rebuild_question_stats(quiz_ids=None) -> int:
+    """
+    Recompute the counters of the given quizzes (all by default) from
+    the stored attempt answers with one grouped query per table. Returns
+    the number of question rows written.
+    """
+    questions = Question.objects.all()
+    answers = QuizAttemptAnswer.objects.all()
+    options = Answer.objects.all()
+    if quiz_ids is not None:
+        questions = questions.filter(quiz_id__in=quiz_ids)
+        answers = answers.filter(question__quiz_id__in=quiz_ids)
+        options = options.filter(question__quiz_id__in=quiz_ids)
+    question_rows = {
+        question_id: QuestionStats(question_id=question_id)
+        for question_id in questions.values_list('id', flat=True)
+    }
+    if not question_rows:
+        return 0
+    totals = answers.values('question_id').annotate(
+        served=Count('id'),
+        answered=Count('id', filter=Q(answer__isnull=False)),
+        correct=Count('id', filter=Q(is_correct=True)),
+        scores=Sum('attempt__score'),
+        squares=Sum(F('attempt__score') * F('attempt__score')),
+        correct_scores=Sum('attempt__score', filter=Q(is_correct=True)),
+    )
+    for values in totals:
+        row = question_rows[values['question_id']]
+        row.served_count = values['served']
+        row.answered_count = values['answered']
+        row.correct_count = values['correct']
+        row.score_sum = values['scores'] or 0
+        row.score_sq_sum = values['squares'] or 0
+        row.correct_score_sum = values['correct_scores'] or 0
+    picks = dict(
+        answers.filter(answer__isnull=False).values('answer_id').annotate(picks=Count('id')).values_list('answer_id', 'picks')
+    )
+    answer_rows = [
+        AnswerStats(answer_id=answer_id, pick_count=picks.get(answer_id, 0))
+        for answer_id in options.values_list('id', flat=True)
+    ]
+    now = timezone.now()
+    for row in question_rows.values():
+        row.updated_at = now
+    QuestionStats.objects.bulk_create(
+        question_rows.values(),
+        update_conflicts=True,
+        unique_fields=['question'],
+        update_fields=[
+            'served_count',
+            'answered_count',
+            'correct_count',
+            'score_sum',
+            'score_sq_sum',
+            'correct_score_sum',
+            'updated_at',
+        ],
+        batch_size=1000,
+    )
+    AnswerStats.objects.bulk_create(
+        answer_rows,
+        update_conflicts=True,
+        unique_fields=['answer'],
+        update_fields=['pick_count'],
+        batch_size=1000,
+    )
+    return len(question_rows)
+
+
+def quiz_report(quiz: Quiz) -> dict:
+    """Difficulty, discrimination and answer pick rates of every question."""
+    questions = quiz.questions.order_by('id').select_related('stats').prefetch_related(
+        Prefetch('answers', queryset=Answer.objects.select_related('stats').order_by('id'))
+    )
+    report = []
+    for question in questions:
+        question_stats = getattr(question, 'stats', None) or QuestionStats(question=question)
+        served = question_stats.served_count
+        report.append({
+            'id': question.id,
+            'text': question.text,
+            'served': served,
+            'answered': question_stats.answered_count,
+            'correct': question_stats.correct_count,
+            'difficulty': question_stats.difficulty(),
+            'discrimination': question_stats.discrimination(),
+            'answers': [_answer_report(answer, served) for answer in question.answers.all()],
+        })
+    return {'quiz': quiz.id, 'title': quiz.title, 'questions': report}
+
+
+def _answer_report(answer: Answer, served: int) -> dict:
+    answer_stats = getattr(answer, 'stats', None)
+    picks = answer_stats.pick_count if answer_stats else 0
+    return {
+        'id': answer.id,
+        'text': answer.text,
+        'is_correct': answer.is_correct,
+        'picks': picks,
+        'pick_rate': round(picks / served, 4) if served else None,
+    }
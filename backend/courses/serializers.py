@@ -5,10 +5,12 @@ These serializers define how courses, lessons, and progress data are
 converted between Python objects and JSON. Nested serializers are
 used to embed lessons within a course detail response.
 """
+from django.urls import reverse
 from rest_framework import serializers
 
 from .models import (
     Course,
+    CourseStats,
     Module,
     Lesson,
     Progress,
@@ -22,6 +24,8 @@ from .models import (
 )
 from django.db.models import Avg
 
+from .fieldsets import FieldsetSerializerMixin
+
 
 class LessonSerializer(serializers.ModelSerializer):
     """Serializer for Lesson objects."""
@@ -38,6 +42,7 @@ class LessonSerializer(serializers.ModelSerializer):
             'image_url',
             'order',
             'estimated_minutes',
+            'reading_minutes',
             'module',
         ]
 
@@ -51,6 +56,31 @@ class LessonSerializer(serializers.ModelSerializer):
         }
 
 
+class LessonOutlineSerializer(LessonSerializer):
+    """
+    Lesson metadata without the content body. The body is fetched on
+    demand from ``content_url``.
+    """
+
+    content_url = serializers.SerializerMethodField()
+
+    class Meta(LessonSerializer.Meta):
+        fields = [
+            'id',
+            'title',
+            'video_url',
+            'image_url',
+            'order',
+            'estimated_minutes',
+            'reading_minutes',
+            'module',
+            'content_url',
+        ]
+
+    def get_content_url(self, obj) -> str:
+        return reverse('lesson-content', kwargs={'course_id': obj.course_id, 'lesson_id': obj.id})
+
+
 class LessonWriteSerializer(serializers.ModelSerializer):
 
     module_title = serializers.CharField(required=False, allow_blank=True)
@@ -76,12 +106,36 @@ class ModuleSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'order', 'target_minutes', 'lessons']
 
 
-class CourseDetailSerializer(serializers.ModelSerializer):
+class ModuleOutlineSerializer(ModuleSerializer):
+    lessons = LessonOutlineSerializer(many=True, read_only=True)
+
+
+class CourseStatsSerializer(serializers.ModelSerializer):
+    """Serializer for the materialized course counters."""
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+    completion_rate = serializers.FloatField(read_only=True)
+    average_quiz_score = serializers.FloatField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = CourseStats
+        fields = [
+            'review_count',
+            'rating_histogram',
+            'enrolled_count',
+            'completed_count',
+            'completion_rate',
+            'quiz_attempt_count',
+            'average_quiz_score',
+        ]
+
+
+class CourseDetailSerializer(FieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for retrieving course details with nested lessons."""
     lessons = LessonSerializer(many=True, read_only=True)
     modules = ModuleSerializer(many=True, read_only=True)
     average_rating = serializers.SerializerMethodField()
     has_quiz = serializers.SerializerMethodField()
+    stats = serializers.SerializerMethodField()
 
     class Meta:
         model = Course
@@ -95,13 +149,33 @@ class CourseDetailSerializer(serializers.ModelSerializer):
             'modules',
             'average_rating',
             'has_quiz',
+            'stats',
         ]
+        expandable = ['lessons', 'modules']
+
+    def _get_course_stats(self, obj):
+        try:
+            return obj.stats
+        except CourseStats.DoesNotExist:
+            return None
 
     def get_average_rating(self, obj) -> float:
-        # Calculate the average rating for the course. If no reviews, return None.
+        # Read the materialized stats; aggregate only for courses without them
+        course_stats = self._get_course_stats(obj)
+        if course_stats is not None:
+            return course_stats.average_rating()
+        if 'average_rating' in self.context:
+            # Computed up front by views that cannot query lazily
+            return self.context['average_rating']
         avg = obj.reviews.aggregate(avg=Avg('rating'))['avg']
         return round(avg, 2) if avg is not None else None
 
+    def get_stats(self, obj):
+        course_stats = self._get_course_stats(obj)
+        if course_stats is None:
+            return None
+        return CourseStatsSerializer(course_stats).data
+
     def get_has_quiz(self, obj) -> bool:
         """Return True if a quiz is associated with this course."""
         try:
@@ -110,6 +184,12 @@ class CourseDetailSerializer(serializers.ModelSerializer):
             return False
 
 
+class CourseOutlineSerializer(CourseDetailSerializer):
+    """Course details whose lessons carry metadata only."""
+    lessons = LessonOutlineSerializer(many=True, read_only=True)
+    modules = ModuleOutlineSerializer(many=True, read_only=True)
+
+
 class ProgressSerializer(serializers.ModelSerializer):
     """
     Serializer for Progress objects. Calculates the progress percentage and
@@ -117,7 +197,9 @@ class ProgressSerializer(serializers.ModelSerializer):
     """
     course = CourseSerializer(read_only=True)
     progress = serializers.SerializerMethodField()
-    completed_lessons = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    completed_lessons = serializers.ListField(
+        child=serializers.IntegerField(), source='completed_lesson_ids', read_only=True
+    )
     minutes_remaining = serializers.SerializerMethodField()
 
     class Meta:
@@ -265,7 +347,8 @@ class AchievementSerializer(serializers.ModelSerializer):
 
     The `awarded` field indicates whether the requesting user has already
     received this achievement. This relies on the serializer context
-    containing the request object.
+    containing either an ``awarded_ids`` set prepared by the view or the
+    request object.
     """
     awarded = serializers.SerializerMethodField()
 
@@ -274,6 +357,10 @@ class AchievementSerializer(serializers.ModelSerializer):
         fields = ['id', 'code', 'name', 'description', 'awarded']
 
     def get_awarded(self, obj) -> bool:
+        # Views listing many achievements pass the awarded ids up front
+        awarded_ids = self.context.get('awarded_ids')
+        if awarded_ids is not None:
+            return obj.id in awarded_ids
         request = self.context.get('request')
         user = getattr(request, 'user', None)
         if not user or user.is_anonymous:
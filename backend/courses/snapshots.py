@@ -0,0 +1,221 @@
+"""
+Prebuilt static snapshots of the public catalog.
+
+``publish`` renders the course list and the detail of every course
+exactly as ``CourseListView`` and ``CourseDetailView`` return them
+without query parameters, and writes them below ``CATALOG_SNAPSHOT_ROOT``
+so that a web server can serve the catalog without reaching Django::
+
+    releases/<version>/manifest.json
+    releases/<version>/courses.<hash>.json
+    releases/<version>/courses/<id>.<hash>.json
+    current -> releases/<version>
+
+Every file has a gzip-compressed ``.gz`` sibling for ``gzip_static``.
+File names carry a prefix of the SHA-256 of their content, so they can
+be cached forever; ``manifest.json`` maps the logical names
+(``courses.json``, ``courses/<id>.json``) to them and is the only file
+clients revalidate. With nginx::
+
+    location /catalog/ {
+        alias /srv/catalog/current/;
+        gzip_static on;
+    }
+
+A release is written to a temporary directory that is renamed into
+place, then published by replacing the ``current`` symlink with
+``os.replace``, which is atomic: readers see the old release or the new
+one, never a mix. Files whose content did not change are hard-linked
+from the previous release. The version derives from the content, so
+publishing an unchanged catalog changes nothing, and a few older
+releases are kept for clients still holding their manifest.
+
+When ``CATALOG_SNAPSHOT_ROOT`` is set, every transaction that changes
+catalog content queues a publish job once it commits, see
+``courses.jobs``; changes made while a publish is still queued ride
+along with it. Ratings and other counters in the course details are as
+of the last publish, so also run ``manage.py publish_catalog``
+periodically.
+"""
+import contextlib
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models.signals import post_save
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from . import jobs
+from .fast_serializers import CourseValuesSerializer
+from .fieldsets import ALL_FIELDS
+from .models import CatalogChange, Course, Lesson
+from .serializers import CourseDetailSerializer
+from .views import CourseDetailView
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+KEEP_RELEASES = 3
+# Hex digits of the content hash in file names
+HASH_LENGTH = 12
+
+
+@dataclass
+class PublishResult:
+    version: str
+    files: int = 0
+    written: int = 0
+    linked: int = 0
+    unchanged: bool = False
+
+
+def render_catalog() -> dict:
+    """Map logical file names to the JSON the API returns for them."""
+    renderer = JSONRenderer()
+    files = {'courses.json': renderer.render(CourseValuesSerializer().serialize(Course.objects.order_by('id')))}
+    lessons = Lesson.objects.select_related('module').defer(*Lesson.RENDERED_BODY_FIELDS)
+    courses = (
+        CourseDetailView.narrow_course_queryset(Course.objects.order_by('id'), ALL_FIELDS)
+        .select_related('quiz')
+        .prefetch_related(Prefetch('lessons', queryset=lessons), Prefetch('modules__lessons', queryset=lessons))
+    )
+    for course in courses:
+        files[f'courses/{course.id}.json'] = renderer.render(CourseDetailSerializer(course).data)
+    return files
+
+
+def _hashed_name(name: str, digest: str) -> str:
+    stem, extension = name.rsplit('.', 1)
+    return f'{stem}.{digest[:HASH_LENGTH]}.{extension}'
+
+
+@contextlib.contextmanager
+def _publish_lock(root: Path):
+    # Keeps a slower, older render from replacing a newer release
+    if fcntl is None:
+        yield
+        return
+    with open(root / '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def publish(root=None, keep: int = KEEP_RELEASES) -> PublishResult:
+    """Render the catalog and make it the current release below ``root``."""
+    root = Path(root or settings.CATALOG_SNAPSHOT_ROOT)
+    releases = root / 'releases'
+    releases.mkdir(parents=True, exist_ok=True)
+    with _publish_lock(root):
+        rendered = render_catalog()
+        entries = {}
+        for name, content in rendered.items():
+            digest = hashlib.sha256(content).hexdigest()
+            entries[name] = {'path': _hashed_name(name, digest), 'sha256': digest, 'size': len(content)}
+        version = hashlib.sha256(json.dumps(entries, sort_keys=True).encode()).hexdigest()[:HASH_LENGTH]
+        result = PublishResult(version=version, files=len(entries))
+        current = root / 'current'
+        target = os.path.join('releases', version)
+        if current.is_symlink() and os.readlink(current) == target and (releases / version).is_dir():
+            result.unchanged = True
+            return result
+        if not (releases / version).is_dir():
+            previous = current.resolve() if current.is_symlink() else None
+            _write_release(releases, version, rendered, entries, previous, result)
+        else:
+            # Returning to an older release; keep it out of pruning
+            os.utime(releases / version)
+        # Swap atomically: build the new link beside the old one, then rename over it
+        link = root / f'.current-{os.getpid()}'
+        if link.is_symlink():
+            link.unlink()
+        os.symlink(target, link)
+        os.replace(link, current)
+        _prune(releases, keep, version)
+    return result
+
+
+def _write_release(releases: Path, version: str, rendered: dict, entries: dict, previous, result: PublishResult) -> None:
+    staging = Path(tempfile.mkdtemp(prefix=f'.{version}-', dir=releases))
+    try:
+        for name, entry in entries.items():
+            path = staging / entry['path']
+            path.parent.mkdir(parents=True, exist_ok=True)
+            for suffix in ('', '.gz'):
+                reused = previous / f"{entry['path']}{suffix}" if previous else None
+                if reused is not None and reused.is_file():
+                    try:
+                        os.link(reused, f'{path}{suffix}')
+                        result.linked += 1
+                        continue
+                    except OSError:
+                        pass
+                content = rendered[name]
+                if suffix:
+                    content = gzip.compress(content, compresslevel=9, mtime=0)
+                Path(f'{path}{suffix}').write_bytes(content)
+                result.written += 1
+        manifest = json.dumps({
+            'version': version,
+            'generated_at': timezone.now().isoformat(),
+            'files': entries,
+        }, sort_keys=True).encode()
+        (staging / 'manifest.json').write_bytes(manifest)
+        (staging / 'manifest.json.gz').write_bytes(gzip.compress(manifest, compresslevel=9, mtime=0))
+        # mkdtemp creates the directory readable by its owner only
+        for directory in [staging, *(path for path in staging.rglob('*') if path.is_dir())]:
+            directory.chmod(0o755)
+        os.rename(staging, releases / version)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def _prune(releases: Path, keep: int, version: str) -> None:
+    # Hidden directories are releases still being written
+    others = [path for path in releases.iterdir() if path.is_dir() and not path.name.startswith('.') and path.name != version]
+    others.sort(key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in others[max(keep - 1, 0):]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+PUBLISH_TASK = 'courses.publish_catalog'
+
+
+@jobs.task(PUBLISH_TASK)
+def publish_task() -> None:
+    # A failed publish leaves the previous release current and is retried
+    publish()
+
+
+def _publish_after_commit() -> None:
+    jobs.enqueue(PUBLISH_TASK, key=PUBLISH_TASK)
+
+
+def schedule_publish(sender, **kwargs) -> None:
+    """Queue a publish once the current transaction commits, at most once per transaction."""
+    if not getattr(settings, 'CATALOG_SNAPSHOT_ROOT', None):
+        return
+    connection = transaction.get_connection()
+    if any(entry[1] is _publish_after_commit for entry in connection.run_on_commit):
+        return
+    # A failed enqueue is logged and does not fail the committed request
+    transaction.on_commit(_publish_after_commit, robust=True)
+
+
+def connect_signals() -> None:
+    # Every catalog write appends a CatalogChange, see courses.catalog_sync
+    post_save.connect(schedule_publish, sender=CatalogChange, dispatch_uid='catalog_snapshot_publish')
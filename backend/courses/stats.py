@@ -0,0 +1,124 @@
+"""
+Incremental maintenance of the materialized ``CourseStats`` table.
+
+The write paths call the ``record_*`` helpers, which apply atomic ``F()``
+increments to the course's stats row. A course without a stats row yet
+is rebuilt from the source tables instead. The rebuild already reflects
+the write that triggered it, so no increment is applied on top.
+"""
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Course, CourseReview, CourseStats, Progress, QuizAttempt
+
+COUNTER_FIELDS = [
+    'review_count',
+    'rating_sum',
+    'rating_1_count',
+    'rating_2_count',
+    'rating_3_count',
+    'rating_4_count',
+    'rating_5_count',
+    'enrolled_count',
+    'completed_count',
+    'quiz_attempt_count',
+    'quiz_score_sum',
+    'quiz_max_score_sum',
+]
+
+
+def _increment(course_id: int, **deltas) -> None:
+    updates = {name: F(name) + delta for name, delta in deltas.items() if delta}
+    if not updates:
+        return
+    updates['updated_at'] = timezone.now()
+    if not CourseStats.objects.filter(course_id=course_id).update(**updates):
+        rebuild_course_stats([course_id])
+
+
+def record_review(course_id: int, rating: int) -> None:
+    deltas = {'review_count': 1, 'rating_sum': rating}
+    if 1 <= rating <= 5:
+        deltas[f'rating_{rating}_count'] = 1
+    _increment(course_id, **deltas)
+
+
+def record_enrolment(course_id: int, count: int = 1) -> None:
+    _increment(course_id, enrolled_count=count)
+
+
+def record_completion(course_id: int, delta: int = 1) -> None:
+    """Record a learner reaching (``delta=1``) or leaving (``-1``) 100%."""
+    _increment(course_id, completed_count=delta)
+
+
+def record_quiz_attempt(course_id: int, score: int, total: int) -> None:
+    _increment(course_id, quiz_attempt_count=1, quiz_score_sum=score, quiz_max_score_sum=total)
+
+
+def rebuild_course_stats(course_ids=None) -> int:
+    """
+    Recompute the stats of the given courses (all courses by default)
+    with one grouped query per source table. Returns the number of rows
+    written.
+    """
+    courses = Course.objects.all()
+    if course_ids is not None:
+        courses = courses.filter(id__in=course_ids)
+    rows = {course_id: CourseStats(course_id=course_id) for course_id in courses.values_list('id', flat=True)}
+    if not rows:
+        return 0
+    course_filter = {'course_id__in': list(rows)}
+
+    reviews = (
+        CourseReview.objects.filter(**course_filter)
+        .values('course_id')
+        .annotate(
+            review_count=Count('id'),
+            rating_sum=Sum('rating'),
+            **{f'rating_{rating}_count': Count('id', filter=Q(rating=rating)) for rating in range(1, 6)},
+        )
+    )
+    for values in reviews:
+        _apply(rows[values.pop('course_id')], values)
+
+    enrolled = Progress.objects.filter(**course_filter).values('course_id').annotate(enrolled_count=Count('id'))
+    for values in enrolled:
+        _apply(rows[values.pop('course_id')], values)
+
+    completed = (
+        Progress.objects.filter(**course_filter)
+        .with_counts()
+        .filter(lesson_count__gt=0, completed_count__gte=F('lesson_count'))
+        .values('course_id')
+        .annotate(finished=Count('id'))
+    )
+    for values in completed:
+        rows[values['course_id']].completed_count = values['finished']
+
+    quiz_attempts = (
+        QuizAttempt.objects.filter(quiz__course_id__in=list(rows))
+        .values('quiz__course_id')
+        .annotate(attempts=Count('id'), score_sum=Sum('score'), max_score_sum=Sum('total'))
+    )
+    for values in quiz_attempts:
+        row = rows[values['quiz__course_id']]
+        row.quiz_attempt_count = values['attempts']
+        row.quiz_score_sum = values['score_sum'] or 0
+        row.quiz_max_score_sum = values['max_score_sum'] or 0
+
+    now = timezone.now()
+    for row in rows.values():
+        row.updated_at = now
+    CourseStats.objects.bulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=['course'],
+        update_fields=COUNTER_FIELDS + ['updated_at'],
+    )
+    return len(rows)
+
+
+def _apply(row: CourseStats, values: dict) -> None:
+    for name, value in values.items():
+        setattr(row, name, value or 0)
@@ -3,12 +3,17 @@ URL patterns for the courses app.
 """
 from django.urls import path
 
+from . import async_views
 from .views import (
     CourseListView,
+    CatalogView,
+    CatalogSyncView,
     CourseDetailView,
+    LessonContentView,
     ProgressListView,
     LessonCompleteView,
     LessonUncompleteView,
+    LessonHeartbeatView,
     CourseReviewListCreateView,
     AdminProgressListView,
     IntegrationTaskListView,
@@ -16,18 +21,27 @@ from .views import (
     ActivityLogListView,
     QuizView,
     QuizSubmitView,
+    QuizReportView,
+    ActivityHeatmapView,
+    JournalSyncView,
     AchievementListView,
     RecommendedCourseListView,
     CourseManageView,
+    CourseAssignView,
+    DashboardView,
 )
 
 
 urlpatterns = [
     path('', CourseListView.as_view(), name='course-list'),
+    path('catalog/', CatalogView.as_view(), name='course-catalog'),
+    path('sync/', CatalogSyncView.as_view(), name='catalog-sync'),
     path('<int:pk>/', CourseDetailView.as_view(), name='course-detail'),
+    path('<int:course_id>/lessons/<int:lesson_id>/content/', LessonContentView.as_view(), name='lesson-content'),
     path('progress/', ProgressListView.as_view(), name='progress-list'),
     path('<int:course_id>/lessons/<int:lesson_id>/complete/', LessonCompleteView.as_view(), name='lesson-complete'),
     path('<int:course_id>/lessons/<int:lesson_id>/uncomplete/', LessonUncompleteView.as_view(), name='lesson-uncomplete'),
+    path('<int:course_id>/lessons/<int:lesson_id>/heartbeat/', LessonHeartbeatView.as_view(), name='lesson-heartbeat'),
     # Reviews for a course
     path('<int:course_id>/reviews/', CourseReviewListCreateView.as_view(), name='course-reviews'),
     # Admin progress listing
@@ -36,10 +50,15 @@ urlpatterns = [
     path('integration/tasks/', IntegrationTaskListView.as_view(), name='integration-task-list'),
     path('integration/tasks/<int:task_id>/toggle/', UserTaskToggleView.as_view(), name='integration-task-toggle'),
     path('activities/', ActivityLogListView.as_view(), name='activity-log-list'),
+    path('activity/heatmap/', ActivityHeatmapView.as_view(), name='activity-heatmap'),
 
     # Quiz endpoints
     path('<int:course_id>/quiz/', QuizView.as_view(), name='quiz-detail'),
     path('<int:course_id>/quiz/submit/', QuizSubmitView.as_view(), name='quiz-submit'),
+    path('<int:course_id>/quiz/report/', QuizReportView.as_view(), name='quiz-report'),
+
+    # Offline journal of lesson, task and quiz actions
+    path('journal/', JournalSyncView.as_view(), name='journal-sync'),
 
     # Achievements
     path('achievements/', AchievementListView.as_view(), name='achievement-list'),
@@ -47,4 +66,18 @@ urlpatterns = [
     # Recommended courses
     path('recommended/', RecommendedCourseListView.as_view(), name='recommended-courses'),
     path('manage/', CourseManageView.as_view(), name='course-manage'),
+    path('<int:course_id>/assign/', CourseAssignView.as_view(), name='course-assign'),
+
+    # Aggregated dashboard data
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+
+    # Async variants of the read-heavy endpoints, see courses.async_views
+    path('async/', async_views.course_list, name='async-course-list'),
+    path('async/<int:pk>/', async_views.course_detail, name='async-course-detail'),
+    path('async/progress/', async_views.progress_list, name='async-progress-list'),
+    path('async/activities/', async_views.activity_list, name='async-activity-log-list'),
+    path('async/achievements/', async_views.achievement_list, name='async-achievement-list'),
+    path('async/dashboard/', async_views.dashboard, name='async-dashboard'),
+    # Server-sent activity feed
+    path('stream/', async_views.activity_stream, name='activity-stream'),
 ]
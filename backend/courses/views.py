@@ -5,31 +5,59 @@ This module defines endpoints for listing courses, retrieving course
 details with their lessons, viewing user progress across courses, and
 marking lessons as completed or uncompleted.
 """
-from datetime import timedelta
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.db.models import (
+    Count,
+    Exists,
+    F,
+    FilteredRelation,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+    prefetch_related_objects,
+)
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import generics, permissions, views, status
 from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
 
 from .models import (
     Course,
+    Module,
     Lesson,
     Progress,
+    Enrollment,
     CourseReview,
     IntegrationTask,
     UserTask,
     ActivityLog,
     Quiz,
-    Answer,
+    Question,
     QuizResult,
+    QuizAttempt,
+    JournalEntry,
     Achievement,
     UserAchievement,
+    LearningEvent,
 )
 from accounts.models import Profile
+from . import achievements, assignments, catalog_sync, daily_activity, journal, question_pools, quiz_stats, stats, watch_time
+from .goals import adjust_daily_goal, lesson_goal_minutes
+from .activity_stream import publish_on_commit
+from integration_platform.db_routers import ReplicaReadMixin
+from accounts.serializers import UserSerializer
 from .serializers import (
     CourseSerializer,
     CourseDetailSerializer,
+    CourseOutlineSerializer,
     ProgressSerializer,
     CourseReviewSerializer,
     AdminProgressSerializer,
@@ -39,121 +67,404 @@ from .serializers import (
     AchievementSerializer,
     CourseManageSerializer,
 )
+from .fieldsets import Fieldset
+from .fast_serializers import (
+    ActivityLogValuesSerializer,
+    CatalogValuesSerializer,
+    CourseValuesSerializer,
+    ProgressValuesSerializer,
+    UserTaskValuesSerializer,
+)
+
+# Largest id a database integer key holds; bigger ids overflow the query
+MAX_ID = 2 ** 63 - 1
+
+
+def log_activity(user, action: str) -> ActivityLog:
+    """Record an activity entry and push it to the user's open activity streams."""
+    entry = ActivityLog.objects.create(user=user, action=action)
+    publish_on_commit(user.id, 'activity', ActivityLogSerializer(entry).data)
+    return entry
 
-# Utility function for awarding achievements
-def award_achievement(user, code: str, name: str, description: str) -> None:
+
+def log_activities(user, actions) -> None:
+    """Record several activity entries with one insert, like ``log_activity``."""
+    entries = ActivityLog.objects.bulk_create([ActivityLog(user=user, action=action) for action in actions])
+    for entry in entries:
+        publish_on_commit(user.id, 'activity', ActivityLogSerializer(entry).data)
+
+
+def submit_quiz(user, quiz: Quiz, answers: dict, occurred_at=None, draw=None) -> QuizAttempt:
     """
-    Ensure that the given user has the specified achievement. If the
-    achievement does not exist, it will be created. If the user has
-    already earned it, no action is taken. Returns None.
+    Grade and store a quiz submission together with its side effects:
+    the latest result, course stats, learning event, activity entry and
+    achievement. ``occurred_at`` is when the learner submitted, now by
+    default. ``draw`` is the claimed draw of a quiz with question pools;
+    only its questions are graded.
     """
-    # Get or create the achievement by code
-    achievement, _ = Achievement.objects.get_or_create(
-        code=code,
-        defaults={'name': name, 'description': description},
+    question_ids = draw.question_ids if draw is not None else None
+    attempt = quiz_stats.record_attempt(user, quiz, answers, question_ids)
+    if draw is not None:
+        draw.attempt = attempt
+        draw.save(update_fields=['attempt'])
+    score, total = attempt.score, attempt.total
+    # Save or update quiz result
+    QuizResult.objects.update_or_create(user=user, quiz=quiz, defaults={'score': score})
+    stats.record_quiz_attempt(quiz.course_id, score, total)
+    event = LearningEvent(user=user, kind=LearningEvent.QUIZ_SUBMITTED, course_id=quiz.course_id, value=score)
+    if occurred_at is not None:
+        event.occurred_at = int(occurred_at.timestamp())
+    event.save()
+    daily_activity.record(user.id, timezone.localdate(occurred_at) if occurred_at else None, quizzes=1)
+    # Log the activity
+    log_activity(user, f"Completed quiz for course '{quiz.course.title}' with score {score}/{total}")
+    achievements.evaluate([user.id], achievements.QUIZ)
+    return attempt
+
+
+def ensure_user_tasks(user) -> None:
+    """Create the missing ``UserTask`` rows for ``user`` in a single insert."""
+    existing = UserTask.objects.filter(user=user).values_list('task_id', flat=True)
+    missing = IntegrationTask.objects.exclude(id__in=existing).values_list('id', flat=True)
+    UserTask.objects.bulk_create(
+        [UserTask(user=user, task_id=task_id) for task_id in missing],
+        ignore_conflicts=True,
     )
-    # Create UserAchievement link if it doesn't already exist
-    UserAchievement.objects.get_or_create(user=user, achievement=achievement)
-
-
-def adjust_daily_goal(progress: Progress, minutes_delta: int) -> None:
-    """Update daily goal tracking when lesson completion changes."""
-    today = timezone.localdate()
-    yesterday = today - timedelta(days=1)
-
-    if progress.last_progress_date != today:
-        # When entering a new day, reset minutes and update streak continuity
-        if progress.last_goal_met_date != yesterday:
-            progress.daily_streak = 0
-        progress.daily_minutes_today = 0
-        progress.last_progress_date = today
-        if progress.last_goal_met_date == today:
-            progress.last_goal_met_date = None
-
-    progress.daily_minutes_today = max(0, progress.daily_minutes_today + minutes_delta)
-
-    if progress.daily_minutes_today >= progress.daily_goal_minutes:
-        if progress.last_goal_met_date != today:
-            if progress.last_goal_met_date == yesterday:
-                progress.daily_streak += 1
-            else:
-                progress.daily_streak = 1
-            progress.last_goal_met_date = today
-    else:
-        if progress.last_goal_met_date == today:
-            progress.last_goal_met_date = None
-            progress.daily_streak = max(progress.daily_streak - 1, 0)
 
 
-class CourseListView(generics.ListAPIView):
+def task_progress(tasks) -> float:
+    """Percentage of completed tasks among serialized ``tasks``."""
+    completed = sum(1 for task in tasks if task['completed'])
+    return (completed / len(tasks)) * 100 if tasks else 0.0
+
+
+def progress_queryset(user):
+    """Progress records of ``user`` with counts and completed ids preloaded."""
+    return Progress.objects.filter(user=user).select_related('course').with_completion()
+
+
+def recommended_courses(user, started_course_ids=None):
+    """
+    Return up to five courses: first the courses assigned to the user
+    that they have not finished, soonest due first, then courses they have
+    not started yet, limited to the course role matching the profile
+    department when there is one.
+    """
+    if started_course_ids is None:
+        # Courses with existing progress records (started or completed)
+        started_course_ids = set(
+            Progress.objects.filter(user=user).values_list('course_id', flat=True)
+        )
+    role = None
+    # Determine role from profile.department if it matches a known course role
+    try:
+        profile = user.profile
+        department = (profile.department or '').lower()
+        # Build mapping from choices to keys
+        valid_roles = {k: v for k, v in Course.ROLE_CHOICES}
+        if department in valid_roles:
+            role = department
+    except Profile.DoesNotExist:
+        pass
+    unstarted = ~Q(id__in=started_course_ids)
+    if role:
+        unstarted &= Q(role=role)
+    enrollment = Enrollment.objects.filter(user=user, course_id=OuterRef('pk'))
+    queryset = Course.objects.annotate(
+        is_assigned=Exists(enrollment),
+        due_date=Subquery(enrollment.values('due_date')[:1]),
+        **completion_counts(user),
+    )
+    assigned = Q(is_assigned=True) & (Q(lesson_count=0) | Q(completed_count__lt=F('lesson_count')))
+    return queryset.filter(assigned | unstarted).order_by(
+        '-is_assigned', F('due_date').asc(nulls_last=True), 'id'
+    )[:5]
+
+
+def completion_counts(user) -> dict:
+    """
+    Annotations counting the lessons of each course and those ``user``
+    completed, as correlated subqueries.
+    """
+    completed = (
+        Progress.completed_lessons.through.objects
+        .filter(progress__user=user, progress__course_id=OuterRef('pk'))
+        .order_by()
+        .values('progress_id')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    lessons = (
+        Lesson.objects
+        .filter(course_id=OuterRef('pk'))
+        .order_by()
+        .values('course_id')
+        .annotate(total=Count('*'))
+        .values('total')
+    )
+    return {
+        'completed_count': Coalesce(Subquery(completed), 0),
+        'lesson_count': Coalesce(Subquery(lessons), 0),
+    }
+
+
+def catalog_queryset(user, queryset=None):
+    """
+    Courses annotated with the progress and review of ``user``, as read by
+    ``CatalogValuesSerializer``. The user's progress record and review are
+    LEFT JOINs restricted to the user and the lesson counts are correlated
+    subqueries, so any number of courses loads in a single query.
+    """
+    if queryset is None:
+        queryset = Course.objects.all()
+    return queryset.annotate(
+        my_progress=FilteredRelation('progress_records', condition=Q(progress_records__user=user)),
+        my_review=FilteredRelation('reviews', condition=Q(reviews__user=user)),
+        **completion_counts(user),
+    )
+
+
+def filter_courses(queryset, search=None, role=None):
+    """Apply the ``search`` and ``role`` filters of the course list."""
+    if search:
+        # Filter by title or description containing search term (case-insensitive)
+        queryset = queryset.filter(
+            Q(title__icontains=search) | Q(description__icontains=search)
+        )
+    if role:
+        queryset = queryset.filter(role=role)
+    return queryset
+
+
+class ValuesListMixin:
+    """
+    Answer list requests with ``values_serializer_class`` (see
+    ``courses.fast_serializers``), narrowed to the ``fields`` and
+    ``expand`` query parameters. ``serializer_class`` still describes
+    the response and is used for single objects.
+    """
+
+    values_serializer_class = None
+
+    def get_fieldset(self) -> Fieldset:
+        serializer_class = self.values_serializer_class
+        return Fieldset.from_params(
+            self.request.query_params, serializer_class.available(), serializer_class.expandable
+        )
+
+    def list(self, request, *args, **kwargs):
+        fieldset = self.get_fieldset()
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(self.values_serializer_class(fieldset).serialize(queryset))
+
+
+class CourseListView(ReplicaReadMixin, ValuesListMixin, generics.ListAPIView):
     """List all available courses."""
 
     serializer_class = CourseSerializer
+    values_serializer_class = CourseValuesSerializer
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
-        queryset = Course.objects.all().order_by('id')
-        search = self.request.query_params.get('search')
-        role = self.request.query_params.get('role')
-        if search:
-            # Filter by title or description containing search term (case-insensitive)
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(description__icontains=search)
+        return filter_courses(
+            Course.objects.all().order_by('id'),
+            search=self.request.query_params.get('search'),
+            role=self.request.query_params.get('role'),
+        )
+
+
+class CatalogView(ValuesListMixin, generics.ListAPIView):
+    """
+    The course list with the caller's progress inlined: completed and
+    total lesson counts, percentage, daily goal and streak, and the
+    caller's own rating next to the course average. Accepts the
+    ``search`` and ``role`` filters of ``CourseListView`` and ``fields``.
+    """
+
+    serializer_class = CourseSerializer
+    values_serializer_class = CatalogValuesSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return filter_courses(
+            catalog_queryset(self.request.user).order_by('id'),
+            search=self.request.query_params.get('search'),
+            role=self.request.query_params.get('role'),
+        )
+
+
+class CatalogSyncView(views.APIView):
+    """
+    Delta sync of catalog content for offline clients, see
+    ``courses.catalog_sync.changes_since``. ``cursor`` is the cursor of
+    the previous response (0 for a full sync) and ``limit`` the number of
+    changes per page.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request) -> Response:
+        try:
+            cursor = int(request.query_params.get('cursor', 0))
+            limit = int(request.query_params.get('limit', catalog_sync.PAGE_SIZE))
+        except ValueError:
+            cursor = limit = -1
+        if cursor < 0 or not 1 <= limit <= catalog_sync.MAX_PAGE_SIZE:
+            return Response(
+                {'detail': f'cursor must be a non-negative integer and limit between 1 and {catalog_sync.MAX_PAGE_SIZE}.'},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        if role:
-            queryset = queryset.filter(role=role)
-        return queryset
+        return Response(catalog_sync.changes_since(cursor, limit))
 
 
-class CourseDetailView(generics.RetrieveAPIView):
-    """Retrieve a course with its lessons."""
+class CourseDetailView(ReplicaReadMixin, generics.RetrieveAPIView):
+    """
+    Retrieve a course with its lessons.
+
+    With ``?outline=1`` the lessons carry metadata only: their content is
+    never loaded from the database and each lesson links to
+    ``LessonContentView`` instead. ``?fields=`` and ``?expand=`` (see
+    ``courses.fieldsets``) select the returned fields; unexpanded
+    ``lessons`` and ``modules`` are lists of ids.
+    """
+
+    COLUMNS = ('title', 'description', 'role', 'image_url')
 
     queryset = Course.objects.all()
     serializer_class = CourseDetailSerializer
     permission_classes = [permissions.AllowAny]
 
+    def is_outline(self) -> bool:
+        return self.request.query_params.get('outline', '').lower() in ('1', 'true', 'yes')
+
+    def get_fieldset(self) -> Fieldset:
+        if not hasattr(self, '_fieldset'):
+            self._fieldset = Fieldset.from_params(
+                self.request.query_params,
+                CourseDetailSerializer.Meta.fields,
+                CourseDetailSerializer.Meta.expandable,
+            )
+        return self._fieldset
+
+    @classmethod
+    def narrow_course_queryset(cls, queryset, fieldset: Fieldset):
+        """Load only the course columns and stats the fieldset returns."""
+        if fieldset.fields is not None:
+            queryset = queryset.only('id', *(name for name in cls.COLUMNS if fieldset.includes(name)))
+        if fieldset.includes('stats') or fieldset.includes('average_rating'):
+            queryset = queryset.select_related('stats')
+        return queryset
+
+    def get_queryset(self):
+        fieldset = self.get_fieldset()
+        queryset = self.narrow_course_queryset(super().get_queryset(), fieldset)
+        lessons = Lesson.objects.select_related('module').defer(*Lesson.RENDERED_BODY_FIELDS)
+        if self.is_outline():
+            lessons = lessons.defer('content')
+        prefetches = []
+        if fieldset.expands('lessons'):
+            prefetches.append(Prefetch('lessons', queryset=lessons))
+        elif fieldset.includes('lessons'):
+            prefetches.append(Prefetch('lessons', queryset=Lesson.objects.only('id', 'course_id')))
+        if fieldset.expands('modules'):
+            prefetches.append(Prefetch('modules__lessons', queryset=lessons))
+        elif fieldset.includes('modules'):
+            prefetches.append(Prefetch('modules', queryset=Module.objects.only('id', 'course_id')))
+        return queryset.prefetch_related(*prefetches)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fieldset'] = self.get_fieldset()
+        return context
+
+    def get_serializer_class(self):
+        if self.is_outline():
+            return CourseOutlineSerializer
+        return super().get_serializer_class()
+
+
+class LessonContentView(ReplicaReadMixin, views.APIView):
+    """
+    Return the content body of a single lesson, as written and as the
+    HTML, table of contents and media rendered from it when it was saved
+    (see ``courses.content``).
+
+    Lesson bodies change rarely, so responses are cacheable for
+    ``LESSON_CONTENT_MAX_AGE`` seconds and carry an ETag; a matching
+    ``If-None-Match`` is answered with 304 Not Modified.
+    """
+
+    permission_classes = [permissions.AllowAny]
 
-class ProgressListView(generics.ListAPIView):
+    def get(self, request, course_id: int, lesson_id: int) -> Response:
+        lesson = get_object_or_404(
+            Lesson.objects.only('id', 'content', *Lesson.RENDERED_FIELDS), id=lesson_id, course_id=course_id
+        )
+        # Saved before the current renderer, or rendered from an older body
+        # by manage.py render_lessons while it was being edited
+        lesson.render_content()
+        etag = f'"{lesson.content_hash[:32]}-{lesson.render_version}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({
+                'id': lesson_id,
+                'content': lesson.content,
+                'html': lesson.content_html,
+                'toc': lesson.content_toc,
+                'media': lesson.content_media,
+                'reading_minutes': lesson.reading_minutes,
+            })
+        response['ETag'] = etag
+        response['Cache-Control'] = f'public, max-age={settings.LESSON_CONTENT_MAX_AGE}'
+        return response
+
+
+class ProgressListView(ValuesListMixin, generics.ListAPIView):
     """List the authenticated user's progress records for all courses."""
 
     serializer_class = ProgressSerializer
+    values_serializer_class = ProgressValuesSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         # Ensure progress records exist for each course the user has started.
-        return Progress.objects.filter(user=self.request.user).select_related('course')
+        return progress_queryset(self.request.user)
 
 
 class LessonCompleteView(views.APIView):
     """Mark a lesson as completed for the current user."""
 
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'lesson_complete'
 
     def post(self, request, course_id: int, lesson_id: int) -> Response:
         # Validate course and lesson existence
         course = get_object_or_404(Course, id=course_id)
         lesson = get_object_or_404(Lesson, id=lesson_id, course=course)
         # Get or create progress record
-        progress, _ = Progress.objects.get_or_create(user=request.user, course=course)
+        progress, created = Progress.objects.get_or_create(user=request.user, course=course)
+        if created:
+            stats.record_enrolment(course.id)
+        already_completed = not created and progress.has_completed(lesson)
         # Add lesson to completed list
-        progress.completed_lessons.add(lesson)
-        adjust_daily_goal(progress, lesson.estimated_minutes)
+        progress.mark_completed(lesson)
+        minutes = lesson_goal_minutes(lesson)
+        if not already_completed:
+            adjust_daily_goal(progress, minutes)
         progress.save()
+        if not already_completed:
+            # Re-posting a completed lesson is neither activity nor a transition
+            daily_activity.record(request.user.id, minutes=minutes, lessons=1)
+            LearningEvent.objects.create(
+                user=request.user, kind=LearningEvent.LESSON_COMPLETED, course=course, lesson=lesson
+            )
         # Log activity
-        ActivityLog.objects.create(
-            user=request.user,
-            action=f"Completed lesson '{lesson.title}' in course '{course.title}'",
-        )
-        # Award achievement for completing first course
+        log_activity(request.user, f"Completed lesson '{lesson.title}' in course '{course.title}'")
         percent = progress.progress_percentage()
-        # If the user finished the course (100% progress), award the first-course achievement
-        if percent >= 100.0:
-            award_achievement(
-                request.user,
-                code='first_course',
-                name='First Course Completed',
-                description='Completed your first course',
-            )
+        if percent >= 100.0 and not already_completed:
+            stats.record_completion(course.id)
+        achievements.evaluate([request.user.id], achievements.LESSON)
         return Response({'detail': 'Lesson marked as completed.'}, status=status.HTTP_200_OK)
 
 
@@ -166,17 +477,48 @@ class LessonUncompleteView(views.APIView):
         course = get_object_or_404(Course, id=course_id)
         lesson = get_object_or_404(Lesson, id=lesson_id, course=course)
         progress = get_object_or_404(Progress, user=request.user, course=course)
-        progress.completed_lessons.remove(lesson)
-        adjust_daily_goal(progress, -lesson.estimated_minutes)
+        was_completed = progress.has_completed(lesson)
+        was_finished = was_completed and progress.progress_percentage() >= 100.0
+        progress.mark_uncompleted(lesson)
+        if was_finished:
+            stats.record_completion(course.id, -1)
+        minutes = lesson_goal_minutes(lesson)
+        if was_completed:
+            adjust_daily_goal(progress, -minutes)
         progress.save()
+        if was_completed:
+            daily_activity.record(request.user.id, minutes=-minutes)
+            LearningEvent.objects.create(
+                user=request.user, kind=LearningEvent.LESSON_UNCOMPLETED, course=course, lesson=lesson
+            )
         # Log activity
-        ActivityLog.objects.create(
-            user=request.user,
-            action=f"Marked lesson '{lesson.title}' as uncompleted in course '{course.title}'",
-        )
+        log_activity(request.user, f"Marked lesson '{lesson.title}' as uncompleted in course '{course.title}'")
         return Response({'detail': 'Lesson marked as uncompleted.'}, status=status.HTTP_200_OK)
 
 
+class LessonHeartbeatView(views.APIView):
+    """
+    Heartbeat of an open lesson, sent every few seconds with the
+    ``seconds`` the learner was active since the previous heartbeat. See
+    ``courses.watch_time``. The token is checked without loading the
+    user, so a heartbeat costs no query; a background thread writes them.
+    """
+
+    authentication_classes = [JWTStatelessUserAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, course_id: int, lesson_id: int) -> Response:
+        try:
+            seconds = int(request.data.get('seconds', 0))
+        except (TypeError, ValueError):
+            seconds = -1
+        if seconds < 0:
+            return Response({'detail': 'seconds must be a non-negative integer.'}, status=status.HTTP_400_BAD_REQUEST)
+        # The id claim of the token, which may be a string
+        counted = watch_time.record_heartbeat(int(request.user.id), course_id, lesson_id, seconds)
+        return Response({'counted': counted})
+
+
 class CourseReviewListCreateView(generics.ListCreateAPIView):
     """
     List existing reviews for a course and allow authenticated users to create a new review.
@@ -195,40 +537,38 @@ class CourseReviewListCreateView(generics.ListCreateAPIView):
 
     def perform_create(self, serializer):
         course = get_object_or_404(Course, id=self.kwargs['course_id'])
-        serializer.save(course=course)
+        review = serializer.save(course=course)
+        stats.record_review(course.id, review.rating)
 
 
-class AdminProgressListView(generics.ListAPIView):
+class AdminProgressListView(ReplicaReadMixin, generics.ListAPIView):
     """Admin view to list progress for all users and courses."""
 
     serializer_class = AdminProgressSerializer
     permission_classes = [permissions.IsAdminUser]
-    queryset = Progress.objects.select_related('user', 'course')
+
+    def get_queryset(self):
+        return Progress.objects.select_related('user', 'course').with_completion()
 
 
-class IntegrationTaskListView(generics.ListAPIView):
+class IntegrationTaskListView(ValuesListMixin, generics.ListAPIView):
     """
     List integration tasks for the authenticated user. Returns the user's
     completion status for each task and an overall progress percentage.
     """
 
     serializer_class = UserTaskSerializer
+    values_serializer_class = UserTaskValuesSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         # Ensure a UserTask exists for each IntegrationTask
-        tasks = IntegrationTask.objects.all().order_by('order')
-        for task in tasks:
-            UserTask.objects.get_or_create(user=self.request.user, task=task)
+        ensure_user_tasks(self.request.user)
         return UserTask.objects.filter(user=self.request.user).select_related('task').order_by('task__order')
 
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        total = queryset.count()
-        completed = queryset.filter(completed=True).count()
-        progress = (completed / total) * 100 if total else 0.0
-        return Response({'progress': progress, 'tasks': serializer.data})
+        tasks = super().list(request, *args, **kwargs).data
+        return Response({'progress': task_progress(tasks), 'tasks': tasks})
 
 
 class UserTaskToggleView(views.APIView):
@@ -246,24 +586,27 @@ class UserTaskToggleView(views.APIView):
             from django.utils import timezone
             user_task.completed_at = timezone.now()
             # Log completion activity
-            ActivityLog.objects.create(
-                user=request.user,
-                action=f"Completed task '{task.description}'",
-            )
+            log_activity(request.user, f"Completed task '{task.description}'")
         else:
             user_task.completed_at = None
-            ActivityLog.objects.create(
-                user=request.user,
-                action=f"Marked task '{task.description}' as not completed",
-            )
+            log_activity(request.user, f"Marked task '{task.description}' as not completed")
         user_task.save()
+        publish_on_commit(request.user.id, 'task', UserTaskSerializer(user_task).data)
+        if user_task.completed:
+            achievements.evaluate([request.user.id], achievements.TASK)
+        LearningEvent.objects.create(
+            user=request.user,
+            kind=LearningEvent.TASK_COMPLETED if user_task.completed else LearningEvent.TASK_UNCOMPLETED,
+            task=task,
+        )
         return Response({'completed': user_task.completed})
 
 
-class ActivityLogListView(generics.ListAPIView):
+class ActivityLogListView(ValuesListMixin, generics.ListAPIView):
     """Return the most recent activity logs for the authenticated user."""
 
     serializer_class = ActivityLogSerializer
+    values_serializer_class = ActivityLogValuesSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -273,11 +616,12 @@ class ActivityLogListView(generics.ListAPIView):
 
 # ---------- Quiz views ----------
 
-class QuizView(views.APIView):
+class QuizView(ReplicaReadMixin, views.APIView):
     """
     Retrieve the quiz associated with a specific course. Only authenticated
     users can access quizzes. Returns 404 if the course does not have a
-    quiz defined.
+    quiz defined. A quiz with question pools returns the questions drawn
+    for the user's next attempt, the same ones until it is submitted.
     """
 
     permission_classes = [permissions.IsAuthenticated]
@@ -291,6 +635,10 @@ class QuizView(views.APIView):
             quiz = None
         if not quiz:
             return Response({'detail': 'Quiz not found.'}, status=status.HTTP_404_NOT_FOUND)
+        draw = question_pools.open_draw(request.user, quiz)
+        if draw is not None:
+            served = Question.objects.filter(id__in=draw.question_ids).order_by('id').prefetch_related('answers')
+            prefetch_related_objects([quiz], Prefetch('questions', queryset=served))
         serializer = QuizSerializer(quiz)
         return Response(serializer.data)
 
@@ -306,6 +654,7 @@ class QuizSubmitView(views.APIView):
     """
 
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'quiz_submit'
 
     def post(self, request, course_id: int) -> Response:
         course = get_object_or_404(Course, id=course_id)
@@ -314,41 +663,262 @@ class QuizSubmitView(views.APIView):
         except Quiz.DoesNotExist:
             return Response({'detail': 'Quiz not found.'}, status=status.HTTP_404_NOT_FOUND)
         answers = request.data.get('answers', {}) or {}
-        correct = 0
-        total = quiz.questions.count()
-        for question in quiz.questions.all():
-            answer_id = answers.get(str(question.id))
-            if answer_id:
-                # Check if the selected answer is correct
-                try:
-                    ans = Answer.objects.get(id=answer_id, question=question)
-                    if ans.is_correct:
-                        correct += 1
-                except Answer.DoesNotExist:
-                    pass
-        score = correct
-        # Save or update quiz result
-        QuizResult.objects.update_or_create(
-            user=request.user, quiz=quiz, defaults={'score': score}
-        )
-        # Log the activity
-        ActivityLog.objects.create(
-            user=request.user,
-            action=f"Completed quiz for course '{course.title}' with score {score}/{total}",
+        if not isinstance(answers, dict):
+            return Response({'detail': 'answers must be an object.'}, status=status.HTTP_400_BAD_REQUEST)
+        draw = None
+        if question_pools.is_pooled(quiz):
+            draw = question_pools.take_draw(request.user, quiz)
+            if draw is None:
+                return Response(
+                    {'detail': 'No questions were drawn for this attempt; fetch the quiz first.'},
+                    status=status.HTTP_409_CONFLICT,
+                )
+        attempt = submit_quiz(request.user, quiz, answers, draw=draw)
+        return Response({'score': attempt.score, 'total': attempt.total})
+
+
+class QuizReportView(views.APIView):
+    """
+    Per-question difficulty and discrimination of a course's quiz, for
+    staff. Computed from the counters kept by ``courses.quiz_stats``.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, course_id: int) -> Response:
+        quiz = get_object_or_404(Quiz, course_id=course_id)
+        return Response(quiz_stats.quiz_report(quiz))
+
+
+# ---------- Daily activity ----------
+
+class ActivityHeatmapView(ReplicaReadMixin, views.APIView):
+    """
+    Calendar heatmap of the current user's activity across courses, see
+    ``courses.daily_activity``: the active days of ``?year=`` or, by
+    default, of the last 365 days, with the user's streak.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request) -> Response:
+        today = timezone.localdate()
+        year = request.query_params.get('year')
+        if year is None:
+            start, end = today - timedelta(days=364), today
+        else:
+            try:
+                year = int(year)
+                start, end = date(year, 1, 1), date(year, 12, 31)
+            except (TypeError, ValueError):
+                return Response({'detail': 'year must be a year number.'}, status=status.HTTP_400_BAD_REQUEST)
+        streak = daily_activity.get_streak(request.user)
+        return Response({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'days': daily_activity.heatmap(request.user, start, end),
+            'streak': {
+                'current': streak.streak_on(today),
+                'longest': streak.longest_streak,
+                'last_active_day': streak.last_active_day.isoformat() if streak.last_active_day else None,
+            },
+        })
+
+
+# ---------- Offline journal ----------
+
+class JournalSyncView(views.APIView):
+    """
+    Apply a journal of actions recorded offline in one transaction, see
+    ``courses.journal``. The body is ``{"events": [...]}`` where every
+    event has a ``key``, a ``type``, the client time ``at`` and, by type,
+    ``course`` and ``lesson``, ``task``, or ``course`` and ``answers``.
+    The response lists the outcome of each event in journal order and the
+    progress records of the courses whose state changed.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = 'journal_sync'
+
+    def post(self, request) -> Response:
+        raw_events = request.data.get('events')
+        if not isinstance(raw_events, list) or len(raw_events) > journal.MAX_EVENTS:
+            return Response(
+                {'detail': f'events must be a list of at most {journal.MAX_EVENTS} events.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        user = request.user
+        events = journal.parse_journal(raw_events)
+        try:
+            with transaction.atomic():
+                pending = journal.resolve(user, events)
+                course_ids = self.apply_lessons(user, [event for event in pending if event.kind in journal.LESSON_KINDS])
+                self.apply_tasks(user, [event for event in pending if event.kind in journal.TASK_KINDS])
+                self.apply_quizzes(user, [event for event in pending if event.kind == JournalEntry.QUIZ_SUBMIT])
+                journal.record(user, events)
+        except IntegrityError:
+            # Another request stored one of the keys first
+            return Response(
+                {'detail': 'These events are being synced by another request. Retry later.'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        progress = []
+        if course_ids:
+            progress = ProgressValuesSerializer().serialize(progress_queryset(user).filter(course_id__in=course_ids))
+        return Response({'results': [event.result() for event in events], 'progress': progress})
+
+    def apply_lessons(self, user, events) -> set:
+        """
+        Apply lesson events and return the ids of the courses that
+        changed. Every course is written and its daily goal recomputed
+        once, whatever the number of its events.
+        """
+        if not events:
+            return set()
+        course_ids = {event.course_id for event in events}
+        records = {
+            record.course_id: record
+            for record in Progress.objects.filter(user=user, course_id__in=course_ids).select_related('course')
+        }
+        for course_id in course_ids - set(records):
+            records[course_id] = Progress.objects.create(user=user, course_id=course_id)
+            stats.record_enrolment(course_id)
+        lessons = Lesson.objects.only('id', 'course_id', 'title', 'slot', 'estimated_minutes').in_bulk(
+            {event.lesson_id for event in events}
         )
-        # Award achievement for completing first quiz
-        award_achievement(
-            request.user,
-            code='first_quiz',
-            name='First Quiz Completed',
-            description='Completed your first course quiz',
+        completed = set(
+            Progress.completed_lessons.through.objects.filter(
+                progress_id__in=[record.id for record in records.values()], lesson_id__in=list(lessons)
+            ).values_list('progress_id', 'lesson_id')
         )
-        return Response({'score': score, 'total': total})
+        initial = set(completed)
+        # Minutes gained or lost per course and local day
+        minutes = {course_id: {} for course_id in course_ids}
+        # Minutes and completed lessons per local day, across courses
+        activity = {}
+        learning_events = []
+        actions = []
+        for event in events:
+            record, lesson = records[event.course_id], lessons[event.lesson_id]
+            done = event.kind == JournalEntry.LESSON_COMPLETE
+            pair = (record.id, lesson.id)
+            if (pair in completed) == done:
+                event.status = JournalEntry.UNCHANGED
+                continue
+            event.status = JournalEntry.APPLIED
+            if done:
+                completed.add(pair)
+            else:
+                completed.discard(pair)
+            day = timezone.localdate(event.at)
+            delta = lesson_goal_minutes(lesson) if done else -lesson_goal_minutes(lesson)
+            minutes[event.course_id][day] = minutes[event.course_id].get(day, 0) + delta
+            day_minutes, day_lessons = activity.get(day, (0, 0))
+            activity[day] = (day_minutes + delta, day_lessons + done)
+            learning_events.append(LearningEvent(
+                user=user,
+                kind=LearningEvent.LESSON_COMPLETED if done else LearningEvent.LESSON_UNCOMPLETED,
+                course_id=event.course_id,
+                lesson_id=lesson.id,
+                occurred_at=event.unix_time,
+            ))
+            if done:
+                actions.append(f"Completed lesson '{lesson.title}' in course '{record.course.title}'")
+            else:
+                actions.append(f"Marked lesson '{lesson.title}' as uncompleted in course '{record.course.title}'")
+
+        gained, lost = completed - initial, initial - completed
+        changed = set()
+        for course_id, record in records.items():
+            added = [lesson for lesson in lessons.values() if (record.id, lesson.id) in gained]
+            removed = [lesson for lesson in lessons.values() if (record.id, lesson.id) in lost]
+            if not added and not removed:
+                continue
+            changed.add(course_id)
+            was_finished = record.progress_percentage() >= 100.0
+            if added:
+                record.mark_completed(*added)
+            if removed:
+                record.mark_uncompleted(*removed)
+            for day, delta in sorted(minutes[course_id].items()):
+                # Days the record has already moved past no longer count
+                if record.last_progress_date is None or day >= record.last_progress_date:
+                    adjust_daily_goal(record, delta, day)
+            record.save()
+            is_finished = record.progress_percentage() >= 100.0
+            if is_finished != was_finished:
+                stats.record_completion(course_id, 1 if is_finished else -1)
+        LearningEvent.objects.bulk_create(learning_events)
+        daily_activity.record_many({
+            (user.id, day): (day_minutes, day_lessons, 0) for day, (day_minutes, day_lessons) in activity.items()
+        })
+        log_activities(user, actions)
+        if gained:
+            achievements.evaluate([user.id], achievements.LESSON)
+        return changed
+
+    def apply_tasks(self, user, events) -> None:
+        if not events:
+            return
+        ensure_user_tasks(user)
+        user_tasks = {
+            user_task.task_id: user_task
+            for user_task in UserTask.objects.filter(
+                user=user, task_id__in={event.task_id for event in events}
+            ).select_related('task')
+        }
+        changed = {}
+        learning_events = []
+        actions = []
+        for event in events:
+            user_task = user_tasks[event.task_id]
+            done = event.kind == JournalEntry.TASK_COMPLETE
+            if user_task.completed == done:
+                event.status = JournalEntry.UNCHANGED
+                continue
+            event.status = JournalEntry.APPLIED
+            user_task.completed = done
+            user_task.completed_at = event.at if done else None
+            changed[user_task.task_id] = user_task
+            learning_events.append(LearningEvent(
+                user=user,
+                kind=LearningEvent.TASK_COMPLETED if done else LearningEvent.TASK_UNCOMPLETED,
+                task_id=event.task_id,
+                occurred_at=event.unix_time,
+            ))
+            if done:
+                actions.append(f"Completed task '{user_task.task.description}'")
+            else:
+                actions.append(f"Marked task '{user_task.task.description}' as not completed")
+        UserTask.objects.bulk_update(changed.values(), ['completed', 'completed_at'])
+        LearningEvent.objects.bulk_create(learning_events)
+        log_activities(user, actions)
+        for user_task in changed.values():
+            publish_on_commit(user.id, 'task', UserTaskSerializer(user_task).data)
+        if any(user_task.completed for user_task in changed.values()):
+            achievements.evaluate([user.id], achievements.TASK)
+
+    def apply_quizzes(self, user, events) -> None:
+        # Every submission is an attempt of its own
+        pooled = {}
+        for event in events:
+            quiz = event.quiz
+            if quiz.id not in pooled:
+                pooled[quiz.id] = question_pools.is_pooled(quiz)
+            draw = None
+            if pooled[quiz.id]:
+                # Each attempt needs the draw the device fetched while online
+                draw = question_pools.take_draw(user, quiz)
+                if draw is None:
+                    event.reject('No questions were drawn for this attempt.')
+                    continue
+            event.attempt = submit_quiz(user, quiz, event.answers, event.at, draw)
+            event.status = JournalEntry.APPLIED
 
 
 # ---------- Achievement view ----------
 
-class AchievementListView(generics.ListAPIView):
+class AchievementListView(ReplicaReadMixin, generics.ListAPIView):
     """
     List all defined achievements along with an ``awarded`` flag indicating
     whether the current user has earned each one. Only authenticated
@@ -363,12 +933,17 @@ class AchievementListView(generics.ListAPIView):
         context = super().get_serializer_context()
         # Include request in context for the serializer to determine award status
         context.update({'request': self.request})
+        if self.request.user.is_authenticated:
+            context['awarded_ids'] = set(
+                UserAchievement.objects.filter(user=self.request.user)
+                .values_list('achievement_id', flat=True)
+            )
         return context
 
 
 # ---------- Recommended courses view ----------
 
-class RecommendedCourseListView(generics.ListAPIView):
+class RecommendedCourseListView(ValuesListMixin, generics.ListAPIView):
     """
     Recommend courses for the current user based on their role (department)
     and existing progress records. Courses already started or completed are
@@ -379,29 +954,11 @@ class RecommendedCourseListView(generics.ListAPIView):
     """
 
     serializer_class = CourseSerializer
+    values_serializer_class = CourseValuesSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        # Courses with existing progress records (started or completed)
-        started_course_ids = set(
-            Progress.objects.filter(user=user).values_list('course_id', flat=True)
-        )
-        role = None
-        # Determine role from profile.department if it matches a known course role
-        try:
-            profile = user.profile
-            department = (profile.department or '').lower()
-            # Build mapping from choices to keys
-            valid_roles = {k: v for k, v in Course.ROLE_CHOICES}
-            if department in valid_roles:
-                role = department
-        except Profile.DoesNotExist:
-            pass
-        queryset = Course.objects.exclude(id__in=started_course_ids)
-        if role:
-            queryset = queryset.filter(role=role)
-        return queryset.order_by('id')[:5]
+        return recommended_courses(self.request.user)
 
 
 class CourseManageView(generics.CreateAPIView):
@@ -409,3 +966,151 @@ class CourseManageView(generics.CreateAPIView):
 
     serializer_class = CourseManageSerializer
     permission_classes = [permissions.IsAdminUser]
+
+
+class CourseAssignView(views.APIView):
+    """
+    Assign a course to a whole department or to a list of users, for
+    staff. The body holds either ``department`` or ``users`` (a list of
+    user ids), and optionally a ``due_date``. See ``courses.assignments``.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, course_id: int) -> Response:
+        course = get_object_or_404(Course, id=course_id)
+        department = request.data.get('department') or ''
+        user_ids = request.data.get('users')
+        if not isinstance(department, str) or bool(department.strip()) == (user_ids is not None):
+            return Response(
+                {'detail': 'Provide either department or users.'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if user_ids is not None and (
+            not isinstance(user_ids, list)
+            or not user_ids
+            or not all(
+                isinstance(user_id, int) and not isinstance(user_id, bool) and 0 < user_id <= MAX_ID
+                for user_id in user_ids
+            )
+        ):
+            return Response({'detail': 'users must be a non-empty list of user ids.'}, status=status.HTTP_400_BAD_REQUEST)
+        due_date = request.data.get('due_date')
+        if due_date is not None:
+            try:
+                due_date = parse_date(due_date) if isinstance(due_date, str) else None
+            except ValueError:
+                due_date = None
+            if due_date is None:
+                return Response({'detail': 'due_date must be a date (YYYY-MM-DD).'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            assignment, created = assignments.assign(
+                course, department=department.strip(), user_ids=user_ids, due_date=due_date, assigned_by=request.user
+            )
+        except ValueError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {
+                'id': assignment.id,
+                'course': course.id,
+                'department': assignment.department,
+                'due_date': due_date.isoformat() if due_date else None,
+                'assigned': assignment.assignee_count,
+                'enrolled': created,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+# ---------- Dashboard view ----------
+
+class DashboardView(views.APIView):
+    """
+    Return everything the dashboard renders in a single response.
+
+    The ``sections`` query parameter selects a comma-separated subset of
+    ``profile``, ``progress``, ``tasks``, ``activities``, ``achievements``
+    and ``recommended``; all sections are returned by default. Sections
+    share the loaded profile and progress records, so the whole response
+    costs a small, fixed number of queries. The build time of each
+    section in milliseconds is returned under ``timings`` and in the
+    ``Server-Timing`` header.
+    """
+
+    SECTIONS = ('profile', 'progress', 'tasks', 'activities', 'achievements', 'recommended')
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request) -> Response:
+        sections = self.get_sections(request)
+        if sections is None:
+            return Response(
+                {'detail': f"Unknown section. Choose from: {', '.join(self.SECTIONS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        user = request.user
+        # Attach the profile once so every section reuses it
+        if 'profile' in sections or 'recommended' in sections:
+            user.profile, _ = Profile.objects.get_or_create(user=user)
+        self.progress_data = None
+        data = {}
+        timings = {}
+        for name in sections:
+            started = time.perf_counter()
+            data[name] = getattr(self, f'build_{name}')(request)
+            timings[name] = round((time.perf_counter() - started) * 1000, 2)
+        data['timings'] = timings
+        response = Response(data)
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration}' for name, duration in timings.items()
+        )
+        return response
+
+    def get_sections(self, request):
+        return self.parse_sections(request.query_params.get('sections'))
+
+    @classmethod
+    def parse_sections(cls, raw):
+        """Return the requested sections in canonical order, or None if invalid."""
+        if not raw:
+            return list(cls.SECTIONS)
+        requested = {name.strip() for name in raw.split(',') if name.strip()}
+        if not requested or requested - set(cls.SECTIONS):
+            return None
+        return [name for name in cls.SECTIONS if name in requested]
+
+    def get_progress_data(self, request):
+        if self.progress_data is None:
+            self.progress_data = ProgressValuesSerializer().serialize(progress_queryset(request.user))
+        return self.progress_data
+
+    def build_profile(self, request):
+        return UserSerializer(request.user).data
+
+    def build_progress(self, request):
+        return self.get_progress_data(request)
+
+    def build_tasks(self, request):
+        ensure_user_tasks(request.user)
+        tasks = UserTaskValuesSerializer().serialize(
+            UserTask.objects.filter(user=request.user).order_by('task__order')
+        )
+        return {'progress': task_progress(tasks), 'tasks': tasks}
+
+    def build_activities(self, request):
+        activities = ActivityLog.objects.filter(user=request.user).order_by('-timestamp')[:10]
+        return ActivityLogValuesSerializer().serialize(activities)
+
+    def build_achievements(self, request):
+        awarded_ids = set(
+            UserAchievement.objects.filter(user=request.user).values_list('achievement_id', flat=True)
+        )
+        return AchievementSerializer(
+            Achievement.objects.all(), many=True, context={'awarded_ids': awarded_ids}
+        ).data
+
+    def build_recommended(self, request):
+        started_course_ids = None
+        if self.progress_data is not None:
+            started_course_ids = {record['course']['id'] for record in self.progress_data}
+        courses = recommended_courses(request.user, started_course_ids)
+        return CourseValuesSerializer().serialize(courses)
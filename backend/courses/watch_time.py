@@ -0,0 +1,226 @@
+"""
+Time spent on lessons, from heartbeats.
+
+While a lesson is open the client posts a heartbeat every few seconds to
+``LessonHeartbeatView`` with the seconds the learner was active since
+the previous one. A heartbeat never touches the database: it is added to
+an in-memory counter per user, lesson and day, so all heartbeats of an
+open lesson between two flushes collapse into one number.
+
+Every ``LESSON_HEARTBEAT_FLUSH_SECONDS`` a background thread of the
+process swaps the buffer out and adds it to ``LessonTimeDaily`` with a
+fixed number of statements per batch of counters: one insert of the
+missing rows and one ``UPDATE`` adding the seconds through a ``CASE``.
+Heartbeats never wait for a flush; a full buffer only wakes the thread. With
+``DAILY_GOAL_CREDIT = 'watch_time'`` the whole minutes gained per course
+and day then go to the daily goals (see ``courses.goals``) and the daily
+activity (see ``courses.daily_activity``).
+
+Each worker process has its own buffer. Flushes only ever add to the
+stored counters, so processes never overwrite each other. Seconds still
+buffered are flushed when the process exits normally and lost if it
+dies.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.utils import timezone
+
+from . import daily_activity, goals
+from .models import LessonTimeDaily, Lesson
+
+logger = logging.getLogger(__name__)
+
+# Counters per UPDATE statement; each adds four query parameters
+BATCH_SIZE = 200
+# Allowance for network jitter when capping heartbeats by the time between them
+SLACK_SECONDS = 2
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+class HeartbeatBuffer:
+    """Thread-safe counters of heartbeat seconds waiting to be flushed."""
+
+    # Flush early when this many counters are buffered
+    MAX_COUNTERS = 50000
+
+    def __init__(self):
+        self.flush_seconds = getattr(settings, 'LESSON_HEARTBEAT_FLUSH_SECONDS', 10)
+        self.max_seconds = getattr(settings, 'LESSON_HEARTBEAT_MAX_SECONDS', 30)
+        self.lock = threading.Lock()
+        # (user_id, course_id, lesson_id, day) -> seconds
+        self.counters = {}
+        # (user_id, lesson_id) -> monotonic time of the last heartbeat
+        self.last_seen = {}
+        # Set to flush before the interval is over
+        self.wake = threading.Event()
+
+    def add(self, user_id, course_id: int, lesson_id: int, seconds: int) -> int:
+        """Buffer a heartbeat; return the seconds counted."""
+        now = time.monotonic()
+        key = (user_id, course_id, lesson_id, timezone.localdate())
+        seconds = min(seconds, self.max_seconds)
+        with self.lock:
+            previous = self.last_seen.get((user_id, lesson_id))
+            if previous is not None:
+                # Heartbeats sent faster than real time cannot count more than it
+                seconds = min(seconds, int(now - previous) + SLACK_SECONDS)
+            self.last_seen[(user_id, lesson_id)] = now
+            self.counters[key] = self.counters.get(key, 0) + seconds
+            full = len(self.counters) >= self.MAX_COUNTERS
+        if full:
+            self.wake.set()
+        return seconds
+
+    def drain(self) -> dict:
+        """Take the buffered counters, leaving the buffer empty."""
+        now = time.monotonic()
+        with self.lock:
+            counters, self.counters = self.counters, {}
+            self.last_seen = {
+                key: seen for key, seen in self.last_seen.items() if now - seen < self.max_seconds
+            }
+        return counters
+
+    def restore(self, counters: dict) -> None:
+        """Put back counters that could not be written."""
+        with self.lock:
+            for key, seconds in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + seconds
+
+
+def get_buffer() -> HeartbeatBuffer:
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                _buffer = HeartbeatBuffer()
+                threading.Thread(target=_flush_loop, args=(_buffer,), name='lesson-time-flush', daemon=True).start()
+                atexit.register(flush)
+    return _buffer
+
+
+def _flush_loop(buffer: HeartbeatBuffer) -> None:
+    """Flush ``buffer`` every ``flush_seconds``, or sooner when it fills up."""
+    while True:
+        buffer.wake.wait(buffer.flush_seconds)
+        buffer.wake.clear()
+        try:
+            flush()
+        finally:
+            # Between flushes the thread holds no connection
+            connections.close_all()
+
+
+def record_heartbeat(user_id, course_id: int, lesson_id: int, seconds: int) -> int:
+    """Count a heartbeat without touching the database. Returns the seconds counted."""
+    return get_buffer().add(user_id, course_id, lesson_id, seconds)
+
+
+def flush() -> int:
+    """Write the buffered counters. Returns the number of counters written."""
+    if _buffer is None:
+        return 0
+    counters = _buffer.drain()
+    if not counters:
+        return 0
+    try:
+        return write_counters(counters)
+    except Exception:
+        # Keep the seconds for the next flush rather than losing them
+        _buffer.restore(counters)
+        logger.exception('Could not flush %d lesson time counter(s)', len(counters))
+        return 0
+
+
+def write_counters(counters: dict) -> int:
+    """
+    Add ``{(user_id, course_id, lesson_id, day): seconds}`` to
+    ``LessonTimeDaily`` and credit the minutes gained to the daily goals.
+    """
+    lesson_courses = dict(
+        Lesson.objects.filter(id__in={key[2] for key in counters}).values_list('id', 'course_id')
+    )
+    # Tokens outlive deleted users
+    user_ids = set(User.objects.filter(id__in={key[0] for key in counters}).values_list('id', flat=True))
+    # The course comes from the heartbeat URL; drop lessons that are gone or belong elsewhere
+    counters = {
+        key: seconds
+        for key, seconds in counters.items()
+        if seconds > 0 and key[0] in user_ids and lesson_courses.get(key[2]) == key[1]
+    }
+    if not counters:
+        return 0
+    # Sorted so that the id lists of a batch stay short
+    keys = sorted(counters)
+    now = timezone.now()
+    with transaction.atomic():
+        # Rows start at zero, so concurrent flushes only ever add to them
+        LessonTimeDaily.objects.bulk_create(
+            [
+                LessonTimeDaily(user_id=user_id, course_id=course_id, lesson_id=lesson_id, day=day)
+                for user_id, course_id, lesson_id, day in keys
+            ],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+        for start in range(0, len(keys), BATCH_SIZE):
+            batch = keys[start:start + BATCH_SIZE]
+            added = Case(
+                *[
+                    When(user_id=user_id, lesson_id=lesson_id, day=day, then=Value(counters[user_id, course_id, lesson_id, day]))
+                    for user_id, course_id, lesson_id, day in batch
+                ],
+                default=Value(0),
+                output_field=IntegerField(),
+            )
+            LessonTimeDaily.objects.filter(
+                user_id__in={key[0] for key in batch},
+                lesson_id__in={key[2] for key in batch},
+                day__in={key[3] for key in batch},
+            ).update(seconds=F('seconds') + added, updated_at=now)
+        if goals.goal_credit() == goals.WATCH_TIME:
+            minutes = _minutes_gained(counters)
+            goals.credit_minutes(minutes)
+            by_day = {}
+            for (user_id, _, day), value in minutes.items():
+                by_day[user_id, day] = by_day.get((user_id, day), 0) + value
+            daily_activity.record_many({key: (value, 0, 0) for key, value in by_day.items()})
+    return len(counters)
+
+
+def _minutes_gained(counters: dict) -> dict:
+    """Whole minutes per ``(user_id, course_id, day)`` crossed by the seconds just added."""
+    added = {}
+    for (user_id, course_id, _, day), seconds in counters.items():
+        added[user_id, course_id, day] = added.get((user_id, course_id, day), 0) + seconds
+    keys = sorted(added)
+    minutes = {}
+    for start in range(0, len(keys), BATCH_SIZE):
+        batch = keys[start:start + BATCH_SIZE]
+        totals = (
+            LessonTimeDaily.objects.filter(
+                user_id__in={key[0] for key in batch},
+                course_id__in={key[1] for key in batch},
+                day__in={key[2] for key in batch},
+            )
+            .values('user_id', 'course_id', 'day')
+            .annotate(total=Sum('seconds'))
+            .values_list('user_id', 'course_id', 'day', 'total')
+        )
+        for user_id, course_id, day, total in totals:
+            seconds = added.get((user_id, course_id, day))
+            if seconds is None:
+                continue
+            gained = total // 60 - (total - seconds) // 60
+            if gained:
+                minutes[user_id, course_id, day] = gained
+    return minutes
@@ -0,0 +1,131 @@
+"""
+Read/write routing between the primary database and a read replica.
+
+Writes always go to ``default``. Views that opt in with
+``ReplicaReadMixin`` send the reads of their safe (GET/HEAD/OPTIONS)
+requests to the ``replica`` alias when one is configured. After a user
+performs a write, ``PrimaryPinningMiddleware`` pins that user to the
+primary for ``REPLICA_PIN_SECONDS`` so they always read their own writes
+while the replica catches up. The pin is stored in Django's cache, so it
+only holds across worker processes when the cache is shared.
+"""
+import contextlib
+import contextvars
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_ALIAS = 'replica'
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def _pin_key(user_id) -> str:
+    return f'db-primary-pin:{user_id}'
+
+
+def pin_to_primary(user) -> None:
+    """Keep ``user``'s reads on the primary for the configured window."""
+    cache.set(_pin_key(user.pk), True, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+
+
+def is_pinned_to_primary(user) -> bool:
+    if not user or not user.is_authenticated:
+        return False
+    return cache.get(_pin_key(user.pk), False)
+
+
+@contextlib.contextmanager
+def reading_from_replica():
+    """Send the reads made inside the block to the replica."""
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReadReplicaRouter:
+    """Route reads to the replica while a replica-enabled request is active."""
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_configured():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data, so relations across them are fine
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema and data from the primary
+        return db != REPLICA_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    DRF view mixin sending the reads of safe requests to the replica.
+
+    Routing is decided after authentication so that users inside their
+    read-your-writes window stay on the primary.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned_to_primary(request.user):
+            self._replica_token = _use_replica.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _use_replica.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class PrimaryPinningMiddleware:
+    """Pin users to the primary after any successful write they make."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.process_response(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.may_pin(request, response):
+            # The lazy user and the cache may both block
+            await sync_to_async(self.process_response)(request, response)
+        return response
+
+    @staticmethod
+    def may_pin(request, response) -> bool:
+        """Whether the response is for a successful write, without touching the user."""
+        return request.method not in SAFE_METHODS and response.status_code < 400 and replica_configured()
+
+    def process_response(self, request, response):
+        if not self.may_pin(request, response):
+            return
+        # DRF copies the authenticated user back onto the Django request
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user)
@@ -6,6 +6,7 @@ purposes. It uses SQLite as the database backend and sets up Django
 REST Framework and CORS so that a React frontend can communicate
 comfortably with the API during development.
 """
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -44,6 +45,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'integration_platform.db_routers.PrimaryPinningMiddleware',
+    'integration_platform.throttling.RateLimitHeadersMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -79,6 +82,22 @@ DATABASES = {
     }
 }
 
+# Optional read replica. Safe requests to catalog, quiz, achievement and
+# admin report views read from it. For local testing point
+# DJANGO_REPLICA_DB_NAME at a copy of db.sqlite3.
+REPLICA_DB_NAME = os.environ.get('DJANGO_REPLICA_DB_NAME')
+if REPLICA_DB_NAME:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / REPLICA_DB_NAME,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['integration_platform.db_routers.ReadReplicaRouter']
+
+# Seconds a user's reads stay on the primary after they write
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -127,7 +146,102 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Only views that declare a throttle_scope listed below are limited
+    'DEFAULT_THROTTLE_CLASSES': (
+        'integration_platform.throttling.SlidingWindowThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'register': '10/hour',
+        'login': '20/min',
+        'lesson_complete': '120/min',
+        'quiz_submit': '20/min',
+        'journal_sync': '30/min',
+    },
 }
 
+# Caches. Rate limits and read-your-writes pins only hold across worker
+# processes with a shared cache, so point DJANGO_REDIS_URL at Redis in
+# production.
+if os.environ.get('DJANGO_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+RATELIMIT_CACHE_ALIAS = 'default'
+
+# Seconds clients and proxies may cache a lesson content response
+LESSON_CONTENT_MAX_AGE = 60 * 60 * 24
+
+# Reading speed behind Lesson.reading_minutes (courses.content). Run
+# 'manage.py render_lessons --all' after changing it.
+LESSON_READING_WORDS_PER_MINUTE = 180
+
+# Where completion reads come from: 'm2m' (Progress.completed_lessons) or
+# 'bitmap' (Progress.completed_bitmap). Writes always update both; run
+# 'manage.py sync_progress_bitmaps' before switching an existing database.
+PROGRESS_COMPLETION_STORAGE = 'm2m'
+
+# What daily goal minutes are credited from (courses.goals): 'estimated'
+# (a lesson's estimated_minutes on completion) or 'watch_time' (time spent
+# on lessons, from heartbeats).
+DAILY_GOAL_CREDIT = 'estimated'
+
+# Lesson heartbeats (courses.watch_time) are buffered per process and
+# written by a background thread every LESSON_HEARTBEAT_FLUSH_SECONDS;
+# one heartbeat counts at most LESSON_HEARTBEAT_MAX_SECONDS.
+LESSON_HEARTBEAT_FLUSH_SECONDS = 10
+LESSON_HEARTBEAT_MAX_SECONDS = 30
+
+# Seconds the question ids of a quiz's question pool stay cached between
+# draws (courses.question_pools). Saving a question drops its pool's ids.
+QUESTION_POOL_CACHE_SECONDS = 300
+
+# Seconds achievement rules (courses.achievements) stay cached. Saving an
+# achievement drops them; with several processes this needs a shared cache.
+ACHIEVEMENT_RULES_CACHE_SECONDS = 60 * 60
+
+# Unfiltered admin changelists above this many rows show an estimated count
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000
+
+# Server-sent activity feed (courses.activity_stream). The default broker is
+# per process; point ACTIVITY_STREAM_BROKER at a shared implementation when
+# running several workers.
+ACTIVITY_STREAM_BROKER = 'courses.activity_stream.InProcessBroker'
+ACTIVITY_STREAM_BUFFER = 50
+ACTIVITY_STREAM_KEEPALIVE = 15
+ACTIVITY_STREAM_MAX_SECONDS = 5 * 60
+
+# Catalog delta sync (courses.catalog_sync). Changes younger than this are
+# held back so that transactions committing out of id order are not
+# skipped; SQLite serialises writes, on PostgreSQL use a few seconds.
+CATALOG_SYNC_SETTLE_SECONDS = 0
+
+# Directory of the static catalog snapshots (courses.snapshots), served by
+# the web server. When set, catalog changes queue a publish job after they
+# commit; 'manage.py publish_catalog' publishes on demand.
+CATALOG_SNAPSHOT_ROOT = os.environ.get('CATALOG_SNAPSHOT_ROOT') or None
+
+# Background jobs (courses.jobs), run by 'manage.py run_jobs'. A failed job
+# is retried after JOB_RETRY_BASE_SECONDS, doubling up to
+# JOB_RETRY_MAX_SECONDS. Jobs running longer than JOB_LOCK_TIMEOUT_SECONDS
+# are taken for abandoned and queued again. JOBS_EAGER runs jobs as they are
+# queued, for development without a worker.
+JOBS_EAGER = os.environ.get('DJANGO_JOBS_EAGER') == '1'
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_SECONDS = 10
+JOB_RETRY_MAX_SECONDS = 60 * 60
+JOB_LOCK_TIMEOUT_SECONDS = 10 * 60
+# Finished jobs are deleted after this long; failed ones are kept
+JOB_KEEP_SECONDS = 7 * 24 * 60 * 60
+
 # CORS settings to allow local development with React
 CORS_ALLOW_ALL_ORIGINS = True
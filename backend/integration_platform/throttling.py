@@ -0,0 +1,128 @@
+"""
+Rate limiting for write and authentication endpoints.
+
+Views opt in by setting ``throttle_scope``; the limit of each scope is
+read from ``REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']`` in DRF's
+``'<count>/<period>'`` format. Authenticated requests are limited per
+user and anonymous ones per client IP.
+
+Limits use a sliding window counter: the count of the current fixed
+window plus the count of the previous window weighted by how much of it
+still overlaps the sliding window. Counters live in the cache named by
+``RATELIMIT_CACHE_ALIAS`` so that every worker process shares them. A
+check costs one atomic ``incr``. The previous window's final count is
+read once per window and then memoised in the process.
+"""
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+# Final counts of closed windows, bounded to the most recent identities
+_previous_counts = OrderedDict()
+_PREVIOUS_COUNTS_MAX = 10000
+
+
+def parse_rate(rate):
+    """Return ``(limit, seconds)`` for a DRF rate string such as ``'10/min'``."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """Cache-backed sliding window throttle keyed by scope and identity."""
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'RATELIMIT_CACHE_ALIAS', 'default')]
+        self.wait_seconds = None
+
+    def allow_request(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope) if scope else None
+        if not rate:
+            return True
+        limit, duration = parse_rate(rate)
+        if request.user and request.user.is_authenticated:
+            ident = f'user-{request.user.pk}'
+        else:
+            ident = f'ip-{self.get_ident(request)}'
+
+        now = time.time()
+        window = int(now // duration)
+        elapsed = (now % duration) / duration
+        key = f'ratelimit:{scope}:{ident}:{window}'
+        current = self._increment(key, duration)
+        previous = self._previous_count(f'ratelimit:{scope}:{ident}:{window - 1}')
+        estimate = previous * (1 - elapsed) + current
+
+        allowed = estimate <= limit
+        window_left = (1 - elapsed) * duration
+        if allowed:
+            self.wait_seconds = None
+        elif current > limit or not previous:
+            self.wait_seconds = window_left
+        else:
+            # Wait until the previous window's weight has decayed enough
+            self.wait_seconds = max((1 - (limit - current) / previous - elapsed) * duration, 1)
+        # Exposed as RateLimit-* headers by RateLimitHeadersMiddleware
+        request._request.ratelimit = {
+            'limit': limit,
+            'remaining': max(int(limit - estimate), 0),
+            'reset': int(window_left) + 1,
+        }
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+    def _increment(self, key, duration):
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # First hit of the window; keep the key for the next window too
+            if self.cache.add(key, 1, timeout=duration * 2):
+                return 1
+            return self.cache.incr(key)
+
+    def _previous_count(self, key):
+        if key in _previous_counts:
+            return _previous_counts[key]
+        count = self.cache.get(key, 0)
+        _previous_counts[key] = count
+        if len(_previous_counts) > _PREVIOUS_COUNTS_MAX:
+            _previous_counts.popitem(last=False)
+        return count
+
+
+class RateLimitHeadersMiddleware:
+    """Add ``RateLimit-*`` headers to responses of rate limited views."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.add_headers(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.add_headers(request, await self.get_response(request))
+
+    def add_headers(self, request, response):
+        ratelimit = getattr(request, 'ratelimit', None)
+        if ratelimit:
+            response['RateLimit-Limit'] = str(ratelimit['limit'])
+            response['RateLimit-Remaining'] = str(ratelimit['remaining'])
+            response['RateLimit-Reset'] = str(ratelimit['reset'])
+        return response
@@ -6,10 +6,9 @@ interface, authentication endpoints, and API routes for accounts and courses.
 """
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from accounts.views import LoginView
 
 admin.site.site_header = 'Админ-панель Integration Hub'
 admin.site.site_title = 'Integration Hub'
@@ -20,7 +19,7 @@ admin.site.enable_nav_sidebar = False
 urlpatterns = [
     path('admin/', admin.site.urls),
     # JWT authentication endpoints
-    path('api/auth/login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('api/auth/login/', LoginView.as_view(), name='token_obtain_pair'),
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     # Include application routes
     path('api/accounts/', include('accounts.urls')), 
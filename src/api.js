@@ -2,7 +2,7 @@ import axios from 'axios';
 
 // Base URL of the Django backend API. When running locally, the Django
 // development server typically runs on port 8000. Adjust as needed.
-const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
+export const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
 
 const api = axios.create({
   baseURL: API_URL,
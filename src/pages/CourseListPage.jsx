@@ -49,7 +49,7 @@ export default function CourseListPage() {
       }
       setLoadingCourses(true);
       api
-        .get('/courses/', { params, signal: controller.signal })
+        .get('/courses/catalog/', { params, signal: controller.signal })
         .then((resp) => {
           if (isMounted) {
             setCourses(resp.data);
@@ -77,8 +77,9 @@ export default function CourseListPage() {
 
   useEffect(() => {
     let isMounted = true;
+    // Only the daily goal summary needs these; per-course progress comes with the catalog
     api
-      .get('/courses/progress/')
+      .get('/courses/progress/', { params: { fields: 'progress,minutes_remaining,daily_streak' } })
       .then((resp) => {
         if (isMounted) {
           setProgresses(resp.data);
@@ -90,22 +91,11 @@ export default function CourseListPage() {
     };
   }, []);
 
-  const progressByCourse = useMemo(() => {
-    const map = new Map();
-    progresses.forEach((record) => {
-      if (record?.course?.id) {
-        map.set(record.course.id, record);
-      }
-    });
-    return map;
-  }, [progresses]);
-
-  const resolveStatus = (courseId) => {
-    const record = progressByCourse.get(courseId);
-    if (!record) {
+  const resolveStatus = (course) => {
+    if (!course.started) {
       return 'not_started';
     }
-    if ((record.progress || 0) >= 100) {
+    if ((course.progress || 0) >= 100) {
       return 'completed';
     }
     return 'in_progress';
@@ -116,9 +106,9 @@ export default function CourseListPage() {
       if (statusFilter === 'all') {
         return true;
       }
-      return resolveStatus(course.id) === statusFilter;
+      return resolveStatus(course) === statusFilter;
     });
-  }, [courses, statusFilter, progressByCourse]);
+  }, [courses, statusFilter]);
 
   const progressSummary = useMemo(() => {
     if (!progresses.length) {
@@ -291,16 +281,15 @@ export default function CourseListPage() {
         ) : (
           <div className="list list--gap">
             {filteredCourses.map((course) => {
-              const record = progressByCourse.get(course.id);
-              const progressValue = record?.progress ?? 0;
-              const minutesRemaining = record
-                ? record.minutes_remaining ?? record.daily_goal_minutes ?? 0
+              const progressValue = course.progress ?? 0;
+              const minutesRemaining = course.started
+                ? course.minutes_remaining ?? course.daily_goal_minutes ?? 0
                 : null;
-              const statusKey = resolveStatus(course.id);
+              const statusKey = resolveStatus(course);
               const nextStep =
                 statusKey === 'completed'
                   ? 'Курс завершён — можно повторить тест или выбрать новый.'
-                  : record
+                  : course.started
                   ? minutesRemaining <= 0
                     ? 'Ежедневная цель достигнута. Закрепите знания тестом или следующими модулями.'
                     : `Осталось ${minutesRemaining} мин до цели на сегодня.`
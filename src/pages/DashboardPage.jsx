@@ -1,6 +1,6 @@
 import React, { useEffect, useMemo, useState } from 'react';
 import { Link } from 'react-router-dom';
-import api from '../api';
+import api, { API_URL } from '../api';
 import ProgressBar from '../components/ProgressBar';
 import Loader from '../components/Loader';
 
@@ -103,6 +103,75 @@ export default function DashboardPage() {
     };
   }, []);
 
+  // Live updates of the activity feed, achievements and tasks
+  useEffect(() => {
+    let source = null;
+    let retryTimer = null;
+    let closed = false;
+
+    const recomputeTasks = (tasks) => {
+      const completed = tasks.filter((t) => t.completed).length;
+      return { tasks, progress: tasks.length ? (completed / tasks.length) * 100 : 0 };
+    };
+
+    function connect() {
+      const token = localStorage.getItem('token');
+      if (!token || closed) {
+        return;
+      }
+      source = new EventSource(`${API_URL}/courses/stream/?token=${encodeURIComponent(token)}`);
+      source.addEventListener('activity', (event) => {
+        const entry = JSON.parse(event.data);
+        setActivities((prev) => [entry, ...prev.filter((a) => a.id !== entry.id)].slice(0, 10));
+      });
+      source.addEventListener('achievement', (event) => {
+        const achievement = JSON.parse(event.data);
+        setAchievements((prev) =>
+          prev.some((a) => a.id === achievement.id)
+            ? prev.map((a) => (a.id === achievement.id ? { ...a, awarded: true } : a))
+            : [...prev, achievement],
+        );
+      });
+      source.addEventListener('task', (event) => {
+        const task = JSON.parse(event.data);
+        setTasksData((prev) =>
+          recomputeTasks(prev.tasks.map((t) => (t.task_id === task.task_id ? task : t))),
+        );
+      });
+      source.addEventListener('resync', () => {
+        // Events of any panel may have been lost, so reload them all at once
+        api
+          .get('/courses/dashboard/', {
+            params: { sections: 'progress,tasks,activities,achievements,recommended' },
+          })
+          .then(({ data }) => {
+            setProgresses(data.progress);
+            setTasksData(data.tasks);
+            setActivities(data.activities);
+            setAchievements(data.achievements);
+            setRecommended(data.recommended);
+          })
+          .catch(console.error);
+      });
+      source.onerror = () => {
+        // EventSource retries by itself unless the server refused the stream,
+        // e.g. because the access token expired
+        if (source.readyState === EventSource.CLOSED && !closed) {
+          retryTimer = setTimeout(connect, 5000);
+        }
+      };
+    }
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      if (source) {
+        source.close();
+      }
+    };
+  }, []);
+
   const formatDate = (value) => {
     if (!value) {
       return 'Не указано';